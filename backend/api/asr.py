@@ -8,6 +8,15 @@ asr_bp = Blueprint('asr', __name__)
 # 初始化语音识别服务
 # 注意：需要确保Vosk模型已正确下载并放置在指定路径
 # 如果模型路径不存在，服务将在首次请求时抛出异常
+_asr_service = None
+
+
+def get_asr_service():
+    """获取语音识别服务单例，模型由进程级注册表加载，只加载一次"""
+    global _asr_service
+    if _asr_service is None:
+        _asr_service = SpeechRecognitionService()
+    return _asr_service
 
 @asr_bp.route('/asr', methods=['POST'])
 def speech_to_text():
@@ -31,9 +40,9 @@ def speech_to_text():
         # 读取音频数据
         audio_data = audio_file.read()
         
-        # 初始化语音识别服务
-        # 这里在请求时初始化，以便在模型不存在时能够给出明确错误
-        asr_service = SpeechRecognitionService()
+        # 获取语音识别服务
+        # 首次请求时初始化，以便在模型不存在时能够给出明确错误
+        asr_service = get_asr_service()
         
         # 识别语音
         text = asr_service.recognize_from_wav(audio_data)
@@ -1,11 +1,12 @@
 from flask import Blueprint, request, jsonify
 from services.ai_simulation import AISimulationService
+from services.session_store import SessionStore
 
 # 创建蓝图
 chat_bp = Blueprint('chat', __name__)
 
-# 初始化AI模拟服务
-ai_service = AISimulationService()
+# 初始化AI模拟服务，对话上下文保存在服务端会话中
+ai_service = AISimulationService(session_store=SessionStore())
 
 @chat_bp.route('/chat', methods=['POST'])
 def chat():
@@ -13,7 +14,7 @@ def chat():
     AI对话接口
     
     请求体：
-    {"message": "用户消息", "context": [...], "dialogue_id": "xxx"}
+    {"message": "用户消息", "dialogue_id": "xxx"}（上下文由服务端按dialogue_id保存，context仅为兼容旧客户端）
     
     响应：
     {"reply": "AI回复", "dialogue_id": "xxx"}
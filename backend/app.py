@@ -1,22 +1,21 @@
+import json
 import logging
-from flask import Flask, jsonify, request, send_file, Response
+import os
+import struct
+import time
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from flask import Flask, g, jsonify, request, send_file, Response, stream_with_context
 from flask_cors import CORS
-from tts_service import TTSService
-from services.speech_recognition import SpeechRecognitionService
-
-# 配置日志
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s',
-    handlers=[
-        logging.FileHandler('tts_service.log'),
-        logging.StreamHandler()
-    ]
-)
-
-# 确保所有模块都使用相同的日志配置
-for name in logging.root.manager.loggerDict:
-    logging.getLogger(name).setLevel(logging.DEBUG)
+from flask_sock import Sock
+from config import Config
+from logging_setup import sample_request
+from bootstrap import registry, readiness, start_startup, get_inference_stats, prefetch_reply_speech
+from services.inference_scheduler import SchedulerSaturatedError
+from services.audio_codec import media_type, negotiate_format
+from services.registry import ServiceDisabledError
+from services.batch_asr import check_batch, expand_upload
+from services.voice_turn import NDJSON_MEDIA_TYPE, encode_event, parse_tts_options
+from services.metrics import metrics, BYTES_RECEIVED, BYTES_SENT, REQUEST_SECONDS, STAGE_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -34,28 +33,78 @@ CORS(app,
          'http://localhost:8080',
          'http://127.0.0.1:8080'
      ],
-     methods=['GET', 'POST', 'OPTIONS'],
+     methods=['GET', 'POST', 'DELETE', 'OPTIONS'],
      allow_headers=['*'],
+     expose_headers=['X-Audio-Framing', 'X-Audio-Sample-Rate'],
      supports_credentials=True)
 
-# 初始化TTS服务
-tts_service = TTSService()
+# WebSocket支持（流式语音识别）
+sock = Sock(app)
 
-# 初始化ASR服务
-asr_service = SpeechRecognitionService()
+def _endpoint():
+    """以路由规则作为指标标签，避免路径参数导致标签基数膨胀"""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+    sample_request(Config.LOG_DEBUG_SAMPLE_RATE)
+    if request.content_length:
+        BYTES_RECEIVED.inc(request.content_length, endpoint=_endpoint())
+
+@app.after_request
+def _record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None and request.method != 'OPTIONS':
+        endpoint = _endpoint()
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint,
+                                method=request.method, status=response.status_code)
+        # 流式响应没有Content-Length，在生成器中按帧计数
+        if response.content_length:
+            BYTES_SENT.inc(response.content_length, endpoint=endpoint)
+    return response
+
+def _is_reloader_watcher():
+    """调试模式下Werkzeug重载器的监视进程不处理请求，无需加载模型"""
+    return __name__ == '__main__' and app.debug and os.environ.get('WERKZEUG_RUN_MAIN') != 'true'
+
+@app.errorhandler(ServiceDisabledError)
+def _service_disabled(error):
+    """当前角色不提供的服务返回404"""
+    return jsonify({'error': str(error)}), 404
+
+def _saturated_response(error):
+    """推理队列已满时返回503，并通过Retry-After提示客户端重试时间"""
+    logger.warning("%s推理队列已满，拒绝请求", error.kind)
+    response = jsonify({'error': str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
 
 # 简单的根路径
 @app.route('/', methods=['GET', 'OPTIONS'])
 def root():
     if request.method == 'OPTIONS':
         return '', 200
-    return jsonify({'message': 'AI Chat API is running'})
+    return jsonify({'message': 'AI Chat API is running', 'ready': readiness.ready})
+
+# 存活探针：进程能处理请求即返回200
+@app.route('/health/live', methods=['GET'])
+def health_live():
+    return jsonify({'status': 'alive'}), 200
+
+# 就绪探针：模型加载并预热到稳态后返回200，否则返回503
+@app.route('/health/ready', methods=['GET'])
+def health_ready():
+    snapshot = readiness.snapshot()
+    return jsonify(snapshot), 200 if snapshot['ready'] else 503
 
 # AI对话接口
 @app.route('/api/chat', methods=['POST', 'OPTIONS'])
 def chat():
     if request.method == 'OPTIONS':
         return '', 200
+    chat_service = registry.get('chat_service')
     
     try:
         data = request.get_json()
@@ -64,20 +113,40 @@ def chat():
         if not message:
             return jsonify({'error': 'Message is required'}), 400
         
-        # 简单的AI模拟响应
-        return jsonify({
-            'reply': f'你好！你说的是：{message}',
-            'dialogue_id': 'test-123'
-        }), 200
+        # 回复一确定就开始合成语音，与模拟延迟和客户端往返重叠
+        audio_url = None
+        
+        def on_reply(reply):
+            nonlocal audio_url
+            audio_url = prefetch_reply_speech(reply, data)
+        
+        result = chat_service.process_chat(
+            message,
+            context=data.get('context'),
+            dialogue_id=data.get('dialogue_id'),
+            on_reply=on_reply
+        )
+        if audio_url:
+            result['audio_url'] = audio_url
+        return jsonify(result), 200
         
     except Exception as e:
+        logger.error("对话处理失败: %s", e, exc_info=True)
         return jsonify({'error': str(e)}), 500
 
+# 结束对话：删除服务端保存的会话上下文
+@app.route('/api/chat/<dialogue_id>', methods=['DELETE'])
+def end_chat(dialogue_id):
+    if not registry.get('session_store').delete(dialogue_id):
+        return jsonify({'error': '对话不存在或已过期'}), 404
+    return '', 204
+
 # 语音合成接口（TTS）
 @app.route('/api/tts', methods=['POST', 'OPTIONS'])
 def tts():
     if request.method == 'OPTIONS':
         return '', 200
+    tts_service = registry.get('tts_service')
     
     try:
         data = request.get_json()
@@ -90,73 +159,356 @@ def tts():
         speed = data.get('speed', 1.0)
         volume = data.get('volume', 1.0)
         pitch = data.get('pitch', 1.0)
-        output_format = data.get('format', 'wav')
+        quality = data.get('quality')
+        output_format = _negotiate_tts_format(data)
+        if output_format is None:
+            return jsonify({'error': '不支持Accept中的音频格式'}), 406
+        
+        # 流式模式：分句合成，逐句返回
+        if data.get('stream'):
+            return _stream_tts_response(tts_service, text, speed, volume, pitch, output_format, quality)
         
         # 调用TTS服务
-        logger.info(f"收到TTS请求，文本长度: {len(text)}, 输出格式: {output_format}")
+        logger.info("收到TTS请求，文本长度: %d, 输出格式: %s", len(text), output_format)
         _, format, audio_content = tts_service.text_to_speech(
             text=text,
             speed=speed,
             volume=volume,
             pitch=pitch,
-            output_format=output_format
+            output_format=output_format,
+            quality=quality
         )
         
-        logger.info(f"TTS请求处理完成，音频大小: {len(audio_content)}字节")
-        
-        # 设置Content-Type
-        content_type = "audio/wav" if format == "wav" else "audio/mpeg"
+        logger.info("TTS请求处理完成，音频大小: %d字节", len(audio_content))
         
         # 返回音频文件流，设置为inline以便浏览器播放
-        return Response(
-            audio_content,
-            mimetype=content_type,
-            headers={
-                'Content-Disposition': f'inline; filename=tts_output.{format}',
-                'Content-Length': len(audio_content),
-                'Access-Control-Allow-Origin': '*'
-            }
-        )
+        return _audio_response(tts_service, audio_content, format, {'Access-Control-Allow-Origin': '*'})
         
+    except SchedulerSaturatedError as e:
+        return _saturated_response(e)
+    except FuturesTimeoutError:
+        logger.error("TTS推理超时")
+        return jsonify({'error': '语音合成超时，请稍后重试'}), 504
     except ValueError as e:
-        logger.error(f"TTS请求参数错误: {str(e)}")
+        logger.error("TTS请求参数错误: %s", e)
         return jsonify({'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"TTS服务错误: {str(e)}", exc_info=True)
+        logger.error("TTS服务错误: %s", e, exc_info=True)
         return jsonify({'error': '语音合成失败，请稍后重试'}), 500
 
+def _negotiate_tts_format(data):
+    """
+    选择TTS输出格式：format查询参数或请求体字段优先，否则按Accept头选择；
+    流式响应的Accept描述的是分帧容器，只按format选择（默认wav）
+    """
+    requested = request.args.get('format') or data.get('format')
+    accept = None if data.get('stream') else request.headers.get('Accept')
+    return negotiate_format(accept, requested)
+
+def _audio_response(tts_service, audio_content, format, headers=None):
+    """返回一段完整音频，pcm格式的Content-Type带采样率"""
+    return Response(
+        audio_content,
+        mimetype=media_type(format, tts_service.default_params['sample_rate']),
+        headers={
+            'Content-Disposition': f'inline; filename=tts_output.{format}',
+            'Content-Length': len(audio_content),
+            'Vary': 'Accept',
+            **(headers or {})
+        }
+    )
+
+def _stream_tts_response(tts_service, text, speed, volume, pitch, output_format='wav', quality=None):
+    """
+    构造流式TTS响应
+    
+    响应体由若干帧组成，每帧为4字节大端无符号长度 + 一段完整音频（格式由X-Audio-Framing给出，
+    如length-prefixed-wav、length-prefixed-ogg），长度为0的帧表示流正常结束；
+    客户端未收到结束帧即表示合成中途失败。
+    """
+    # 文本校验在生成响应前完成，参数错误仍返回400
+    segments = tts_service.iter_speech(
+        text=text,
+        speed=speed,
+        volume=volume,
+        pitch=pitch,
+        max_sentence_chars=Config.TTS_STREAM_MAX_SENTENCE_CHARS,
+        output_format=output_format,
+        quality=quality
+    )
+    
+    def generate():
+        try:
+            for index, sentence, audio_content in segments:
+                logger.debug("TTS流式输出第%d句，音频大小: %d字节", index + 1, len(audio_content))
+                BYTES_SENT.inc(len(audio_content) + 4, endpoint='/api/tts')
+                yield struct.pack('>I', len(audio_content))
+                yield audio_content
+            yield struct.pack('>I', 0)
+        except Exception as e:
+            logger.error("TTS流式合成中断: %s", e, exc_info=True)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/octet-stream',
+        headers={
+            'X-Audio-Framing': f'length-prefixed-{output_format}',
+            'X-Audio-Sample-Rate': str(tts_service.default_params['sample_rate']),
+            'Cache-Control': 'no-cache',
+            'Access-Control-Allow-Origin': '*'
+        }
+    )
+
+# 预取语音接口：返回/api/chat中预先提交的回复音频
+@app.route('/api/tts/prefetch/<handle>', methods=['GET'])
+def tts_prefetch(handle):
+    prefetcher = registry.get('speech_prefetcher')
+    future = prefetcher.lookup(handle) if prefetcher is not None else None
+    if future is None:
+        return jsonify({'error': '音频不存在或已过期'}), 404
+    
+    try:
+        _, format, audio_content = future.result(timeout=Config.INFERENCE_TIMEOUT)
+    except SchedulerSaturatedError as e:
+        return _saturated_response(e)
+    except FuturesTimeoutError:
+        logger.error("预取语音等待超时")
+        return jsonify({'error': '语音合成超时，请稍后重试'}), 504
+    except Exception as e:
+        logger.error("预取语音合成失败: %s", e)
+        return jsonify({'error': '语音合成失败，请稍后重试'}), 500
+    
+    return _audio_response(prefetcher.tts_service, audio_content, format, {'Cache-Control': 'private, max-age=60'})
+
+# TTS缓存统计接口
+@app.route('/api/tts/cache', methods=['GET'])
+def tts_cache_stats():
+    tts_cache = registry.get('tts_cache')
+    if tts_cache is None:
+        return jsonify({'enabled': False}), 200
+    stats = tts_cache.get_stats()
+    stats['enabled'] = True
+    return jsonify(stats), 200
+
 # 语音识别接口（ASR）
 @app.route('/api/asr', methods=['POST', 'OPTIONS'])
 def asr():
     if request.method == 'OPTIONS':
         return '', 200
+    registry.require('asr')
+    scheduler = registry.get('scheduler')
     
     try:
-        # 检查是否有文件上传
-        if 'audio' not in request.files:
-            return jsonify({'error': 'Audio file is required'}), 400
-        
-        audio_file = request.files['audio']
-        
-        if audio_file.filename == '':
-            return jsonify({'error': 'No selected file'}), 400
-        
         # 读取音频数据
-        audio_data = audio_file.read()
+        audio_data, audio_type = _read_audio_upload()
+        if audio_data is None:
+            return jsonify({'error': 'Audio file is required'}), 400
         
         # 调用ASR服务
-        logger.info(f"收到ASR请求，音频大小: {len(audio_data)}字节")
-        text = asr_service.recognize_from_wav(audio_data)
+        logger.info("收到ASR请求，音频大小: %d字节, 类型: %s", len(audio_data), audio_type)
+        text = _recognize(scheduler, audio_data, audio_type)
         
-        logger.info(f"ASR请求处理完成，识别结果: {text}")
+        logger.info("ASR请求处理完成，识别结果: %s", text)
         return jsonify({'text': text, 'confidence': 0.9}), 200
         
+    except SchedulerSaturatedError as e:
+        return _saturated_response(e)
+    except FuturesTimeoutError:
+        logger.error("ASR推理超时")
+        return jsonify({'error': '语音识别超时，请稍后重试'}), 504
+    except ValueError as e:
+        logger.error("ASR请求参数错误: %s", e)
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error("ASR服务错误: %s", e, exc_info=True)
+        return jsonify({'error': '语音识别失败，请稍后重试'}), 500
+
+def _read_audio_upload():
+    """
+    读取上传的音频：Content-Type为audio/*的原始请求体，或multipart表单的audio字段
+    
+    Returns:
+        tuple: (音频数据, 声明的Content-Type)，未上传时为 (None, None)
+    """
+    if request.mimetype.startswith('audio/'):
+        return request.get_data(), request.content_type
+    audio_file = request.files.get('audio')
+    if audio_file is None or audio_file.filename == '':
+        return None, None
+    return audio_file.read(), audio_file.content_type
+
+def _recognize(scheduler, audio_data, audio_type=None):
+    """识别上传的音频：启用ASR工作进程时提交给调度器，否则在请求线程内识别"""
+    if scheduler.asr is not None:
+        # 识别在工作进程中完成，Web进程只记录提交到返回的总耗时
+        with STAGE_SECONDS.time(service='asr', stage='scheduled'):
+            return scheduler.submit_asr(audio_data, audio_type).result(timeout=Config.INFERENCE_TIMEOUT)
+    return registry.get('asr_service').recognize_from_wav(audio_data, audio_type)
+
+# 语音对话接口：一次请求完成 识别 → 对话 → 合成，以NDJSON逐行返回事件
+@app.route('/api/voice-turn', methods=['POST', 'OPTIONS'])
+def voice_turn():
+    if request.method == 'OPTIONS':
+        return '', 200
+    registry.require('asr')
+    registry.require('chat')
+    pipeline = registry.get('voice_turn')
+    scheduler = registry.get('scheduler')
+    
+    try:
+        audio_data, audio_type = _read_audio_upload()
+        if audio_data is None:
+            return jsonify({'error': 'Audio file is required'}), 400
+        tts_options = parse_tts_options(request.form.get('tts') or request.args.get('tts'))
+        turn = pipeline.start(tts_options)
+        
+        logger.info("收到语音对话请求，音频大小: %d字节, 类型: %s", len(audio_data), audio_type)
+        # 识别在返回响应前完成，参数错误和队列已满仍以状态码返回
+        transcript = _recognize(scheduler, audio_data, audio_type)
+        turn.mark('asr_ms')
+    except SchedulerSaturatedError as e:
+        return _saturated_response(e)
+    except FuturesTimeoutError:
+        logger.error("语音对话识别超时")
+        return jsonify({'error': '语音识别超时，请稍后重试'}), 504
     except ValueError as e:
-        logger.error(f"ASR请求参数错误: {str(e)}")
+        logger.error("语音对话请求参数错误: %s", e)
         return jsonify({'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"ASR服务错误: {str(e)}", exc_info=True)
+        logger.error("语音对话识别失败: %s", e, exc_info=True)
         return jsonify({'error': '语音识别失败，请稍后重试'}), 500
+    
+    dialogue_id = request.form.get('dialogue_id') or request.args.get('dialogue_id')
+    events = pipeline.run(turn, transcript, dialogue_id, Config.INFERENCE_TIMEOUT)
+    
+    def generate():
+        for line in events:
+            BYTES_SENT.inc(len(line), endpoint='/api/voice-turn')
+            yield line
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype=NDJSON_MEDIA_TYPE,
+        headers={'Cache-Control': 'no-cache'}
+    )
+
+# 批量语音识别接口：多个音频文件或tar/zip归档，结果按完成顺序以NDJSON逐行返回
+@app.route('/api/asr/batch', methods=['POST', 'OPTIONS'])
+def asr_batch():
+    if request.method == 'OPTIONS':
+        return '', 200
+    registry.require('asr')
+    
+    try:
+        if request.files:
+            uploads = [(f.filename, f.read(), f.content_type) for _, f in request.files.items(multi=True)]
+        else:
+            uploads = [(request.args.get('name') or 'upload', request.get_data(), request.content_type)]
+        items = check_batch(
+            [item for upload in uploads for item in expand_upload(*upload)],
+            Config.ASR_BATCH_MAX_FILES, Config.ASR_BATCH_MAX_FILE_BYTES
+        )
+    except ValueError as e:
+        logger.error("批量识别请求参数错误: %s", e)
+        return jsonify({'error': str(e)}), 400
+    if not items:
+        return jsonify({'error': 'Audio files are required'}), 400
+    
+    transcriber = registry.get('batch_asr')
+    logger.info("收到批量识别请求，文件数: %d", len(items))
+    
+    def generate():
+        for event in transcriber.run(items):
+            line = encode_event(event)
+            BYTES_SENT.inc(len(line), endpoint='/api/asr/batch')
+            yield line
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype=NDJSON_MEDIA_TYPE,
+        headers={'Cache-Control': 'no-cache'}
+    )
+
+# 推理调度器统计接口
+@app.route('/api/inference/stats', methods=['GET'])
+def inference_stats():
+    return jsonify(get_inference_stats()), 200
+
+# ASR识别器池统计接口
+@app.route('/api/asr/stats', methods=['GET'])
+def asr_stats():
+    return jsonify(registry.get('asr_service').get_stats()), 200
+
+# 流式语音识别接口（WebSocket）
+@sock.route('/api/asr/stream')
+def asr_stream(ws):
+    """
+    流式语音识别
+    
+    客户端消息：
+        文本 {"sample_rate": 16000}  可选，首条消息，声明PCM采样率
+        二进制                       16位单声道小端PCM
+        文本 {"eof": true}           音频结束
+    服务端消息：
+        {"type": "partial", "text": "..."}  中间结果
+        {"type": "result", "text": "..."}   分句结果
+        {"type": "final", "text": "..."}    最终结果，随后关闭连接
+        {"type": "error", "error": "..."}   错误
+    """
+    session = None
+    sample_rate = Config.SAMPLE_RATE
+    try:
+        asr_service = registry.get('asr_service')
+        while True:
+            message = ws.receive()
+            if message is None:
+                break
+            
+            if isinstance(message, str):
+                control = json.loads(message)
+                if control.get('eof'):
+                    break
+                if 'sample_rate' in control and session is None:
+                    sample_rate = int(control['sample_rate'])
+                continue
+            
+            if session is None:
+                session = asr_service.create_session(sample_rate)
+                logger.info("流式ASR会话开始，采样率: %d", sample_rate)
+            BYTES_RECEIVED.inc(len(message), endpoint='/api/asr/stream')
+            with STAGE_SECONDS.time(service='asr', stage='stream_accept'):
+                event = session.accept(message)
+            if event is not None:
+                ws.send(json.dumps(event, ensure_ascii=False))
+        
+        if session is None:
+            session = asr_service.create_session(sample_rate)
+        # 停止说话到得到最终结果的延迟
+        with STAGE_SECONDS.time(service='asr', stage='stream_finish'):
+            final = session.finish()
+        logger.info("流式ASR会话结束，音频大小: %d字节，识别结果: %s", session.bytes_received, final['text'])
+        ws.send(json.dumps(final, ensure_ascii=False))
+    except Exception as e:
+        logger.error("流式ASR错误: %s", e, exc_info=True)
+        try:
+            ws.send(json.dumps({'type': 'error', 'error': str(e)}, ensure_ascii=False))
+        except Exception:
+            # 连接已断开
+            pass
+    finally:
+        # 连接异常断开时也要归还识别器
+        if session is not None:
+            session.close()
+
+# Prometheus指标接口
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# 指标分位数统计接口（最近1024次观测的p50/p95/p99）
+@app.route('/api/metrics', methods=['GET'])
+def metrics_stats():
+    return jsonify(metrics.get_stats()), 200
 
 # 打印所有注册的路由
 @app.route('/routes', methods=['GET'])
@@ -169,6 +521,10 @@ def list_routes():
         })
     return jsonify({'routes': routes})
 
+# 启动预热（Werkzeug重载器的监视进程除外）
+if not _is_reloader_watcher():
+    start_startup()
+
 if __name__ == '__main__':
     # 启动服务器
     app.run(host='127.0.0.1', port=5000)
\ No newline at end of file
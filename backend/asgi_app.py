@@ -0,0 +1,595 @@
+"""
+ASGI入口（Starlette），与app.py提供相同的接口，共用bootstrap中的服务
+
+请求在事件循环上处理：上传接收、流式响应和等待工作进程结果都不占用线程，
+阻塞的推理调用交给有界线程池执行。
+
+启动方式：
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+    gunicorn -c gunicorn_conf.py asgi_app:app
+"""
+
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from config import Config
+from logging_setup import sample_request
+from bootstrap import registry, readiness, start_startup, get_inference_stats, prefetch_reply_speech
+from services.inference_scheduler import SchedulerSaturatedError
+from services.audio_codec import media_type, negotiate_format
+from services.registry import ServiceDisabledError
+from services.batch_asr import check_batch, expand_upload
+from services.voice_turn import NDJSON_MEDIA_TYPE, encode_event, parse_tts_options
+from services.metrics import metrics, BYTES_RECEIVED, BYTES_SENT, REQUEST_SECONDS, STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# 阻塞推理调用的线程池，线程数即进程内同时执行的推理调用上限
+inference_executor = ThreadPoolExecutor(
+    max_workers=Config.ASGI_INFERENCE_THREADS,
+    thread_name_prefix='asgi-inference'
+)
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """在推理线程池中执行阻塞调用，并保留当前上下文（如日志采样决定）"""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    return await loop.run_in_executor(inference_executor, call)
+
+
+def _saturated_response(error):
+    """推理队列已满时返回503，并通过Retry-After提示客户端重试时间"""
+    logger.warning("%s推理队列已满，拒绝请求", error.kind)
+    return JSONResponse({'error': str(error)}, status_code=503,
+                        headers={'Retry-After': str(error.retry_after)})
+
+
+async def _service_disabled(request, error):
+    """当前角色不提供的服务返回404"""
+    return JSONResponse({'error': str(error)}, status_code=404)
+
+
+async def _read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+class MetricsMiddleware:
+    """
+    记录请求耗时和收发字节数
+
+    收发字节在消息经过时累计，对分块上传和流式响应同样有效。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] == 'OPTIONS':
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        sample_request(Config.LOG_DEBUG_SAMPLE_RATE)
+        received = 0
+        sent = 0
+        status = 500
+
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+            return message
+
+        async def counting_send(message):
+            nonlocal sent, status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                sent += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            # 以路由模板作为标签，避免路径参数导致标签基数膨胀
+            route = scope.get('route')
+            endpoint = getattr(route, 'path', 'unmatched')
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint,
+                                    method=scope['method'], status=status)
+            if received:
+                BYTES_RECEIVED.inc(received, endpoint=endpoint)
+            if sent:
+                BYTES_SENT.inc(sent, endpoint=endpoint)
+
+
+# ---- 接口 ----
+
+async def root(request):
+    return JSONResponse({'message': 'AI Chat API is running', 'ready': readiness.ready})
+
+
+async def health_live(request):
+    return JSONResponse({'status': 'alive'})
+
+
+async def health_ready(request):
+    snapshot = readiness.snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot['ready'] else 503)
+
+
+async def chat(request):
+    chat_service = await run_blocking(registry.get, 'chat_service')
+    try:
+        data = await _read_json(request) or {}
+        message = data.get('message')
+
+        if not message:
+            return JSONResponse({'error': 'Message is required'}, status_code=400)
+
+        # 回复一确定就开始合成语音（提交到预取线程池，不阻塞事件循环）
+        audio_url = None
+
+        def on_reply(reply):
+            nonlocal audio_url
+            audio_url = prefetch_reply_speech(reply, data)
+
+        result = await chat_service.process_chat_async(
+            message,
+            context=data.get('context'),
+            dialogue_id=data.get('dialogue_id'),
+            on_reply=on_reply
+        )
+        if audio_url:
+            result['audio_url'] = audio_url
+        return JSONResponse(result)
+    except Exception as e:
+        logger.error("对话处理失败: %s", e, exc_info=True)
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def end_chat(request):
+    session_store = await run_blocking(registry.get, 'session_store')
+    if not session_store.delete(request.path_params['dialogue_id']):
+        return JSONResponse({'error': '对话不存在或已过期'}, status_code=404)
+    return Response(status_code=204)
+
+
+async def tts(request):
+    tts_service = await run_blocking(registry.get, 'tts_service')
+    try:
+        data = await _read_json(request) or {}
+        text = data.get('text')
+
+        if not text:
+            return JSONResponse({'error': 'Text is required'}, status_code=400)
+
+        speed = data.get('speed', 1.0)
+        volume = data.get('volume', 1.0)
+        pitch = data.get('pitch', 1.0)
+        quality = data.get('quality')
+        output_format = _negotiate_tts_format(request, data)
+        if output_format is None:
+            return JSONResponse({'error': '不支持Accept中的音频格式'}, status_code=406)
+
+        # 流式模式：分句合成，逐句返回
+        if data.get('stream'):
+            return _stream_tts_response(tts_service, text, speed, volume, pitch, output_format, quality)
+
+        logger.info("收到TTS请求，文本长度: %d, 输出格式: %s", len(text), output_format)
+        _, format, audio_content = await run_blocking(
+            tts_service.text_to_speech,
+            text=text,
+            speed=speed,
+            volume=volume,
+            pitch=pitch,
+            output_format=output_format,
+            quality=quality
+        )
+        logger.info("TTS请求处理完成，音频大小: %d字节", len(audio_content))
+        return _audio_response(tts_service, audio_content, format)
+
+    except SchedulerSaturatedError as e:
+        return _saturated_response(e)
+    except FuturesTimeoutError:
+        logger.error("TTS推理超时")
+        return JSONResponse({'error': '语音合成超时，请稍后重试'}, status_code=504)
+    except ValueError as e:
+        logger.error("TTS请求参数错误: %s", e)
+        return JSONResponse({'error': str(e)}, status_code=400)
+    except Exception as e:
+        logger.error("TTS服务错误: %s", e, exc_info=True)
+        return JSONResponse({'error': '语音合成失败，请稍后重试'}, status_code=500)
+
+
+def _negotiate_tts_format(request, data):
+    """选择TTS输出格式，规则与app.py相同：format优先，非流式时再看Accept"""
+    requested = request.query_params.get('format') or data.get('format')
+    accept = None if data.get('stream') else request.headers.get('accept')
+    return negotiate_format(accept, requested)
+
+
+def _audio_response(tts_service, audio_content, format, headers=None):
+    """返回一段完整音频，pcm格式的Content-Type带采样率"""
+    return Response(
+        audio_content,
+        media_type=media_type(format, tts_service.default_params['sample_rate']),
+        headers={
+            'Content-Disposition': f'inline; filename=tts_output.{format}',
+            'Vary': 'Accept',
+            **(headers or {})
+        }
+    )
+
+
+def _stream_tts_response(tts_service, text, speed, volume, pitch, output_format='wav', quality=None):
+    """
+    构造流式TTS响应，帧格式与app.py相同：
+    4字节大端无符号长度 + 一段完整音频（格式见X-Audio-Framing），长度为0的帧表示流正常结束
+    """
+    segments = tts_service.iter_speech(
+        text=text,
+        speed=speed,
+        volume=volume,
+        pitch=pitch,
+        max_sentence_chars=Config.TTS_STREAM_MAX_SENTENCE_CHARS,
+        output_format=output_format,
+        quality=quality
+    )
+
+    async def generate():
+        try:
+            while True:
+                # 每句的合成在推理线程池中执行，等待期间不占用线程
+                item = await run_blocking(next, segments, None)
+                if item is None:
+                    break
+                index, sentence, audio_content = item
+                logger.debug("TTS流式输出第%d句，音频大小: %d字节", index + 1, len(audio_content))
+                yield struct.pack('>I', len(audio_content)) + audio_content
+            yield struct.pack('>I', 0)
+        except Exception as e:
+            logger.error("TTS流式合成中断: %s", e, exc_info=True)
+
+    return StreamingResponse(
+        generate(),
+        media_type='application/octet-stream',
+        headers={
+            'X-Audio-Framing': f'length-prefixed-{output_format}',
+            'X-Audio-Sample-Rate': str(tts_service.default_params['sample_rate']),
+            'Cache-Control': 'no-cache'
+        }
+    )
+
+
+async def tts_prefetch(request):
+    prefetcher = await run_blocking(registry.get, 'speech_prefetcher')
+    future = prefetcher.lookup(request.path_params['handle']) if prefetcher is not None else None
+    if future is None:
+        return JSONResponse({'error': '音频不存在或已过期'}, status_code=404)
+
+    try:
+        _, format, audio_content = await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(future)), Config.INFERENCE_TIMEOUT
+        )
+    except SchedulerSaturatedError as e:
+        return _saturated_response(e)
+    except (asyncio.TimeoutError, FuturesTimeoutError):
+        logger.error("预取语音等待超时")
+        return JSONResponse({'error': '语音合成超时，请稍后重试'}, status_code=504)
+    except Exception as e:
+        logger.error("预取语音合成失败: %s", e)
+        return JSONResponse({'error': '语音合成失败，请稍后重试'}, status_code=500)
+
+    return _audio_response(prefetcher.tts_service, audio_content, format, {'Cache-Control': 'private, max-age=60'})
+
+
+async def tts_cache_stats(request):
+    tts_cache = await run_blocking(registry.get, 'tts_cache')
+    if tts_cache is None:
+        return JSONResponse({'enabled': False})
+    stats = tts_cache.get_stats()
+    stats['enabled'] = True
+    return JSONResponse(stats)
+
+
+async def asr(request):
+    registry.require('asr')
+    scheduler = await run_blocking(registry.get, 'scheduler')
+    try:
+        audio_data, audio_type, _ = await _read_audio_upload(request)
+        if audio_data is None:
+            return JSONResponse({'error': 'Audio file is required'}, status_code=400)
+
+        logger.info("收到ASR请求，音频大小: %d字节, 类型: %s", len(audio_data), audio_type)
+        text = await _recognize(scheduler, audio_data, audio_type)
+
+        logger.info("ASR请求处理完成，识别结果: %s", text)
+        return JSONResponse({'text': text, 'confidence': 0.9})
+
+    except SchedulerSaturatedError as e:
+        return _saturated_response(e)
+    except (FuturesTimeoutError, asyncio.TimeoutError):
+        logger.error("ASR推理超时")
+        return JSONResponse({'error': '语音识别超时，请稍后重试'}, status_code=504)
+    except ValueError as e:
+        logger.error("ASR请求参数错误: %s", e)
+        return JSONResponse({'error': str(e)}, status_code=400)
+    except Exception as e:
+        logger.error("ASR服务错误: %s", e, exc_info=True)
+        return JSONResponse({'error': '语音识别失败，请稍后重试'}, status_code=500)
+
+
+async def _read_audio_upload(request):
+    """
+    读取上传的音频：Content-Type为audio/*的原始请求体，或multipart表单的audio字段
+    （上传内容由Starlette异步接收，大文件写入临时文件，不占用线程）
+
+    Returns:
+        tuple: (音频数据, 声明的Content-Type, 表单其他字段)，未上传时音频数据为None
+    """
+    content_type = request.headers.get('content-type', '')
+    if content_type.lower().startswith('audio/'):
+        return await request.body(), content_type, {}
+    form = await request.form()
+    try:
+        fields = {key: value for key, value in form.items() if isinstance(value, str)}
+        audio_file = form.get('audio')
+        if audio_file is None or isinstance(audio_file, str) or audio_file.filename == '':
+            return None, None, fields
+        return await audio_file.read(), audio_file.content_type, fields
+    finally:
+        await form.close()
+
+
+async def _recognize(scheduler, audio_data, audio_type=None):
+    """识别上传的音频：启用ASR工作进程时直接等待工作进程的Future，不占用线程"""
+    if scheduler.asr is not None:
+        with STAGE_SECONDS.time(service='asr', stage='scheduled'):
+            return await asyncio.wait_for(
+                asyncio.wrap_future(scheduler.submit_asr(audio_data, audio_type)),
+                timeout=Config.INFERENCE_TIMEOUT
+            )
+    asr_service = await run_blocking(registry.get, 'asr_service')
+    return await run_blocking(asr_service.recognize_from_wav, audio_data, audio_type)
+
+
+async def voice_turn(request):
+    registry.require('asr')
+    registry.require('chat')
+    pipeline = await run_blocking(registry.get, 'voice_turn')
+    scheduler = await run_blocking(registry.get, 'scheduler')
+    try:
+        audio_data, audio_type, fields = await _read_audio_upload(request)
+        if audio_data is None:
+            return JSONResponse({'error': 'Audio file is required'}, status_code=400)
+        tts_options = parse_tts_options(fields.get('tts') or request.query_params.get('tts'))
+        dialogue_id = fields.get('dialogue_id') or request.query_params.get('dialogue_id')
+        turn = pipeline.start(tts_options)
+
+        logger.info("收到语音对话请求，音频大小: %d字节, 类型: %s", len(audio_data), audio_type)
+        # 识别在返回响应前完成，参数错误和队列已满仍以状态码返回
+        transcript = await _recognize(scheduler, audio_data, audio_type)
+        turn.mark('asr_ms')
+    except SchedulerSaturatedError as e:
+        return _saturated_response(e)
+    except (FuturesTimeoutError, asyncio.TimeoutError):
+        logger.error("语音对话识别超时")
+        return JSONResponse({'error': '语音识别超时，请稍后重试'}, status_code=504)
+    except ValueError as e:
+        logger.error("语音对话请求参数错误: %s", e)
+        return JSONResponse({'error': str(e)}, status_code=400)
+    except Exception as e:
+        logger.error("语音对话识别失败: %s", e, exc_info=True)
+        return JSONResponse({'error': '语音识别失败，请稍后重试'}, status_code=500)
+
+    return StreamingResponse(
+        pipeline.run_async(turn, transcript, dialogue_id, Config.INFERENCE_TIMEOUT),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={'Cache-Control': 'no-cache'}
+    )
+
+
+async def _read_batch_uploads(request):
+    """读取批量识别的上传：multipart表单的全部文件，或原始请求体（单个音频或归档）"""
+    content_type = request.headers.get('content-type', '')
+    if not content_type.lower().startswith('multipart/'):
+        return [(request.query_params.get('name') or 'upload', await request.body(), content_type)]
+    form = await request.form(max_files=Config.ASR_BATCH_MAX_FILES)
+    try:
+        return [(value.filename, await value.read(), value.content_type)
+                for _, value in form.multi_items() if not isinstance(value, str)]
+    finally:
+        await form.close()
+
+
+async def asr_batch(request):
+    """批量语音识别，结果按完成顺序以NDJSON逐行返回"""
+    registry.require('asr')
+    try:
+        uploads = await _read_batch_uploads(request)
+        items = check_batch(
+            [item for upload in uploads for item in expand_upload(*upload)],
+            Config.ASR_BATCH_MAX_FILES, Config.ASR_BATCH_MAX_FILE_BYTES
+        )
+    except ValueError as e:
+        logger.error("批量识别请求参数错误: %s", e)
+        return JSONResponse({'error': str(e)}, status_code=400)
+    if not items:
+        return JSONResponse({'error': 'Audio files are required'}, status_code=400)
+
+    transcriber = await run_blocking(registry.get, 'batch_asr')
+    logger.info("收到批量识别请求，文件数: %d", len(items))
+
+    async def generate():
+        async for event in transcriber.run_async(items):
+            yield encode_event(event)
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE, headers={'Cache-Control': 'no-cache'})
+
+
+async def asr_stream(websocket: WebSocket):
+    """
+    流式语音识别，消息格式与app.py的 /api/asr/stream 相同
+    """
+    await websocket.accept()
+    session = None
+    sample_rate = Config.SAMPLE_RATE
+    try:
+        asr_service = await run_blocking(registry.get, 'asr_service')
+        while True:
+            message = await websocket.receive()
+            if message['type'] == 'websocket.disconnect':
+                raise WebSocketDisconnect(message.get('code', 1000))
+
+            if message.get('text') is not None:
+                control = json.loads(message['text'])
+                if control.get('eof'):
+                    break
+                if 'sample_rate' in control and session is None:
+                    sample_rate = int(control['sample_rate'])
+                continue
+
+            data = message.get('bytes') or b''
+            if session is None:
+                session = await run_blocking(asr_service.create_session, sample_rate)
+                logger.info("流式ASR会话开始，采样率: %d", sample_rate)
+            BYTES_RECEIVED.inc(len(data), endpoint='/api/asr/stream')
+            with STAGE_SECONDS.time(service='asr', stage='stream_accept'):
+                event = await run_blocking(session.accept, data)
+            if event is not None:
+                await websocket.send_text(json.dumps(event, ensure_ascii=False))
+
+        if session is None:
+            session = await run_blocking(asr_service.create_session, sample_rate)
+        with STAGE_SECONDS.time(service='asr', stage='stream_finish'):
+            final = await run_blocking(session.finish)
+        logger.info("流式ASR会话结束，音频大小: %d字节，识别结果: %s", session.bytes_received, final['text'])
+        await websocket.send_text(json.dumps(final, ensure_ascii=False))
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info("流式ASR连接已断开")
+    except Exception as e:
+        logger.error("流式ASR错误: %s", e, exc_info=True)
+        try:
+            await websocket.send_text(json.dumps({'type': 'error', 'error': str(e)}, ensure_ascii=False))
+            await websocket.close()
+        except Exception:
+            # 连接已断开
+            pass
+    finally:
+        # 连接异常断开时也要归还识别器
+        if session is not None:
+            session.close()
+
+
+async def inference_stats(request):
+    return JSONResponse(get_inference_stats())
+
+
+async def asr_stats(request):
+    asr_service = await run_blocking(registry.get, 'asr_service')
+    return JSONResponse(asr_service.get_stats())
+
+
+async def prometheus_metrics(request):
+    return Response(metrics.render_prometheus(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+async def metrics_stats(request):
+    return JSONResponse(metrics.get_stats())
+
+
+async def list_routes(request):
+    routes = [
+        {'rule': route.path, 'methods': sorted(route.methods or [])}
+        for route in request.app.routes
+    ]
+    return JSONResponse({'routes': routes})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    start_startup()
+    yield
+    inference_executor.shutdown(wait=False, cancel_futures=True)
+    for name in ('speech_prefetcher', 'voice_turn', 'batch_asr'):
+        service = registry.peek(name)
+        if service is not None:
+            service.shutdown()
+    scheduler = registry.peek('scheduler')
+    if scheduler is not None:
+        scheduler.shutdown()
+
+
+app = Starlette(
+    routes=[
+        Route('/', root),
+        Route('/health/live', health_live),
+        Route('/health/ready', health_ready),
+        Route('/api/chat', chat, methods=['POST']),
+        Route('/api/chat/{dialogue_id}', end_chat, methods=['DELETE']),
+        Route('/api/tts', tts, methods=['POST']),
+        Route('/api/tts/prefetch/{handle}', tts_prefetch),
+        Route('/api/tts/cache', tts_cache_stats),
+        Route('/api/asr', asr, methods=['POST']),
+        Route('/api/asr/batch', asr_batch, methods=['POST']),
+        Route('/api/voice-turn', voice_turn, methods=['POST']),
+        WebSocketRoute('/api/asr/stream', asr_stream),
+        Route('/api/asr/stats', asr_stats),
+        Route('/api/inference/stats', inference_stats),
+        Route('/metrics', prometheus_metrics),
+        Route('/api/metrics', metrics_stats),
+        Route('/routes', list_routes),
+    ],
+    middleware=[
+        Middleware(
+            CORSMiddleware,
+            allow_origins=[
+                'http://localhost:8000',
+                'http://127.0.0.1:8000',
+                'http://localhost:8080',
+                'http://127.0.0.1:8080'
+            ],
+            allow_methods=['GET', 'POST', 'DELETE', 'OPTIONS'],
+            allow_headers=['*'],
+            expose_headers=['X-Audio-Framing', 'X-Audio-Sample-Rate'],
+            allow_credentials=True
+        ),
+        Middleware(MetricsMiddleware),
+    ],
+    exception_handlers={ServiceDisabledError: _service_disabled},
+    lifespan=lifespan,
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(
+        'asgi_app:app',
+        host='127.0.0.1',
+        port=5000,
+        limit_concurrency=Config.ASGI_LIMIT_CONCURRENCY,
+        timeout_keep_alive=Config.ASGI_KEEPALIVE_TIMEOUT,
+        log_config=None
+    )
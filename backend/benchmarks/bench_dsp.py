@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音频参数调整基准：NumPy实现 vs 原pydub实现
+
+在backend目录下运行：
+    python -m benchmarks.bench_dsp
+    python -m benchmarks.bench_dsp --durations 1 10 60 --repeat 5 --json
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.common import ADJUST_CASES, make_clip
+from services.audio_codec import float_to_pcm16
+from services.audio_processing import adjust_audio
+
+try:
+    from pydub import AudioSegment
+except ImportError:
+    AudioSegment = None
+
+SAMPLE_RATE = 24000
+
+
+def pydub_adjust(samples, sample_rate, speed, volume, pitch):
+    """原 TTSService 慢速路径中的pydub处理流程"""
+    audio = AudioSegment(
+        data=float_to_pcm16(samples).tobytes(),
+        sample_width=2,
+        frame_rate=sample_rate,
+        channels=1
+    )
+    if volume != 1.0:
+        audio = audio.apply_gain(volume * 20 - 20)
+    if pitch != 1.0:
+        new_sample_rate = int(audio.frame_rate * (pitch ** 0.5))
+        audio = audio._spawn(audio.raw_data, overrides={'frame_rate': new_sample_rate})
+        audio = audio.set_frame_rate(sample_rate)
+    if speed != 1.0:
+        audio = audio.speedup(playback_speed=speed)
+    return audio
+
+
+def numpy_adjust(samples, sample_rate, speed, volume, pitch):
+    return adjust_audio(samples.copy(), sample_rate, speed=speed, volume=volume, pitch=pitch)
+
+
+def time_call(func, repeat, *args):
+    """返回多次调用的最短耗时（毫秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(durations, repeat):
+    results = []
+    for seconds in durations:
+        clip = make_clip(seconds)
+        for case, (speed, volume, pitch) in ADJUST_CASES.items():
+            row = {
+                'duration_s': seconds,
+                'case': case,
+                'numpy_ms': round(time_call(numpy_adjust, repeat, clip, SAMPLE_RATE, speed, volume, pitch), 2),
+            }
+            if AudioSegment is not None:
+                row['pydub_ms'] = round(time_call(pydub_adjust, repeat, clip, SAMPLE_RATE, speed, volume, pitch), 2)
+                row['speedup'] = round(row['pydub_ms'] / row['numpy_ms'], 1) if row['numpy_ms'] else None
+            results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='音频参数调整基准')
+    parser.add_argument('--durations', type=float, nargs='+', default=[1, 10, 60], help='测试音频时长（秒）')
+    parser.add_argument('--repeat', type=int, default=3, help='每项重复次数，取最短耗时')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出')
+    args = parser.parse_args()
+
+    results = run(args.durations, args.repeat)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+
+    if AudioSegment is None:
+        print('未安装pydub，仅测试NumPy实现')
+    print(f"{'时长(s)':>8} {'场景':>8} {'numpy(ms)':>11} {'pydub(ms)':>11} {'加速比':>8}")
+    for row in results:
+        print(f"{row['duration_s']:>8g} {row['case']:>8} {row['numpy_ms']:>11.2f} "
+              f"{row.get('pydub_ms', float('nan')):>11.2f} {row.get('speedup', float('nan')):>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
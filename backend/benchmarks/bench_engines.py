@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TTS推理引擎对比基准：加载耗时、内存和合成延迟
+
+每个引擎在独立子进程中测量（模型和推理库的内存互不影响），记录模型加载耗时、
+加载后常驻内存、进程峰值内存，以及各长度文本的合成延迟分位数和RTF。
+
+在backend目录下运行：
+    python -m benchmarks.bench_engines --engines paddle onnx
+    python -m benchmarks.bench_engines --engines onnx --intra-op-threads 1 2 4 --repeat 10
+    python -m benchmarks.bench_engines --engines fake --save-baseline engines.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.bench_pipeline import TEXTS
+from benchmarks.common import BACKEND_DIR, add_report_arguments, finish, make_report, summarize
+
+# 在子进程中执行的测量代码，结果以一行JSON输出到stdout
+_PROBE = r'''
+import json, resource, sys, time
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+from services.tts_engine import create_tts_engine
+
+result = {'baseline_rss_mb': rss_mb()}
+engine = create_tts_engine(**OPTIONS)
+start = time.perf_counter()
+engine.load()
+result['load_ms'] = (time.perf_counter() - start) * 1000
+result['load_rss_mb'] = rss_mb()
+
+result['synth'] = {}
+for label, text in TEXTS.items():
+    for _ in range(WARMUP):
+        engine.synthesize(text)
+    samples = []
+    audio_seconds = 0.0
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        waveform, sample_rate, _ = engine.synthesize(text)
+        samples.append((time.perf_counter() - start) * 1000)
+        audio_seconds = len(waveform) / sample_rate
+    result['synth'][label] = {'samples_ms': samples, 'audio_seconds': audio_seconds}
+
+result['synth_rss_mb'] = rss_mb()
+# Linux上ru_maxrss单位为KB
+result['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print('BENCH_RESULT ' + json.dumps(result))
+'''
+
+
+def measure(options: dict, repeat: int, warmup: int) -> dict:
+    """在子进程中加载引擎并测量，返回原始结果"""
+    env = dict(os.environ, WARMUP_ENABLED='false')
+    header = f'OPTIONS = {options!r}\nTEXTS = {TEXTS!r}\nREPEAT = {repeat!r}\nWARMUP = {warmup!r}\n'
+    proc = subprocess.run([sys.executable, '-c', header + _PROBE],
+                          cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    for line in proc.stdout.splitlines():
+        if line.startswith('BENCH_RESULT '):
+            return json.loads(line[len('BENCH_RESULT '):])
+    raise RuntimeError(f"引擎 {options['engine']} 测量失败:\n{proc.stderr[-2000:]}")
+
+
+def variants(args):
+    """待测的引擎配置：(结果名前缀, create_tts_engine参数)"""
+    for engine in args.engines:
+        if engine != 'onnx':
+            yield engine, {'engine': engine, 'fake_rtf': args.fake_rtf}
+            continue
+        for intra in args.intra_op_threads:
+            name = f'onnx.t{intra}' if len(args.intra_op_threads) > 1 else 'onnx'
+            yield name, {
+                'engine': 'onnx',
+                'onnx_model_dir': args.onnx_model_dir,
+                'onnx_intra_op_threads': intra,
+                'onnx_inter_op_threads': args.inter_op_threads,
+            }
+
+
+def run(args) -> dict:
+    results = {}
+    for name, options in variants(args):
+        try:
+            raw = measure(options, args.repeat, args.warmup)
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            results[f'{name}.load'] = summarize([], errors=1)
+            continue
+        load = summarize([raw['load_ms']])
+        load.update(
+            load_rss_mb=round(raw['load_rss_mb'], 1),
+            model_rss_mb=round(raw['load_rss_mb'] - raw['baseline_rss_mb'], 1),
+            synth_rss_mb=round(raw['synth_rss_mb'], 1),
+            peak_rss_mb=round(raw['peak_rss_mb'], 1),
+        )
+        results[f'{name}.load'] = load
+        for label, synth in raw['synth'].items():
+            row = summarize(synth['samples_ms'])
+            row['audio_seconds'] = round(synth['audio_seconds'], 3)
+            if synth['audio_seconds'] > 0:
+                row['rtf'] = round(row['p50_ms'] / 1000 / synth['audio_seconds'], 4)
+            results[f'{name}.synth.{label}'] = row
+    return results
+
+
+def print_table(report: dict):
+    def cell(value, width, digits):
+        return f'{value:>{width}.{digits}f}' if value is not None else f"{'-':>{width}}"
+
+    print(f"{'名称':<24} {'p50(ms)':>10} {'p95(ms)':>10} {'RTF':>7} {'加载后(MB)':>11} {'峰值(MB)':>9}")
+    for name, row in report['results'].items():
+        if row['errors']:
+            print(f"{name:<24} 测量失败")
+            continue
+        print(f"{name:<24} {cell(row.get('p50_ms'), 10, 2)} {cell(row.get('p95_ms'), 10, 2)} "
+              f"{cell(row.get('rtf'), 7, 3)} {cell(row.get('load_rss_mb'), 11, 1)} "
+              f"{cell(row.get('peak_rss_mb'), 9, 1)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TTS推理引擎对比基准')
+    parser.add_argument('--engines', nargs='+', default=['paddle', 'onnx'],
+                        choices=['paddle', 'onnx', 'fake'], help='要测量的引擎')
+    parser.add_argument('--repeat', type=int, default=10, help='每句合成次数')
+    parser.add_argument('--warmup', type=int, default=2, help='每句预热次数（不计入统计）')
+    parser.add_argument('--fake-rtf', type=float, default=0.05, help='替身TTS引擎的实时率')
+    parser.add_argument('--onnx-model-dir', default='models/onnx', help='ONNX模型目录')
+    parser.add_argument('--intra-op-threads', type=int, nargs='+', default=[0],
+                        help='ONNX Runtime算子内线程数，可给多个值逐一测量，0为自动')
+    parser.add_argument('--inter-op-threads', type=int, default=0, help='ONNX Runtime算子间线程数，0为自动')
+    add_report_arguments(parser)
+    args = parser.parse_args()
+
+    params = {key: value for key, value in vars(args).items()
+              if key not in ('output', 'baseline', 'save_baseline', 'json')}
+    report = make_report('engines', params, run(args))
+    sys.exit(finish(report, args, print_table))
+
+
+if __name__ == '__main__':
+    main()
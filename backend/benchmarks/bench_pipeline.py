@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流水线微基准：TTSService.text_to_speech各阶段、recognize_from_wav、音频处理和编解码
+
+默认使用替身引擎（不需要下载模型），--tts-engine paddle/onnx / --asr-engine vosk 测量真实模型。
+
+在backend目录下运行：
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --repeat 50 --output report.json
+    python -m benchmarks.bench_pipeline --baseline baseline.json
+"""
+
+import argparse
+import sys
+
+from benchmarks.common import (ADJUST_CASES, add_report_arguments, finish, make_clip, make_report,
+                               print_summary_table, summarize, time_calls)
+from services.audio_codec import MEDIA_TYPES, decode_audio, encode_audio, to_mono_pcm16
+from services.audio_processing import adjust_audio
+from services.speech_recognition import create_asr_service
+from services.tts_cache import TTSCache
+from services.tts_engine import create_tts_engine
+from tts_service import TTSService
+
+TEXTS = {
+    'short': '您好，欢迎使用语音服务。',
+    'medium': '感谢您的提问，我会尽力为您解答。这个问题比较复杂，让我详细解释一下。',
+    'long': '根据我的分析，您可能需要了解这方面的信息。' * 6,
+}
+
+ASR_SAMPLE_RATE = 16000
+
+
+def bench_tts(engine, repeat: int) -> dict:
+    """合成各阶段（文本前端、声学模型、声码器、参数调整、编码）和端到端耗时"""
+    service = TTSService(cache=None, engine=engine)
+    results = {}
+    for label, text in TEXTS.items():
+        stages = {'frontend': [], 'am': [], 'voc': []}
+        samples = None
+        for _ in range(repeat):
+            samples, sample_rate, timings = engine.synthesize(text)
+            for stage in stages:
+                stages[stage].append(timings.get(stage, 0.0))
+        for stage, values in stages.items():
+            results[f'tts.{label}.{stage}'] = summarize(values)
+
+        results[f'tts.{label}.adjust'] = summarize(time_calls(
+            lambda: adjust_audio(samples.copy(), sample_rate, speed=1.2, volume=0.8, pitch=0.9), repeat
+        ))
+        seconds = len(samples) / sample_rate
+        total = summarize(time_calls(lambda: service.text_to_speech(text, volume=0.8), repeat))
+        total['rtf'] = round(total['p50_ms'] / 1000 / seconds, 4)
+        total['audio_seconds'] = round(seconds, 2)
+        results[f'tts.{label}.total'] = total
+
+    cached = TTSService(cache=TTSCache(cache_dir=None), engine=engine)
+    cached.text_to_speech(TEXTS['medium'])
+    results['tts.cache_hit'] = summarize(time_calls(lambda: cached.text_to_speech(TEXTS['medium']), repeat))
+    return results
+
+
+def bench_codec(repeat: int, seconds: float = 10.0) -> dict:
+    """10秒回复的各格式编码耗时，以及参数调整的各场景耗时"""
+    clip = make_clip(seconds)
+    results = {}
+    for fmt in MEDIA_TYPES:
+        try:
+            encoded = encode_audio(clip, 24000, fmt)
+        except RuntimeError as e:
+            print(f'跳过{fmt}编码: {e}', file=sys.stderr)
+            continue
+        row = summarize(time_calls(lambda: encode_audio(clip, 24000, fmt), repeat))
+        row['bytes'] = len(encoded)
+        results[f'codec.encode.{fmt}'] = row
+    for case, (speed, volume, pitch) in ADJUST_CASES.items():
+        results[f'dsp.adjust.{case}'] = summarize(time_calls(
+            lambda: adjust_audio(clip.copy(), 24000, speed=speed, volume=volume, pitch=pitch), repeat
+        ))
+    return results
+
+
+def bench_asr(service, repeat: int, durations) -> dict:
+    """上传音频的解码/重采样耗时和recognize_from_wav端到端耗时"""
+    results = {}
+    uploads = {
+        'wav16k': (encode_audio(make_clip(5, ASR_SAMPLE_RATE), ASR_SAMPLE_RATE, 'wav'), None),
+        'wav48k': (encode_audio(make_clip(5, 48000), 48000, 'wav'), None),
+    }
+    try:
+        uploads['ogg'] = (encode_audio(make_clip(5, ASR_SAMPLE_RATE), ASR_SAMPLE_RATE, 'ogg'), 'audio/ogg')
+    except RuntimeError as e:
+        print(f'跳过ogg解码: {e}', file=sys.stderr)
+    for label, (data, media_type) in uploads.items():
+        results[f'asr.decode.{label}'] = summarize(time_calls(
+            lambda: to_mono_pcm16(decode_audio(data, media_type), ASR_SAMPLE_RATE), repeat
+        ))
+
+    for seconds in durations:
+        data = encode_audio(make_clip(seconds, ASR_SAMPLE_RATE), ASR_SAMPLE_RATE, 'wav')
+        row = summarize(time_calls(lambda: service.recognize_from_wav(data), repeat))
+        row['rtf'] = round(row['p50_ms'] / 1000 / seconds, 4)
+        row['audio_seconds'] = seconds
+        results[f'asr.recognize.{seconds:g}s'] = row
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TTS/ASR流水线微基准')
+    parser.add_argument('--tts-engine', default='fake', help='TTS引擎：fake/paddle/onnx')
+    parser.add_argument('--asr-engine', default='fake', help='ASR引擎：fake/vosk')
+    parser.add_argument('--asr-model', default='model', help='Vosk模型目录')
+    parser.add_argument('--fake-rtf', type=float, default=0.05, help='替身TTS引擎的实时率')
+    parser.add_argument('--onnx-model-dir', default='models/onnx', help='ONNX模型目录')
+    parser.add_argument('--onnx-threads', type=int, default=0, help='ONNX Runtime算子内线程数，0为自动')
+    parser.add_argument('--repeat', type=int, default=20, help='每项重复次数')
+    parser.add_argument('--durations', type=float, nargs='+', default=[2, 5, 10], help='ASR测试音频时长（秒）')
+    parser.add_argument('--only', nargs='+', choices=['tts', 'codec', 'asr'], default=['tts', 'codec', 'asr'],
+                        help='只运行指定部分')
+    add_report_arguments(parser)
+    args = parser.parse_args()
+
+    results = {}
+    if 'tts' in args.only:
+        engine = create_tts_engine(args.tts_engine, fake_rtf=args.fake_rtf,
+                                   onnx_model_dir=args.onnx_model_dir,
+                                   onnx_intra_op_threads=args.onnx_threads)
+        engine.load()
+        results.update(bench_tts(engine, args.repeat))
+    if 'codec' in args.only:
+        results.update(bench_codec(args.repeat))
+    if 'asr' in args.only:
+        service = create_asr_service(args.asr_engine, model_path=args.asr_model)
+        if not service.model_loaded:
+            print(f'ASR模型未加载（{args.asr_model}），跳过ASR基准', file=sys.stderr)
+        else:
+            results.update(bench_asr(service, args.repeat, args.durations))
+
+    params = {key: value for key, value in vars(args).items()
+              if key not in ('output', 'baseline', 'save_baseline', 'json')}
+    report = make_report('pipeline', params, results)
+    sys.exit(finish(report, args, print_summary_table))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动基准：各部署角色导入app.py的耗时和常驻内存
+
+每个角色在独立子进程中测量，互不影响已导入的模块。--load 额外构建该角色
+启用的服务并加载模型，记录加载耗时和加载后的内存。
+
+在backend目录下运行：
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --roles chat tts --load --repeat 3 --json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROLES = ['chat', 'tts', 'asr', 'all']
+
+# 在子进程中执行的测量代码，结果以一行JSON输出到stdout
+_PROBE = r'''
+import json, sys, time
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+result = {'baseline_rss_mb': rss_mb()}
+start = time.perf_counter()
+import app
+result['import_ms'] = (time.perf_counter() - start) * 1000
+result['import_rss_mb'] = rss_mb()
+result['modules'] = len(sys.modules)
+result['heavy_modules'] = sorted(m for m in ('numpy', 'paddle', 'paddlespeech', 'vosk') if m in sys.modules)
+
+if LOAD:
+    start = time.perf_counter()
+    try:
+        if app.registry.serves('tts'):
+            app.registry.get('tts_service').engine.load()
+        if app.registry.serves('asr'):
+            app.registry.get('asr_service')
+    except Exception as e:
+        result['load_error'] = str(e)
+    result['load_ms'] = (time.perf_counter() - start) * 1000
+    result['load_rss_mb'] = rss_mb()
+
+print('BENCH_RESULT ' + json.dumps(result))
+'''
+
+
+def measure(role: str, load: bool) -> dict:
+    """在子进程中以指定角色导入app并返回测量结果"""
+    env = dict(os.environ, SERVICE_ROLE=role, WARMUP_ENABLED='false')
+    proc = subprocess.run(
+        [sys.executable, '-c', f'LOAD = {load!r}\n' + _PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    for line in proc.stdout.splitlines():
+        if line.startswith('BENCH_RESULT '):
+            return json.loads(line[len('BENCH_RESULT '):])
+    raise RuntimeError(f"角色 {role} 测量失败:\n{proc.stderr[-2000:]}")
+
+
+def run(roles, repeat: int, load: bool):
+    results = []
+    for role in roles:
+        samples = [measure(role, load) for _ in range(repeat)]
+        row = {
+            'role': role,
+            'import_ms': round(statistics.median(s['import_ms'] for s in samples), 2),
+            'import_rss_mb': round(statistics.median(s['import_rss_mb'] for s in samples), 1),
+            'modules': samples[-1]['modules'],
+            'heavy_modules': samples[-1]['heavy_modules'],
+        }
+        if load:
+            row['load_ms'] = round(statistics.median(s['load_ms'] for s in samples), 2)
+            row['load_rss_mb'] = round(statistics.median(s['load_rss_mb'] for s in samples), 1)
+            if 'load_error' in samples[-1]:
+                row['load_error'] = samples[-1]['load_error']
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='各部署角色的启动耗时和内存基准')
+    parser.add_argument('--roles', nargs='+', default=ROLES, help='要测量的角色')
+    parser.add_argument('--repeat', type=int, default=3, help='每个角色测量次数，取中位数')
+    parser.add_argument('--load', action='store_true', help='同时测量模型加载耗时和内存')
+    parser.add_argument('--json', action='store_true', help='以JSON输出结果')
+    args = parser.parse_args()
+
+    results = run(args.roles, args.repeat, args.load)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+
+    header = f"{'role':<6} {'import(ms)':>11} {'rss(MB)':>9} {'modules':>8}"
+    if args.load:
+        header += f" {'load(ms)':>10} {'rss(MB)':>9}"
+    print(header + '  heavy')
+    for row in results:
+        line = f"{row['role']:<6} {row['import_ms']:>11.2f} {row['import_rss_mb']:>9.1f} {row['modules']:>8}"
+        if args.load:
+            line += f" {row['load_ms']:>10.2f} {row['load_rss_mb']:>9.1f}"
+        print(line + '  ' + ','.join(row['heavy_modules']))
+        if row.get('load_error'):
+            print(f"       加载失败: {row['load_error']}")
+
+
+if __name__ == '__main__':
+    main()
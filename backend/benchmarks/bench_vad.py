@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+VAD基准：检测耗时，以及识别前裁掉静音节省的识别时间
+
+测试录音模拟浏览器上传：语音前后带1-3秒静音（低电平噪声），部分带句间停顿。
+默认使用替身识别器（--asr-engine vosk 测量真实模型）。
+
+在backend目录下运行：
+    python -m benchmarks.bench_vad
+    python -m benchmarks.bench_vad --asr-engine vosk --asr-model model --repeat 10
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from benchmarks.common import add_report_arguments, finish, make_clip, make_report, summarize, time_calls
+from services.audio_codec import decode_audio, encode_audio
+from services.speech_recognition import create_asr_service
+from services.vad import VoiceActivityDetector
+
+SAMPLE_RATE = 16000
+
+# 测试录音：依次为 静音/语音 的时长（秒），静音段为偶数下标
+RECORDINGS = {
+    'short': [1.5, 2.0, 1.5],
+    'trailing': [0.5, 4.0, 3.0],
+    'pauses': [2.0, 3.0, 1.0, 2.0, 1.0, 3.0, 2.0],
+    'long': [1.0, 12.0, 0.8, 10.0, 2.0],
+    'silence': [5.0],
+}
+
+
+def make_recording(layout) -> np.ndarray:
+    """按布局拼接静音（-54dBFS噪声）和类语音信号"""
+    rng = np.random.default_rng(1)
+    parts = []
+    for index, seconds in enumerate(layout):
+        if index % 2 == 0:
+            parts.append((0.002 * rng.standard_normal(int(seconds * SAMPLE_RATE))).astype(np.float32))
+        else:
+            parts.append(make_clip(seconds, SAMPLE_RATE))
+    return np.concatenate(parts)
+
+
+def bench(plain, trimmed, vad: VoiceActivityDetector, repeat: int) -> dict:
+    results = {}
+    for label, layout in RECORDINGS.items():
+        samples = make_recording(layout)
+        data = encode_audio(samples, SAMPLE_RATE, 'wav')
+        seconds = len(samples) / SAMPLE_RATE
+        pcm = decode_audio(data).pcm
+
+        detect = summarize(time_calls(lambda: vad.detect(pcm, SAMPLE_RATE), repeat))
+        speech = sum(end - start for start, end in vad.detect(pcm, SAMPLE_RATE)) / SAMPLE_RATE
+        detect['speech_ratio'] = round(speech / seconds, 3)
+        results[f'vad.detect.{label}'] = detect
+
+        full = summarize(time_calls(lambda: plain.recognize_from_wav(data), repeat))
+        full['rtf'] = round(full['p50_ms'] / 1000 / seconds, 4)
+        results[f'asr.{label}.full'] = full
+
+        cut = summarize(time_calls(lambda: trimmed.recognize_from_wav(data), repeat))
+        cut['rtf'] = round(cut['p50_ms'] / 1000 / seconds, 4)
+        cut['saved_ms'] = round(full['p50_ms'] - cut['p50_ms'], 3)
+        cut['saved_ratio'] = round(cut['saved_ms'] / full['p50_ms'], 3) if full['p50_ms'] else 0.0
+        results[f'asr.{label}.vad'] = cut
+    return results
+
+
+def print_table(report: dict):
+    print(f"{'名称':<22} {'次数':>5} {'p50(ms)':>10} {'p95(ms)':>10} {'RTF':>7} {'语音占比':>8} {'节省(ms)':>10} {'节省比例':>8}")
+    for name, row in report['results'].items():
+        def cell(key, width, digits):
+            value = row.get(key)
+            return f'{value:>{width}.{digits}f}' if value is not None else f"{'-':>{width}}"
+        print(f"{name:<22} {row['count']:>5} {cell('p50_ms', 10, 2)} {cell('p95_ms', 10, 2)} {cell('rtf', 7, 3)} "
+              f"{cell('speech_ratio', 8, 2)} {cell('saved_ms', 10, 2)} {cell('saved_ratio', 8, 2)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='VAD静音裁剪基准')
+    parser.add_argument('--asr-engine', default='fake', help='ASR引擎：fake/vosk')
+    parser.add_argument('--asr-model', default='model', help='Vosk模型目录')
+    parser.add_argument('--fake-rtf', type=float, default=0.02, help='替身识别器的实时率')
+    parser.add_argument('--repeat', type=int, default=10, help='每项重复次数')
+    add_report_arguments(parser)
+    args = parser.parse_args()
+
+    vad = VoiceActivityDetector()
+    kwargs = {'engine': args.asr_engine, 'fake_rtf': args.fake_rtf, 'model_path': args.asr_model,
+              'sample_rate': SAMPLE_RATE}
+    plain = create_asr_service(**kwargs)
+    trimmed = create_asr_service(vad=vad, **kwargs)
+    if not plain.model_loaded:
+        print(f'ASR模型未加载（{args.asr_model}）', file=sys.stderr)
+        sys.exit(2)
+
+    params = {key: value for key, value in vars(args).items()
+              if key not in ('output', 'baseline', 'save_baseline', 'json')}
+    report = make_report('vad', params, bench(plain, trimmed, vad, args.repeat))
+    sys.exit(finish(report, args, print_table))
+
+
+if __name__ == '__main__':
+    main()
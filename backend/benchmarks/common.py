@@ -0,0 +1,211 @@
+"""
+基准测试公共工具：计时、分位数统计、JSON报告和基线对比
+
+报告格式：
+    {"kind": ..., "created": ..., "host": {...}, "params": {...},
+     "results": {名称: {"count", "errors", "error_rate", "p50_ms", "p95_ms", "p99_ms", "rtf", ...}}}
+
+与基线对比时，逐项比较两份报告中同名结果的延迟分位数、RTF和错误率（均为越小越好），
+相对变化超过容差且绝对变化超过噪声下限时判定为退化。
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from services.audio_codec import decode_audio
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 参数调整的测试场景：(语速, 音量, 音调)
+ADJUST_CASES = {
+    'volume': (1.0, 0.8, 1.0),
+    'pitch': (1.0, 1.0, 0.8),
+    'speed': (1.3, 1.0, 1.0),
+    'all': (1.3, 0.8, 0.8),
+}
+
+# 参与基线对比的指标及其噪声下限（绝对变化小于下限时不判定为退化）
+COMPARED_METRICS = {
+    'p50_ms': 1.0,
+    'p95_ms': 2.0,
+    'p99_ms': 5.0,
+    'rtf': 0.005,
+    'error_rate': 0.01,
+}
+
+
+def make_clip(seconds: float, sample_rate: int = 24000) -> np.ndarray:
+    """生成类语音的测试信号：带音节包络的谐波叠加噪声"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    f0 = 120 + 30 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+    signal = 0.3 * voiced * envelope + 0.01 * rng.standard_normal(len(t))
+    return signal.astype(np.float32)
+
+
+def time_calls(func: Callable, repeat: int, warmup: int = 1) -> List[float]:
+    """
+    多次调用并记录每次耗时
+
+    Returns:
+        list: 每次调用的耗时（毫秒），不含预热调用
+    """
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples_ms: Sequence[float], errors: int = 0) -> Dict:
+    """
+    延迟分布统计
+
+    Args:
+        samples_ms: 成功请求的耗时（毫秒）
+        errors: 失败次数
+
+    Returns:
+        dict: count、errors、error_rate、mean/p50/p95/p99/max（毫秒）
+    """
+    total = len(samples_ms) + errors
+    summary = {
+        'count': len(samples_ms),
+        'errors': errors,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+    }
+    if samples_ms:
+        values = np.asarray(samples_ms, dtype=np.float64)
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        summary.update(mean_ms=round(float(values.mean()), 3), p50_ms=round(float(p50), 3),
+                       p95_ms=round(float(p95), 3), p99_ms=round(float(p99), 3),
+                       max_ms=round(float(values.max()), 3))
+    return summary
+
+
+def audio_seconds(data: bytes, content_type: Optional[str] = None) -> float:
+    """音频内容的时长（秒），用于计算RTF"""
+    wav = decode_audio(data, content_type)
+    return wav.pcm.nbytes / (wav.sample_width * wav.channels * wav.sample_rate)
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_report(kind: str, params: Dict, results: Dict[str, Dict]) -> Dict:
+    return {
+        'kind': kind,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git': _git_revision(),
+        'host': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'params': params,
+        'results': results,
+    }
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float = 0.1) -> List[Dict]:
+    """
+    与基线报告逐项对比
+
+    Args:
+        report: 本次报告
+        baseline: 基线报告
+        tolerance: 允许的相对退化比例
+
+    Returns:
+        list: 每项 {'name', 'metric', 'baseline', 'current', 'change', 'regressed'}
+    """
+    rows = []
+    for name, result in report['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            continue
+        for metric, floor in COMPARED_METRICS.items():
+            current, previous = result.get(metric), base.get(metric)
+            if current is None or previous is None:
+                continue
+            delta = current - previous
+            change = delta / previous if previous else (float('inf') if delta > 0 else 0.0)
+            rows.append({
+                'name': name,
+                'metric': metric,
+                'baseline': previous,
+                'current': current,
+                'change': round(change, 4),
+                'regressed': change > tolerance and delta > floor,
+            })
+    return rows
+
+
+def add_report_arguments(parser):
+    """报告输出和基线对比的公共命令行参数"""
+    parser.add_argument('--output', '-o', help='报告输出路径（JSON）')
+    parser.add_argument('--baseline', help='基线报告路径，与之对比并在退化时以状态码1退出')
+    parser.add_argument('--save-baseline', help='将本次报告另存为基线')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='允许的相对退化比例，默认0.1')
+    parser.add_argument('--json', action='store_true', help='以JSON输出报告')
+
+
+def finish(report: Dict, args, print_table: Callable[[Dict], None]) -> int:
+    """
+    输出报告、保存基线并与基线对比
+
+    Returns:
+        int: 进程退出码，存在退化时为1
+    """
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_table(report)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f'报告已写入 {path}', file=sys.stderr)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    rows = compare(report, baseline, args.tolerance)
+    regressions = [row for row in rows if row['regressed']]
+    print(f"\n与基线对比（{args.baseline}，容差 {args.tolerance:.0%}）：{len(rows)}项，退化{len(regressions)}项",
+          file=sys.stderr)
+    for row in regressions:
+        print(f"  退化 {row['name']} {row['metric']}: {row['baseline']} -> {row['current']} "
+              f"({row['change']:+.1%})", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def print_summary_table(report: Dict):
+    """按名称输出各项结果的分位数和RTF"""
+    def cell(value, width, digits):
+        return f'{value:>{width}.{digits}f}' if value is not None else f"{'-':>{width}}"
+
+    print(f"{'名称':<32} {'次数':>6} {'错误':>5} {'p50(ms)':>10} {'p95(ms)':>10} {'p99(ms)':>10} {'RTF':>7}")
+    for name, row in report['results'].items():
+        print(f"{name:<32} {row['count']:>6} {row['errors']:>5} {cell(row.get('p50_ms'), 10, 2)} "
+              f"{cell(row.get('p95_ms'), 10, 2)} {cell(row.get('p99_ms'), 10, 2)} {cell(row.get('rtf'), 7, 3)}")
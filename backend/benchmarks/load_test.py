@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+开环负载生成器：按固定速率向本地实例发送请求，统计各接口的延迟分位数、RTF和错误
+
+开环：请求按计划时间发出，不等待前一个请求完成。延迟从计划发送时间算起，
+客户端并发用满时的排队时间也计入延迟，避免协调遗漏（coordinated omission）低估尾延迟。
+
+接口：chat、tts、tts-stream、asr、voice-turn
+
+在backend目录下运行：
+    python -m benchmarks.load_test --spawn                  # 以替身引擎启动本地实例并测试全部接口
+    python -m benchmarks.load_test --url http://127.0.0.1:5000 --endpoints tts asr --rps 5 --duration 30
+    python -m benchmarks.load_test --spawn --server asgi --env TTS_WORKERS=2 --baseline baseline.json
+"""
+
+import argparse
+import base64
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.common import (BACKEND_DIR, add_report_arguments, audio_seconds, finish, make_clip, make_report,
+                               print_summary_table, summarize)
+from services.audio_codec import encode_audio, media_type
+
+ENDPOINTS = ['chat', 'tts', 'tts-stream', 'asr', 'voice-turn']
+
+TEXTS = [
+    '您好，欢迎使用语音服务。',
+    '感谢您的提问，我会尽力为您解答。',
+    '这个问题比较复杂，让我详细解释一下。',
+    '根据我的分析，您可能需要了解这方面的信息。',
+    '好的，我来帮您处理这个问题。以下是我的建议。',
+]
+
+
+class RequestFailed(Exception):
+    """请求失败（非2xx状态码或响应内容不完整），消息用于错误分类"""
+
+
+class Sample:
+    """一次请求的计时：计划发送、实际发送、首个音频/首字节、完成时间"""
+
+    __slots__ = ('scheduled', 'started', 'first_byte', 'finished', 'audio_seconds', 'error')
+
+    def __init__(self, scheduled: float):
+        self.scheduled = scheduled
+        self.started = None
+        self.first_byte = None
+        self.finished = None
+        self.audio_seconds = None
+        self.error = None
+
+
+class Client:
+    """每个工作线程一个长连接，出错后重建"""
+
+    def __init__(self, url: str, timeout: float):
+        parsed = urllib.parse.urlsplit(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.timeout = timeout
+        self._conn = None
+
+    def request(self, method: str, path: str, body: bytes = None, headers: Dict = None) -> http.client.HTTPResponse:
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self._conn.request(method, path, body=body, headers=headers or {})
+            return self._conn.getresponse()
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _check(response: http.client.HTTPResponse):
+    if response.status >= 300:
+        response.read()
+        raise RequestFailed(f'HTTP {response.status}')
+
+
+def _post_json(client: Client, path: str, data: Dict) -> http.client.HTTPResponse:
+    body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    return client.request('POST', path, body, {'Content-Type': 'application/json'})
+
+
+class Workload:
+    """
+    各接口的请求构造和响应解析
+
+    Args:
+        output_format: TTS和语音对话请求的音频格式
+        asr_seconds: ASR和语音对话上传音频的时长
+        quality: TTS和语音对话请求的质量档位，None表示使用服务的默认档位
+    """
+
+    def __init__(self, output_format: str = 'wav', asr_seconds: float = 5.0, quality: Optional[str] = None):
+        self.output_format = output_format
+        self.asr_seconds = asr_seconds
+        self.tts_options = {'format': output_format}
+        if quality:
+            self.tts_options['quality'] = quality
+        self.asr_audio = encode_audio(make_clip(asr_seconds, 16000), 16000, 'wav')
+
+    def get(self, name: str) -> Callable[[Client, int, Sample], None]:
+        return getattr(self, name.replace('-', '_'))
+
+    def chat(self, client: Client, index: int, sample: Sample):
+        response = _post_json(client, '/api/chat', {'message': TEXTS[index % len(TEXTS)], 'tts': False})
+        sample.first_byte = time.perf_counter()
+        _check(response)
+        json.loads(response.read())
+
+    def tts(self, client: Client, index: int, sample: Sample):
+        response = _post_json(client, '/api/tts', {'text': TEXTS[index % len(TEXTS)], **self.tts_options})
+        sample.first_byte = time.perf_counter()
+        _check(response)
+        sample.audio_seconds = audio_seconds(response.read(), response.getheader('Content-Type'))
+
+    def tts_stream(self, client: Client, index: int, sample: Sample):
+        text = TEXTS[index % len(TEXTS)] + TEXTS[(index + 1) % len(TEXTS)]
+        response = _post_json(client, '/api/tts', {'text': text, **self.tts_options, 'stream': True})
+        _check(response)
+        frame_type = media_type(self.output_format, int(response.getheader('X-Audio-Sample-Rate') or 24000))
+        total = 0.0
+        while True:
+            header = response.read(4)
+            if len(header) < 4:
+                raise RequestFailed('音频流未完整结束')
+            length = int.from_bytes(header, 'big')
+            if length == 0:
+                break
+            frame = response.read(length)
+            if sample.first_byte is None:
+                sample.first_byte = time.perf_counter()
+            total += audio_seconds(frame, frame_type)
+        sample.audio_seconds = total
+
+    def asr(self, client: Client, index: int, sample: Sample):
+        response = client.request('POST', '/api/asr', self.asr_audio, {'Content-Type': 'audio/wav'})
+        sample.first_byte = time.perf_counter()
+        _check(response)
+        json.loads(response.read())
+        sample.audio_seconds = self.asr_seconds
+
+    def voice_turn(self, client: Client, index: int, sample: Sample):
+        query = urllib.parse.urlencode({'tts': json.dumps(self.tts_options)})
+        response = client.request('POST', f'/api/voice-turn?{query}', self.asr_audio, {'Content-Type': 'audio/wav'})
+        _check(response)
+        total = 0.0
+        done = False
+        for line in response:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if event['type'] == 'audio':
+                if sample.first_byte is None:
+                    sample.first_byte = time.perf_counter()
+                total += audio_seconds(base64.b64decode(event['audio']), event.get('media_type'))
+            elif event['type'] == 'error':
+                raise RequestFailed(f"{event.get('stage')}阶段失败")
+            elif event['type'] == 'done':
+                done = True
+        if not done:
+            raise RequestFailed('事件流未完整结束')
+        sample.audio_seconds = total
+
+
+def run_open_loop(url: str, send: Callable, rps: float, duration: float, concurrency: int,
+                  timeout: float) -> (List[Sample], float):
+    """
+    按固定速率发送请求
+
+    Args:
+        url: 服务地址
+        send: 发送一次请求的函数 (client, 序号, sample)
+        rps: 目标请求速率
+        duration: 持续时间（秒）
+        concurrency: 客户端最大并发数
+        timeout: 单个请求的超时（秒）
+
+    Returns:
+        tuple: (全部请求的计时, 从开始到最后一个请求完成的耗时)
+    """
+    local = threading.local()
+    clients = []
+    clients_lock = threading.Lock()
+
+    def execute(index: int, sample: Sample):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client(url, timeout)
+            with clients_lock:
+                clients.append(client)
+        sample.started = time.perf_counter()
+        try:
+            send(client, index, sample)
+        except RequestFailed as e:
+            sample.error = str(e)
+        except socket.timeout:
+            sample.error = 'timeout'
+            client.close()
+        except Exception as e:
+            sample.error = type(e).__name__
+            client.close()
+        sample.finished = time.perf_counter()
+
+    samples = []
+    total = max(1, int(rps * duration))
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='load') as executor:
+        start = time.perf_counter()
+        for index in range(total):
+            scheduled = start + index / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            sample = Sample(scheduled)
+            samples.append(sample)
+            executor.submit(execute, index, sample)
+    elapsed = max(s.finished for s in samples) - start
+    for client in clients:
+        client.close()
+    return samples, elapsed
+
+
+def summarize_samples(samples: List[Sample], elapsed: float) -> Dict:
+    """延迟（从计划发送时间算起）、服务耗时、首个音频耗时、RTF和错误分类"""
+    ok = [s for s in samples if s.error is None]
+    row = summarize([(s.finished - s.scheduled) * 1000 for s in ok], errors=len(samples) - len(ok))
+    row['achieved_rps'] = round(len(ok) / elapsed, 3) if elapsed > 0 else 0.0
+    service = summarize([(s.finished - s.started) * 1000 for s in ok])
+    if ok:
+        row['service_p50_ms'] = service['p50_ms']
+        row['service_p95_ms'] = service['p95_ms']
+    first = summarize([(s.first_byte - s.scheduled) * 1000 for s in ok if s.first_byte is not None])
+    if first['count']:
+        row['first_byte_p50_ms'] = first['p50_ms']
+        row['first_byte_p95_ms'] = first['p95_ms']
+    rtfs = sorted((s.finished - s.scheduled) / s.audio_seconds for s in ok if s.audio_seconds)
+    if rtfs:
+        row['rtf'] = round(rtfs[len(rtfs) // 2], 4)
+    error_kinds = {}
+    for s in samples:
+        if s.error is not None:
+            error_kinds[s.error] = error_kinds.get(s.error, 0) + 1
+    if error_kinds:
+        row['error_kinds'] = error_kinds
+    return row
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def spawn_server(server: str, extra_env: Dict[str, str], ready_timeout: float = 120.0):
+    """
+    以替身引擎启动本地实例，就绪后返回地址，退出时关闭
+
+    Args:
+        server: flask（开发服务器）或 asgi（uvicorn）
+        extra_env: 额外的环境变量，可覆盖默认的替身引擎配置
+        ready_timeout: 等待就绪探针返回200的超时（秒）
+    """
+    port = _free_port()
+    env = dict(os.environ, TTS_ENGINE='fake', ASR_ENGINE='fake', LOG_FILE='',
+               TTS_CACHE_ENABLED='false', TTS_PREFETCH_CANNED='false')
+    env.update(extra_env)
+    if server == 'asgi':
+        command = [sys.executable, '-m', 'uvicorn', 'asgi_app:app', '--host', '127.0.0.1',
+                   '--port', str(port), '--log-level', 'warning']
+    else:
+        command = [sys.executable, '-c',
+                   f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+
+    with tempfile.TemporaryFile() as log:
+        # 独立进程组：退出时连同推理工作进程一起结束
+        process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+                                   start_new_session=True)
+        url = f'http://127.0.0.1:{port}'
+        try:
+            deadline = time.monotonic() + ready_timeout
+            while True:
+                if process.poll() is not None:
+                    log.seek(0)
+                    raise RuntimeError(f"服务进程已退出:\n{log.read()[-2000:].decode('utf-8', 'replace')}")
+                try:
+                    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+                    connection.request('GET', '/health/ready')
+                    if connection.getresponse().status == 200:
+                        break
+                except OSError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError('等待服务就绪超时')
+                time.sleep(0.2)
+            print(f'已启动本地实例（{server}）: {url}', file=sys.stderr)
+            yield url
+        finally:
+            os.killpg(process.pid, signal.SIGTERM)
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+
+
+def run(url: str, args) -> Dict[str, Dict]:
+    workload = Workload(args.format, args.asr_seconds, args.quality)
+    results = {}
+    for name in args.endpoints:
+        send = workload.get(name)
+        # 预热一次：建立连接并触发服务的懒加载
+        warm = Sample(time.perf_counter())
+        client = Client(url, args.timeout)
+        try:
+            send(client, 0, warm)
+        except Exception as e:
+            print(f'{name} 预热请求失败: {e}', file=sys.stderr)
+        finally:
+            client.close()
+
+        print(f'{name}: {args.rps} req/s，持续{args.duration}秒，并发上限{args.concurrency}', file=sys.stderr)
+        samples, elapsed = run_open_loop(url, send, args.rps, args.duration, args.concurrency, args.timeout)
+        results[name] = summarize_samples(samples, elapsed)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='开环负载测试')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='服务地址（与--spawn同时使用时忽略）')
+    parser.add_argument('--spawn', action='store_true', help='以替身引擎启动本地实例进行测试')
+    parser.add_argument('--server', choices=['flask', 'asgi'], default='flask', help='--spawn启动的服务类型')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='--spawn启动实例的额外环境变量，可重复')
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=ENDPOINTS, help='测试的接口')
+    parser.add_argument('--rps', type=float, default=5.0, help='每个接口的目标请求速率')
+    parser.add_argument('--duration', type=float, default=20.0, help='每个接口的测试时长（秒）')
+    parser.add_argument('--concurrency', type=int, default=32, help='客户端最大并发数')
+    parser.add_argument('--timeout', type=float, default=60.0, help='单个请求的超时（秒）')
+    parser.add_argument('--format', default='wav', help='TTS和语音对话请求的音频格式')
+    parser.add_argument('--quality', choices=['fast', 'balanced', 'high'], help='TTS质量档位，默认使用服务的默认档位')
+    parser.add_argument('--asr-seconds', type=float, default=5.0, help='上传音频时长（秒）')
+    add_report_arguments(parser)
+    args = parser.parse_args()
+
+    if args.spawn:
+        extra_env = dict(item.split('=', 1) for item in args.env)
+        with spawn_server(args.server, extra_env) as url:
+            results = run(url, args)
+    else:
+        results = run(args.url, args)
+
+    params = {key: value for key, value in vars(args).items()
+              if key not in ('output', 'baseline', 'save_baseline', 'json')}
+    report = make_report('load', params, results)
+    sys.exit(finish(report, args, print_summary_table))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,385 @@
+"""
+服务装配：日志、服务注册表、性能指标仪表和启动预热
+
+WSGI入口（app.py）和ASGI入口（asgi_app.py）共用同一套服务。
+"""
+
+import logging
+import multiprocessing
+
+from config import Config
+from logging_setup import setup_logging
+# 服务模块按需导入（见下方注册表的工厂函数），避免启动时加载PaddleSpeech、Vosk等重量级依赖
+from services.inference_scheduler import InferenceScheduler, ScheduledTTSEngine
+from services.metrics import metrics
+from services.readiness import ReadinessProbe, start_warm_up
+from services.registry import ServiceRegistry
+
+def is_inference_worker():
+    """spawn方式启动的推理工作进程会以__mp_main__重新导入入口模块，此时不初始化日志和预热"""
+    return multiprocessing.parent_process() is not None
+
+# 配置日志：请求线程只入队，后台线程负责写控制台和滚动日志文件
+log_handler = None
+if not is_inference_worker():
+    log_handler = setup_logging(
+        level=Config.LOG_LEVEL,
+        log_file=Config.LOG_FILE,
+        max_bytes=Config.LOG_MAX_BYTES,
+        backup_count=Config.LOG_BACKUP_COUNT,
+        json_format=Config.LOG_JSON,
+        debug_sample_rate=Config.LOG_DEBUG_SAMPLE_RATE,
+        queue_size=Config.LOG_QUEUE_SIZE
+    )
+
+logger = logging.getLogger(__name__)
+
+# 服务注册表：服务在首次使用时构建，只启用SERVICE_ROLE对应的服务
+registry = ServiceRegistry(Config.SERVICE_ROLE)
+
+def _build_tts_cache():
+    """TTS音频缓存"""
+    if not Config.TTS_CACHE_ENABLED:
+        return None
+    from services.tts_cache import TTSCache
+    return TTSCache(
+        max_memory_items=Config.TTS_CACHE_MEMORY_ITEMS,
+        max_memory_bytes=Config.TTS_CACHE_MEMORY_BYTES,
+        cache_dir=Config.TTS_CACHE_DIR,
+        max_disk_bytes=Config.TTS_CACHE_DISK_BYTES
+    )
+
+def _tts_quality_tiers():
+    """各质量档位的声码器和输出采样率"""
+    from services.tts_quality import QualityTier
+    return {
+        'fast': QualityTier('fast', Config.TTS_QUALITY_FAST_VOC, Config.TTS_QUALITY_FAST_SAMPLE_RATE),
+        'balanced': QualityTier('balanced', Config.TTS_QUALITY_BALANCED_VOC, Config.TTS_QUALITY_BALANCED_SAMPLE_RATE),
+        'high': QualityTier('high', Config.TTS_QUALITY_HIGH_VOC, Config.TTS_QUALITY_HIGH_SAMPLE_RATE),
+    }
+
+def _tts_engine_kwargs():
+    """合成引擎参数（进程内引擎和TTS工作进程共用）"""
+    from tts_service import TTSService
+    return {
+        'engine': Config.TTS_ENGINE,
+        'fake_rtf': Config.FAKE_TTS_RTF,
+        'onnx_model_dir': Config.TTS_ONNX_MODEL_DIR,
+        'onnx_intra_op_threads': Config.TTS_ONNX_INTRA_OP_THREADS,
+        'onnx_inter_op_threads': Config.TTS_ONNX_INTER_OP_THREADS,
+        'am': TTSService.DEFAULT_PARAMS['am'],
+        'voc': TTSService.DEFAULT_PARAMS['voc'],
+        'lang': TTSService.DEFAULT_PARAMS['lang'],
+        'frontend_cache_items': Config.TTS_FRONTEND_CACHE_ITEMS,
+        'extra_vocoders': ([tier.voc for tier in _tts_quality_tiers().values()]
+                           if Config.TTS_QUALITY_PRELOAD else [])
+    }
+
+def _build_asr_vad():
+    """上传音频识别前的语音活动检测，未启用时为None"""
+    if not Config.ASR_VAD_ENABLED:
+        return None
+    from services.vad import VoiceActivityDetector
+    return VoiceActivityDetector(
+        energy_margin_db=Config.ASR_VAD_ENERGY_MARGIN_DB,
+        max_noise_floor_db=Config.ASR_VAD_MAX_NOISE_FLOOR_DB,
+        min_energy_db=Config.ASR_VAD_MIN_ENERGY_DB,
+        min_silence_ms=Config.ASR_VAD_MIN_SILENCE_MS,
+        padding_ms=Config.ASR_VAD_PADDING_MS,
+        max_segment_seconds=Config.ASR_VAD_MAX_SEGMENT_SECONDS,
+        drop_silence=Config.ASR_VAD_DROP_SILENCE
+    )
+
+def _asr_service_kwargs():
+    """识别服务参数（进程内服务和ASR工作进程共用）"""
+    return {
+        'engine': Config.ASR_ENGINE,
+        'fake_rtf': Config.FAKE_ASR_RTF,
+        'model_path': Config.ASR_MODEL_PATH,
+        'sample_rate': Config.SAMPLE_RATE,
+        'vad': _build_asr_vad()
+    }
+
+def _build_scheduler():
+    """推理调度器：TTS/ASR推理在预加载模型的工作进程中执行，未启用的角色不创建进程池"""
+    return InferenceScheduler(
+        tts_workers=Config.TTS_WORKERS if registry.serves('tts') else 0,
+        asr_workers=Config.ASR_WORKERS if registry.serves('asr') else 0,
+        max_queue=Config.INFERENCE_MAX_QUEUE,
+        retry_after=Config.INFERENCE_RETRY_AFTER,
+        tts_engine_kwargs=_tts_engine_kwargs() if registry.serves('tts') else None,
+        asr_kwargs=dict(_asr_service_kwargs(), pool_size=1),
+        start_method=Config.INFERENCE_START_METHOD,
+        log_level=Config.LOG_LEVEL
+    )
+
+def _build_tts_quality():
+    """质量档位选择（可选按负载自适应降档）"""
+    from tts_service import TTSService
+    from services.tts_quality import QualitySelector, mismatched_vocoders
+    tiers = _tts_quality_tiers()
+    for name, voc in mismatched_vocoders(TTSService.DEFAULT_PARAMS['am'], tiers).items():
+        logger.warning("质量档位%s的声码器%s与声学模型%s的训练数据不同，音质会明显下降",
+                       name, voc, TTSService.DEFAULT_PARAMS['am'])
+    return QualitySelector(
+        tiers=tiers,
+        default=Config.TTS_QUALITY_DEFAULT,
+        adaptive=Config.TTS_QUALITY_ADAPTIVE,
+        capacity=Config.TTS_WORKERS or 1,
+        max_queue=Config.TTS_QUALITY_MAX_QUEUE,
+        max_p95_ms=Config.TTS_QUALITY_MAX_P95_MS,
+        window_seconds=Config.TTS_QUALITY_WINDOW_SECONDS,
+        hold_seconds=Config.TTS_QUALITY_HOLD_SECONDS
+    )
+
+def _build_tts_service():
+    """
+    TTS服务：启用TTS工作进程时合成任务提交给调度器，
+    否则可选在进程内对并发请求的声学模型推理做动态批处理
+    """
+    from tts_service import TTSService
+    from services.tts_engine import create_tts_engine
+    scheduler = registry.get('scheduler')
+    if scheduler.tts is not None:
+        engine = ScheduledTTSEngine(
+            scheduler,
+            sample_rate=TTSService.DEFAULT_PARAMS['sample_rate'],
+            timeout=Config.INFERENCE_TIMEOUT
+        )
+    else:
+        engine = create_tts_engine(**_tts_engine_kwargs())
+        if Config.TTS_BATCH_ENABLED and not engine.supports_batching:
+            logger.warning("TTS引擎 %s 不支持声学模型批处理，忽略TTS_BATCH_ENABLED", Config.TTS_ENGINE)
+        elif Config.TTS_BATCH_ENABLED:
+            from services.tts_batcher import BatchingTTSEngine
+            engine = BatchingTTSEngine(
+                engine,
+                max_wait_ms=Config.TTS_BATCH_MAX_WAIT_MS,
+                max_batch=Config.TTS_BATCH_MAX_SIZE
+            )
+    return TTSService(cache=registry.get('tts_cache'), engine=engine, quality=_build_tts_quality())
+
+def _build_asr_service():
+    """ASR服务（进程内识别和流式识别使用）"""
+    from services.speech_recognition import create_asr_service
+    return create_asr_service(
+        pool_size=Config.ASR_POOL_SIZE,
+        pool_timeout=Config.ASR_POOL_TIMEOUT,
+        **_asr_service_kwargs()
+    )
+
+def _build_batch_asr():
+    """批量识别进程池（与交互请求的ASR工作进程分开）"""
+    from services.batch_asr import BatchTranscriber
+    return BatchTranscriber(
+        workers=Config.ASR_BATCH_WORKERS,
+        asr_kwargs=dict(_asr_service_kwargs(), pool_size=1),
+        start_method=Config.INFERENCE_START_METHOD,
+        log_level=Config.LOG_LEVEL
+    )
+
+def _build_session_store():
+    """对话会话存储"""
+    from services.session_store import SessionStore
+    return SessionStore(
+        ttl=Config.CHAT_SESSION_TTL,
+        max_turns=Config.CHAT_SESSION_MAX_TURNS,
+        max_tokens=Config.CHAT_SESSION_MAX_TOKENS,
+        max_sessions=Config.CHAT_SESSION_MAX_SESSIONS,
+        max_bytes=Config.CHAT_SESSION_MAX_BYTES
+    )
+
+def _build_chat_service():
+    """AI对话模拟服务"""
+    from services.ai_simulation import AISimulationService
+    return AISimulationService(
+        response_delay=Config.AI_RESPONSE_DELAY,
+        session_store=registry.get('session_store')
+    )
+
+def _build_speech_prefetcher():
+    """回复语音预取，未启用时为None"""
+    if not Config.TTS_PREFETCH_ENABLED:
+        return None
+    from services.speech_prefetch import SpeechPrefetcher
+    return SpeechPrefetcher(
+        registry.get('tts_service'),
+        max_workers=Config.TTS_PREFETCH_WORKERS,
+        ttl=Config.TTS_PREFETCH_TTL,
+        max_handles=Config.TTS_PREFETCH_MAX_HANDLES
+    )
+
+def _build_voice_turn():
+    """语音对话流水线（对话+分句合成），当前角色不提供TTS时只能处理不需要语音的请求"""
+    from services.voice_turn import VoiceTurnPipeline
+    return VoiceTurnPipeline(
+        registry.get('chat_service'),
+        registry.get('tts_service') if registry.serves('tts') else None,
+        max_workers=Config.VOICE_TURN_TTS_WORKERS,
+        max_sentence_chars=Config.TTS_STREAM_MAX_SENTENCE_CHARS
+    )
+
+registry.register('scheduler', _build_scheduler)
+registry.register('session_store', _build_session_store, 'chat')
+registry.register('chat_service', _build_chat_service, 'chat')
+registry.register('tts_cache', _build_tts_cache, 'tts')
+registry.register('tts_service', _build_tts_service, 'tts')
+registry.register('speech_prefetcher', _build_speech_prefetcher, 'tts')
+registry.register('asr_service', _build_asr_service, 'asr')
+registry.register('batch_asr', _build_batch_asr, 'asr')
+# 每个语音对话轮次都需要识别，合成可选（tts=false时不需要），按asr能力启用
+registry.register('voice_turn', _build_voice_turn, 'asr')
+
+def prefetch_reply_speech(reply, data):
+    """
+    /api/chat确定回复后提交语音预取
+
+    Args:
+        reply: 回复文本
+        data: 聊天请求体，带 tts: {speed, volume, pitch, format, quality}（或true，使用默认参数）时才预取
+
+    Returns:
+        str: 预取音频的URL，当前角色不提供TTS、未启用预取或客户端未请求时为None
+    """
+    # 只为声明需要后端语音的客户端合成，不请求audio_url的客户端不占用推理资源
+    tts_options = data.get('tts')
+    if not tts_options or not registry.serves('tts'):
+        return None
+    if not isinstance(tts_options, dict):
+        tts_options = {}
+    # 预取只是优化，失败时客户端照常请求/api/tts
+    try:
+        prefetcher = registry.peek('speech_prefetcher')
+        if prefetcher is None:
+            # 在请求线程（ASGI下为事件循环）中调用，TTS服务尚未构建（模型仍在加载）时不等待
+            if registry.peek('tts_service') is None:
+                return None
+            prefetcher = registry.get('speech_prefetcher')
+        if prefetcher is None:
+            return None
+        handle = prefetcher.prefetch(
+            reply,
+            speed=tts_options.get('speed', 1.0),
+            volume=tts_options.get('volume', 1.0),
+            pitch=tts_options.get('pitch', 1.0),
+            output_format=tts_options.get('format') or 'wav',
+            quality=tts_options.get('quality')
+        )
+    except Exception as e:
+        logger.warning("提交回复语音预取失败: %s", e)
+        return None
+    return f'{Config.API_PREFIX}/tts/prefetch/{handle}'
+
+# ---- 性能指标 ----
+
+def _inference_pools():
+    scheduler = registry.peek('scheduler')
+    if scheduler is None:
+        return []
+    return [(kind, pool) for kind, pool in (('tts', scheduler.tts), ('asr', scheduler.asr)) if pool is not None]
+
+def _inference_queue_depth():
+    return {(kind,): pool.queue_depth for kind, pool in _inference_pools()}
+
+def _inference_in_flight():
+    return {(kind,): pool.get_stats()['in_flight'] for kind, pool in _inference_pools()}
+
+def _asr_recognizers_in_use():
+    asr_service = registry.peek('asr_service')
+    if asr_service is None:
+        return None
+    return {(pool['sample_rate'],): pool['in_use'] for pool in asr_service.get_stats()['pools']}
+
+def _chat_sessions():
+    session_store = registry.peek('session_store')
+    return session_store.get_stats()['sessions'] if session_store is not None else None
+
+def _tts_quality_level():
+    tts_service = registry.peek('tts_service')
+    return tts_service.quality.level if tts_service is not None else None
+
+def _tts_batch_queue():
+    tts_service = registry.peek('tts_service')
+    if tts_service is None or not hasattr(tts_service.engine, 'batcher'):
+        return None
+    return tts_service.engine.get_stats()['queued']
+
+metrics.gauge('mouth_inference_queue_depth', '推理工作进程池排队中的任务数', _inference_queue_depth, ['kind'])
+metrics.gauge('mouth_inference_in_flight', '推理工作进程池在途任务数（执行中+排队）', _inference_in_flight, ['kind'])
+metrics.gauge('mouth_asr_recognizers_in_use', '已借出的Vosk识别器数', _asr_recognizers_in_use, ['sample_rate'])
+metrics.gauge('mouth_chat_sessions', '服务端保存的对话会话数', _chat_sessions)
+metrics.gauge('mouth_tts_batch_queue', '等待凑批的声学模型请求数', _tts_batch_queue)
+metrics.gauge('mouth_tts_quality_level', 'TTS自适应降档级数（0为不降档）', _tts_quality_level)
+metrics.gauge('mouth_log_records_dropped', '日志队列已满而丢弃的日志记录数',
+              lambda: log_handler.dropped if log_handler is not None else None)
+
+def get_inference_stats():
+    """
+    推理统计：调度器队列、动态批处理、文本前端缓存、质量档位、语音预取、对话会话、批量识别和服务构建情况
+    
+    Returns:
+        dict: /api/inference/stats 的响应内容
+    """
+    stats = registry.get('scheduler').get_stats()
+    tts_service = registry.peek('tts_service')
+    tts_engine = tts_service.engine if tts_service is not None else None
+    # 仅BatchingTTSEngine带批处理统计，按属性判断以免为类型检查导入批处理模块
+    stats['tts_batching'] = tts_engine.get_stats() if hasattr(tts_engine, 'batcher') else None
+    # 文本前端缓存在进程内引擎上（启用TTS工作进程时在各工作进程内，此处不可见）
+    paddle_engine = getattr(tts_engine, 'engine', tts_engine)
+    frontend_cache = getattr(paddle_engine, 'frontend_cache', None)
+    stats['tts_frontend_cache'] = frontend_cache.get_stats() if frontend_cache is not None else None
+    stats['tts_quality'] = tts_service.quality.get_stats() if tts_service is not None else None
+    prefetcher = registry.peek('speech_prefetcher')
+    stats['tts_prefetch'] = prefetcher.get_stats() if prefetcher is not None else None
+    session_store = registry.peek('session_store')
+    stats['chat_sessions'] = session_store.get_stats() if session_store is not None else None
+    batch_asr = registry.peek('batch_asr')
+    stats['asr_batch'] = batch_asr.get_stats() if batch_asr is not None else None
+    stats['services'] = registry.get_stats()
+    return stats
+
+# 就绪状态：模型加载和预热完成后才接收流量
+readiness = ReadinessProbe()
+_warm_up_started = False
+
+def _resolve_startup_services():
+    """在预热线程中构建当前角色启用的服务"""
+    tts_engine = registry.get('tts_service').engine if registry.serves('tts') else None
+    asr_service = registry.get('asr_service') if registry.serves('asr') else None
+    return tts_engine, asr_service, registry.get('scheduler')
+
+def _prefetch_canned_replies():
+    """预合成AI模拟服务的全部固定回复（写入TTS音频缓存），合成在预取线程池中进行"""
+    if not (Config.TTS_PREFETCH_CANNED and registry.serves('tts')):
+        return
+    prefetcher = registry.get('speech_prefetcher')
+    if prefetcher is None:
+        return
+    # 只读取回复列表，tts角色单独部署时也可使用
+    from services.ai_simulation import AISimulationService
+    voices = [
+        {'speed': Config.TTS_SPEED, 'volume': Config.TTS_PREFETCH_VOLUME, 'pitch': pitch,
+         'output_format': Config.TTS_PREFETCH_FORMAT}
+        for pitch in Config.TTS_PREFETCH_PITCHES
+    ]
+    prefetcher.prefetch_canned(AISimulationService(response_delay=0).canned_responses(), voices)
+
+def start_startup():
+    """启动预热：后台加载模型并预热，预热成功后预合成固定回复，期间存活探针正常响应；重复调用无效"""
+    global _warm_up_started
+    if _warm_up_started or is_inference_worker():
+        return
+    _warm_up_started = True
+    if not Config.WARMUP_ENABLED:
+        readiness.set_status('ready')
+        return
+    start_warm_up(
+        readiness,
+        _resolve_startup_services,
+        after=_prefetch_canned_replies,
+        text=Config.WARMUP_TEXT,
+        min_rounds=Config.WARMUP_MIN_ROUNDS,
+        max_rounds=Config.WARMUP_MAX_ROUNDS,
+        tolerance=Config.WARMUP_STEADY_TOLERANCE
+    )
@@ -1,5 +1,21 @@
 import os
 
+
+def _env_int(name, default):
+    return int(os.environ.get(name) or default)
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name) or default)
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
 class Config:
     """应用配置类"""
     
@@ -10,16 +26,131 @@ class Config:
     # API配置
     API_PREFIX = '/api'
     
+    # 部署角色：all/chat/tts/asr，可逗号组合（如 tts,asr），只加载对应的服务
+    SERVICE_ROLE = os.environ.get('SERVICE_ROLE') or 'all'
+    
+    # 推理引擎：fake为不加载模型的替身引擎（按设定的实时率占用时间），用于基准测试和CI
+    TTS_ENGINE = os.environ.get('TTS_ENGINE') or 'paddle'  # paddle/onnx/fake
+    ASR_ENGINE = os.environ.get('ASR_ENGINE') or 'vosk'  # vosk/fake
+    FAKE_TTS_RTF = _env_float('FAKE_TTS_RTF', 0.05)
+    FAKE_ASR_RTF = _env_float('FAKE_ASR_RTF', 0.02)
+    # ONNX Runtime引擎（TTS_ENGINE=onnx）：模型由 python -m tools.export_onnx 导出
+    TTS_ONNX_MODEL_DIR = os.environ.get('TTS_ONNX_MODEL_DIR') or os.path.join('models', 'onnx')
+    TTS_ONNX_INTRA_OP_THREADS = _env_int('TTS_ONNX_INTRA_OP_THREADS', 0)  # 算子内线程数，0表示默认值（物理核数）
+    TTS_ONNX_INTER_OP_THREADS = _env_int('TTS_ONNX_INTER_OP_THREADS', 0)  # 算子间线程数，0表示默认值
+    
     # AI模拟配置
     AI_RESPONSE_DELAY = 0.5  # AI响应延迟（秒）
     
+    # 对话会话存储：上下文按dialogue_id保存在服务端，客户端每轮只发送新消息
+    CHAT_SESSION_TTL = _env_float('CHAT_SESSION_TTL', 1800.0)  # 会话闲置超时（秒）
+    CHAT_SESSION_MAX_TURNS = _env_int('CHAT_SESSION_MAX_TURNS', 20)  # 每个会话保留的轮次数
+    CHAT_SESSION_MAX_TOKENS = _env_int('CHAT_SESSION_MAX_TOKENS', 2000)  # 每个会话保留的估算token数
+    CHAT_SESSION_MAX_SESSIONS = _env_int('CHAT_SESSION_MAX_SESSIONS', 10000)
+    CHAT_SESSION_MAX_BYTES = _env_int('CHAT_SESSION_MAX_BYTES', 64 * 1024 * 1024)  # 全部会话的内存上限
+    
     # 语音处理配置
     ASR_MODEL_PATH = os.environ.get('ASR_MODEL_PATH') or 'model'
+    ASR_POOL_SIZE = _env_int('ASR_POOL_SIZE', 4)  # 每个采样率的识别器池大小
+    ASR_POOL_TIMEOUT = _env_float('ASR_POOL_TIMEOUT', 10.0)  # 等待空闲识别器的超时（秒）
+    
+    # 语音活动检测：上传音频识别前裁掉首尾静音、在停顿处切分，纯静音的录音不送入识别器
+    ASR_VAD_ENABLED = _env_bool('ASR_VAD_ENABLED', True)
+    ASR_VAD_ENERGY_MARGIN_DB = _env_float('ASR_VAD_ENERGY_MARGIN_DB', 12.0)  # 语音帧能量需高于噪声底的裕量
+    ASR_VAD_MAX_NOISE_FLOOR_DB = _env_float('ASR_VAD_MAX_NOISE_FLOOR_DB', -45.0)  # 噪声底估计的上限（dBFS）
+    ASR_VAD_MIN_ENERGY_DB = _env_float('ASR_VAD_MIN_ENERGY_DB', -50.0)  # 低于该能量（dBFS）的帧一律视为静音
+    ASR_VAD_MIN_SILENCE_MS = _env_int('ASR_VAD_MIN_SILENCE_MS', 400)  # 切分语音段的最短停顿
+    ASR_VAD_PADDING_MS = _env_int('ASR_VAD_PADDING_MS', 200)  # 语音段前后保留的余量
+    ASR_VAD_MAX_SEGMENT_SECONDS = _env_float('ASR_VAD_MAX_SEGMENT_SECONDS', 15.0)
+    ASR_VAD_DROP_SILENCE = _env_bool('ASR_VAD_DROP_SILENCE', True)  # 未检测到语音时直接返回空结果
+    
+    # 批量识别（/api/asr/batch）：独立的识别进程池，每个工作进程加载一次模型
+    ASR_BATCH_WORKERS = _env_int('ASR_BATCH_WORKERS', 0)  # 工作进程数，0表示CPU核数
+    ASR_BATCH_MAX_FILES = _env_int('ASR_BATCH_MAX_FILES', 1000)  # 每批最多文件数
+    ASR_BATCH_MAX_FILE_BYTES = _env_int('ASR_BATCH_MAX_FILE_BYTES', 50 * 1024 * 1024)  # 单个文件的最大字节数
+    
     TTS_SPEAKER = 'zhiyuan'
     TTS_SPEED = 1.0
     TTS_VOLUME = 1.0
     TTS_PITCH = 1.0
     
+    # TTS缓存配置
+    TTS_CACHE_ENABLED = _env_bool('TTS_CACHE_ENABLED', True)
+    TTS_CACHE_MEMORY_ITEMS = _env_int('TTS_CACHE_MEMORY_ITEMS', 256)
+    TTS_CACHE_MEMORY_BYTES = _env_int('TTS_CACHE_MEMORY_BYTES', 64 * 1024 * 1024)
+    TTS_CACHE_DIR = os.environ.get('TTS_CACHE_DIR') or os.path.join('cache', 'tts')
+    TTS_CACHE_DISK_BYTES = _env_int('TTS_CACHE_DISK_BYTES', 512 * 1024 * 1024)
+    
+    # TTS文本前端缓存：按句缓存音素ID，0表示不缓存
+    TTS_FRONTEND_CACHE_ITEMS = _env_int('TTS_FRONTEND_CACHE_ITEMS', 4096)
+    
+    # TTS质量档位：各档位的声码器和输出采样率，请求用quality字段选择
+    TTS_QUALITY_DEFAULT = os.environ.get('TTS_QUALITY_DEFAULT') or 'balanced'  # fast/balanced/high
+    TTS_QUALITY_FAST_VOC = os.environ.get('TTS_QUALITY_FAST_VOC') or 'pwgan_male'
+    TTS_QUALITY_FAST_SAMPLE_RATE = _env_int('TTS_QUALITY_FAST_SAMPLE_RATE', 16000)
+    TTS_QUALITY_BALANCED_VOC = os.environ.get('TTS_QUALITY_BALANCED_VOC') or 'pwgan_male'
+    TTS_QUALITY_BALANCED_SAMPLE_RATE = _env_int('TTS_QUALITY_BALANCED_SAMPLE_RATE', 24000)
+    TTS_QUALITY_HIGH_VOC = os.environ.get('TTS_QUALITY_HIGH_VOC') or 'hifigan_male'
+    TTS_QUALITY_HIGH_SAMPLE_RATE = _env_int('TTS_QUALITY_HIGH_SAMPLE_RATE', 24000)
+    TTS_QUALITY_PRELOAD = _env_bool('TTS_QUALITY_PRELOAD', True)  # 启动时加载全部档位的声码器，否则首次使用时加载
+    # 负载自适应降档：排队深度或合成延迟p95超过阈值时降一档，负载回落后逐档恢复
+    TTS_QUALITY_ADAPTIVE = _env_bool('TTS_QUALITY_ADAPTIVE', False)
+    TTS_QUALITY_MAX_QUEUE = _env_int('TTS_QUALITY_MAX_QUEUE', 4)  # 排队深度阈值
+    TTS_QUALITY_MAX_P95_MS = _env_float('TTS_QUALITY_MAX_P95_MS', 1500.0)  # 延迟p95阈值（毫秒），0表示不按延迟降档
+    TTS_QUALITY_WINDOW_SECONDS = _env_float('TTS_QUALITY_WINDOW_SECONDS', 30.0)  # 延迟统计窗口（秒）
+    TTS_QUALITY_HOLD_SECONDS = _env_float('TTS_QUALITY_HOLD_SECONDS', 10.0)  # 两次调整档位的最短间隔（秒）
+    
+    # 回复语音预取：/api/chat确定回复后立即开始合成，并在启动时预合成固定回复
+    TTS_PREFETCH_ENABLED = _env_bool('TTS_PREFETCH_ENABLED', True)
+    TTS_PREFETCH_WORKERS = _env_int('TTS_PREFETCH_WORKERS', 2)  # 执行预取合成的线程数
+    TTS_PREFETCH_TTL = _env_float('TTS_PREFETCH_TTL', 120.0)  # 音频句柄有效期（秒）
+    TTS_PREFETCH_MAX_HANDLES = _env_int('TTS_PREFETCH_MAX_HANDLES', 256)
+    TTS_PREFETCH_CANNED = _env_bool('TTS_PREFETCH_CANNED', True)  # 启动时预合成固定回复
+    # 预合成使用的音调（前端女声1.0、男声0.8）和音量（前端默认0.8）
+    TTS_PREFETCH_PITCHES = [float(p) for p in (os.environ.get('TTS_PREFETCH_PITCHES') or '1.0,0.8').split(',')]
+    TTS_PREFETCH_VOLUME = _env_float('TTS_PREFETCH_VOLUME', 0.8)
+    TTS_PREFETCH_FORMAT = os.environ.get('TTS_PREFETCH_FORMAT') or 'ogg'  # 预合成的音频格式（前端优先请求ogg）
+    
+    # 语音对话流水线（/api/voice-turn）的分句合成线程数
+    VOICE_TURN_TTS_WORKERS = _env_int('VOICE_TURN_TTS_WORKERS', 2)
+    
+    # TTS流式合成配置
+    TTS_STREAM_MAX_SENTENCE_CHARS = _env_int('TTS_STREAM_MAX_SENTENCE_CHARS', 60)
+    
+    # 推理调度配置（工作进程数为0时在请求线程内直接推理）
+    TTS_WORKERS = _env_int('TTS_WORKERS', 0)
+    ASR_WORKERS = _env_int('ASR_WORKERS', 0)
+    INFERENCE_MAX_QUEUE = _env_int('INFERENCE_MAX_QUEUE', 16)  # 每类任务在工作进程之外最多排队的任务数
+    INFERENCE_TIMEOUT = _env_float('INFERENCE_TIMEOUT', 60.0)  # 等待推理结果的超时（秒）
+    INFERENCE_RETRY_AFTER = _env_int('INFERENCE_RETRY_AFTER', 2)  # 队列已满时建议的重试间隔（秒）
+    INFERENCE_START_METHOD = os.environ.get('INFERENCE_START_METHOD') or None  # fork/spawn/forkserver，默认使用平台默认值
+    
+    # 声学模型动态批处理配置（仅在请求线程内推理，即TTS_WORKERS为0时生效）
+    TTS_BATCH_ENABLED = _env_bool('TTS_BATCH_ENABLED', False)
+    TTS_BATCH_MAX_WAIT_MS = _env_float('TTS_BATCH_MAX_WAIT_MS', 10.0)  # 凑批最长等待时间（毫秒）
+    TTS_BATCH_MAX_SIZE = _env_int('TTS_BATCH_MAX_SIZE', 8)  # 单批最多句子数
+    
+    # 启动预热配置：预热期间/health/ready返回503
+    WARMUP_ENABLED = _env_bool('WARMUP_ENABLED', True)
+    WARMUP_TEXT = os.environ.get('WARMUP_TEXT') or '您好，欢迎使用语音服务。'
+    WARMUP_MIN_ROUNDS = _env_int('WARMUP_MIN_ROUNDS', 2)
+    WARMUP_MAX_ROUNDS = _env_int('WARMUP_MAX_ROUNDS', 5)
+    WARMUP_STEADY_TOLERANCE = _env_float('WARMUP_STEADY_TOLERANCE', 0.2)  # 相邻两轮耗时的相对变化小于该值视为稳态
+    
+    # ASGI服务配置（asgi_app.py）
+    ASGI_INFERENCE_THREADS = _env_int('ASGI_INFERENCE_THREADS', 8)  # 执行阻塞推理调用的线程数
+    ASGI_LIMIT_CONCURRENCY = _env_int('ASGI_LIMIT_CONCURRENCY', 4096)  # 每个进程的最大并发连接数，超出返回503
+    ASGI_KEEPALIVE_TIMEOUT = _env_int('ASGI_KEEPALIVE_TIMEOUT', 30)  # 空闲keep-alive连接保持时间（秒）
+    
+    # 日志配置（日志由后台线程写入，请求线程不做磁盘IO）
+    LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
+    LOG_FILE = os.environ.get('LOG_FILE', 'tts_service.log')  # 设为空字符串时只输出到控制台
+    LOG_MAX_BYTES = _env_int('LOG_MAX_BYTES', 20 * 1024 * 1024)
+    LOG_BACKUP_COUNT = _env_int('LOG_BACKUP_COUNT', 5)
+    LOG_JSON = _env_bool('LOG_JSON', False)  # 文件日志使用JSON格式
+    LOG_DEBUG_SAMPLE_RATE = _env_float('LOG_DEBUG_SAMPLE_RATE', 1.0)  # 输出DEBUG日志的请求比例
+    LOG_QUEUE_SIZE = _env_int('LOG_QUEUE_SIZE', 10000)  # 日志队列满时丢弃新记录
+    
     # 音频格式配置
     AUDIO_FORMAT = 'wav'
     SAMPLE_RATE = 16000
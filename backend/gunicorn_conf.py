@@ -0,0 +1,53 @@
+"""
+生产环境启动配置：gunicorn管理进程 + uvicorn异步工作进程
+
+    gunicorn -c gunicorn_conf.py asgi_app:app
+
+每个工作进程是一个事件循环，空闲和慢速连接不占用线程；阻塞推理在进程内的
+推理线程池（ASGI_INFERENCE_THREADS）或推理工作进程池（TTS_WORKERS/ASR_WORKERS）中执行。
+"""
+
+import os
+
+from uvicorn_worker import UvicornWorker as _UvicornWorker
+
+from config import Config
+
+
+class UvicornWorker(_UvicornWorker):
+    """带连接数上限和keep-alive配置的uvicorn工作进程"""
+
+    CONFIG_KWARGS = {
+        'loop': 'auto',
+        'http': 'auto',
+        'limit_concurrency': Config.ASGI_LIMIT_CONCURRENCY,
+        'timeout_keep_alive': Config.ASGI_KEEPALIVE_TIMEOUT,
+        'ws_ping_interval': 20.0,
+        'ws_ping_timeout': 20.0,
+        'log_config': None,
+    }
+
+
+bind = os.environ.get('BIND') or '0.0.0.0:5000'
+# 每个工作进程各自加载模型，进程数受内存限制
+workers = int(os.environ.get('WEB_CONCURRENCY') or 2)
+worker_class = 'gunicorn_conf.UvicornWorker'
+# 模型在各工作进程内加载，不在管理进程中预加载
+preload_app = False
+backlog = 2048
+# 工作进程启动时加载模型可能较慢
+timeout = 120
+graceful_timeout = 30
+# 长时间运行后回收工作进程，释放推理框架的内存碎片
+max_requests = int(os.environ.get('MAX_REQUESTS') or 0)
+max_requests_jitter = max_requests // 10
+accesslog = None
+# 应用日志只写stderr，由gunicorn汇总到errorlog（默认stderr）；多个工作进程各自滚动同一个
+# 日志文件会互相覆盖和丢失记录，需要写文件时设置GUNICORN_ERRORLOG并配合logrotate使用
+errorlog = os.environ.get('GUNICORN_ERRORLOG') or '-'
+capture_output = True
+
+
+def post_fork(server, worker):
+    """工作进程关闭应用自身的滚动日志文件（配置在管理进程中已导入，此处修改只影响该工作进程）"""
+    Config.LOG_FILE = ''
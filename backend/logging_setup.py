@@ -0,0 +1,174 @@
+"""
+日志配置：请求线程只把日志记录放入队列，由后台线程写入控制台和滚动日志文件
+
+- 文件输出可选JSON格式（每行一条记录）
+- DEBUG日志可按请求采样，被采样的请求输出全部DEBUG日志，其余请求不输出
+- 队列满时丢弃记录而不阻塞请求线程
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
+
+# LogRecord的标准属性，其余属性视为通过extra传入的结构化字段
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'taskName'}
+
+# 当前请求是否输出DEBUG日志，None表示不在请求上下文中
+_debug_sampled = contextvars.ContextVar('debug_sampled', default=None)
+
+_listener = None
+
+_exc_formatter = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录输出为一行JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'file': f'{record.filename}:{record.lineno}',
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    DEBUG日志采样：INFO及以上总是通过；DEBUG在请求内按sample_request()的决定，
+    请求外按rate随机通过
+    """
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        sampled = _debug_sampled.get()
+        if sampled is None:
+            return random.random() < self.rate
+        return sampled
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列满时丢弃记录并计数，不阻塞调用线程"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._drop_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        在调用线程中合并消息参数（参数对象之后可能被修改）并展开异常堆栈，
+        其余格式化（时间、JSON序列化）留给后台线程
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+
+
+def sample_request(rate: float):
+    """在请求开始时决定该请求是否输出DEBUG日志"""
+    _debug_sampled.set(rate >= 1.0 or random.random() < rate)
+
+
+def setup_logging(level: str = 'INFO',
+                  log_file: str = 'tts_service.log',
+                  max_bytes: int = 20 * 1024 * 1024,
+                  backup_count: int = 5,
+                  json_format: bool = False,
+                  debug_sample_rate: float = 1.0,
+                  queue_size: int = 10000) -> DroppingQueueHandler:
+    """
+    配置根日志器：QueueHandler + 后台QueueListener
+
+    Args:
+        level: 日志级别
+        log_file: 日志文件路径，为空时只输出到控制台
+        max_bytes: 单个日志文件最大字节数，超过后滚动
+        backup_count: 保留的滚动文件数
+        json_format: 文件日志是否使用JSON格式
+        debug_sample_rate: DEBUG日志的请求采样率（0-1）
+        queue_size: 日志队列长度，队列满时丢弃新记录
+
+    Returns:
+        DroppingQueueHandler: 根日志器上的队列处理器（可读取dropped计数）
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(TEXT_FORMAT))
+    handlers = [console]
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+        )
+        file_handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+        handlers.append(file_handler)
+
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    queue_handler.addFilter(DebugSamplingFilter(debug_sample_rate))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return queue_handler
+
+
+def configure_worker_logging(level: str = 'INFO'):
+    """
+    推理工作进程的日志配置
+
+    fork出的子进程继承了父进程的QueueHandler，但没有后台写入线程；
+    替换为直接写stderr，避免多个进程同时滚动同一个日志文件。
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(level.upper())
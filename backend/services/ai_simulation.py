@@ -1,12 +1,21 @@
+import asyncio
 import time
 import random
-from typing import List, Dict
+import uuid
+from typing import Callable, List, Dict, Optional
 
 class AISimulationService:
-    """AI对话模拟服务"""
+    """
+    AI对话模拟服务
     
-    def __init__(self, response_delay: float = 0.5):
+    Args:
+        response_delay: 模拟响应延迟（秒）
+        session_store: SessionStore实例，提供时对话上下文保存在服务端，客户端只需发送新消息
+    """
+    
+    def __init__(self, response_delay: float = 0.5, session_store=None):
         self.response_delay = response_delay
+        self.session_store = session_store
         self.response_templates = [
             "您好！我是AI助手，很高兴为您服务。",
             "感谢您的提问，我会尽力为您解答。",
@@ -28,20 +37,58 @@ class AISimulationService:
             "时间": ["抱歉，我无法获取当前时间。", "您可以查看设备上的时钟获取准确时间。"]
         }
     
-    def generate_response(self, message: str, context: List[Dict] = None) -> str:
+    def generate_response(self, message: str, context: List[Dict] = None,
+                          on_reply: Optional[Callable[[str], None]] = None) -> str:
         """
         生成AI模拟响应
         
         Args:
             message: 用户消息
             context: 对话上下文
+            on_reply: 回复确定后立即调用（在模拟延迟之前），用于提前开始语音合成
             
         Returns:
             str: AI响应
         """
+        response = self._choose_response(message)
+        if on_reply is not None:
+            on_reply(response)
         # 模拟处理延迟
         time.sleep(self.response_delay)
+        return response
+    
+    async def generate_response_async(self, message: str, context: List[Dict] = None,
+                                      on_reply: Optional[Callable[[str], None]] = None) -> str:
+        """
+        生成AI模拟响应（异步版本，模拟延迟期间不占用线程）
+        
+        Args:
+            message: 用户消息
+            context: 对话上下文
+            on_reply: 回复确定后立即调用（在模拟延迟之前）
+            
+        Returns:
+            str: AI响应
+        """
+        response = self._choose_response(message)
+        if on_reply is not None:
+            on_reply(response)
+        await asyncio.sleep(self.response_delay)
+        return response
+    
+    def canned_responses(self) -> List[str]:
+        """
+        全部固定回复（去重，保持顺序），用于启动时预合成语音
         
+        Returns:
+            List[str]: 回复文本
+        """
+        responses = list(self.response_templates)
+        for candidates in self.context_responses.values():
+            responses.extend(candidates)
+        return list(dict.fromkeys(responses))
+    
+    def _choose_response(self, message: str) -> str:
         # 检查是否有匹配的上下文响应
         message_lower = message.lower()
         for key, responses in self.context_responses.items():
@@ -51,25 +98,63 @@ class AISimulationService:
         # 如果没有匹配的上下文，返回随机模板
         return random.choice(self.response_templates)
     
-    def process_chat(self, message: str, context: List[Dict] = None, dialogue_id: str = None) -> Dict:
+    def process_chat(self, message: str, context: List[Dict] = None, dialogue_id: str = None,
+                     on_reply: Optional[Callable[[str], None]] = None) -> Dict:
         """
         处理聊天请求
         
         Args:
             message: 用户消息
-            context: 对话上下文
-            dialogue_id: 对话ID
+            context: 对话上下文（旧客户端发送；服务端已有该会话时忽略，否则写入新会话）
+            dialogue_id: 对话ID，为空时创建新会话
+            on_reply: 回复确定后立即调用（在模拟延迟之前）
+            
+        Returns:
+            Dict: 包含响应和对话ID的字典
+        """
+        dialogue_id = dialogue_id or self._generate_dialogue_id()
+        response = self.generate_response(message, self._load_context(dialogue_id, context), on_reply)
+        self._save_turn(dialogue_id, message, response, context)
+        
+        return {
+            "reply": response,
+            "dialogue_id": dialogue_id
+        }
+    
+    async def process_chat_async(self, message: str, context: List[Dict] = None, dialogue_id: str = None,
+                                 on_reply: Optional[Callable[[str], None]] = None) -> Dict:
+        """
+        处理聊天请求（异步版本）
+        
+        Args:
+            message: 用户消息
+            context: 对话上下文（旧客户端发送；服务端已有该会话时忽略，否则写入新会话）
+            dialogue_id: 对话ID，为空时创建新会话
+            on_reply: 回复确定后立即调用（在模拟延迟之前）
             
         Returns:
             Dict: 包含响应和对话ID的字典
         """
-        response = self.generate_response(message, context)
+        dialogue_id = dialogue_id or self._generate_dialogue_id()
+        response = await self.generate_response_async(message, self._load_context(dialogue_id, context), on_reply)
+        self._save_turn(dialogue_id, message, response, context)
         
         return {
             "reply": response,
-            "dialogue_id": dialogue_id or self._generate_dialogue_id()
+            "dialogue_id": dialogue_id
         }
     
+    def _load_context(self, dialogue_id: str, context: Optional[List[Dict]]) -> List[Dict]:
+        """服务端会话的上下文优先，会话不存在（新对话或已过期）时使用客户端发送的上下文"""
+        if self.session_store is None:
+            return context or []
+        return self.session_store.context(dialogue_id) or context or []
+    
+    def _save_turn(self, dialogue_id: str, message: str, response: str, context: Optional[List[Dict]] = None):
+        """保存本轮对话；新建会话时先写入客户端发送的上下文，下一轮只带dialogue_id时不丢失历史"""
+        if self.session_store is not None:
+            self.session_store.append(dialogue_id, message, response, history=context)
+    
     def _generate_dialogue_id(self) -> str:
-        """生成对话ID"""
-        return f"dialogue_{int(time.time() * 1000)}_{random.randint(0, 999)}"
+        """生成对话ID（随机不可猜测，会话上下文按ID保存在服务端）"""
+        return f"dialogue_{uuid.uuid4().hex}"
@@ -0,0 +1,409 @@
+"""
+音频编解码工具，所有编解码均在内存中完成，不启动子进程
+
+支持的格式：
+- wav: 16位PCM WAV
+- ogg: OGG封装的Opus，语音约20kbps，10秒回复约25KB（WAV约480KB）
+- mp3: MPEG Layer III
+- pcm: 无文件头的16位单声道PCM，媒体类型 audio/L16;rate=采样率;channels=1（按RFC 2586为大端字节序）
+
+Opus和MP3通过soundfile（libsndfile）在进程内编解码，未安装soundfile时只能使用wav和pcm。
+"""
+
+import io
+import struct
+import wave
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from services.audio_dsp import resample
+
+# 格式名 -> 响应媒体类型（pcm的媒体类型带采样率参数，见media_type()）
+MEDIA_TYPES = {
+    'wav': 'audio/wav',
+    'ogg': 'audio/ogg; codecs=opus',
+    'mp3': 'audio/mpeg',
+    'pcm': 'audio/L16',
+}
+
+# 格式名别名（format参数）
+_FORMAT_ALIASES = {'opus': 'ogg', 'l16': 'pcm', 'pcm16': 'pcm'}
+
+# Accept/Content-Type中的媒体类型 -> 格式名
+_MEDIA_TYPE_FORMATS = {
+    'audio/wav': 'wav',
+    'audio/wave': 'wav',
+    'audio/x-wav': 'wav',
+    'audio/vnd.wave': 'wav',
+    'audio/ogg': 'ogg',
+    'audio/opus': 'ogg',
+    'audio/mpeg': 'mp3',
+    'audio/mp3': 'mp3',
+    'audio/l16': 'pcm',
+}
+
+# Opus支持的采样率，其他采样率先重采样到48kHz
+_OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+# libsndfile的Opus压缩级别（0-1，越大码率越低），0.95对24kHz语音约为20kbps
+OPUS_COMPRESSION_LEVEL = 0.95
+
+# WAV格式码
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_IEEE_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class WavData(NamedTuple):
+    """解析后的WAV音频，pcm为原始数据的零拷贝视图"""
+    sample_rate: int
+    channels: int
+    sample_width: int
+    is_float: bool
+    pcm: memoryview
+
+
+def parse_wav(data: bytes) -> WavData:
+    """
+    直接从内存中解析WAV（RIFF）文件，不拷贝音频数据
+
+    支持PCM整型（8/16/24/32位）和32位浮点，以及WAVE_FORMAT_EXTENSIBLE；
+    数据块长度为0或超出实际长度（浏览器流式录音常见）时取到文件末尾。
+
+    Args:
+        data: WAV文件内容
+
+    Returns:
+        WavData: 格式信息和PCM数据视图
+    """
+    view = memoryview(data)
+    if len(view) < 12 or view[0:4] != b'RIFF' or view[8:12] != b'WAVE':
+        raise ValueError("不是有效的WAV文件")
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        chunk_size = struct.unpack_from('<I', view, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b'fmt ':
+            if chunk_size < 16:
+                raise ValueError("WAV格式块长度无效")
+            audio_format, channels, sample_rate, _, _, bits = struct.unpack_from('<HHIIHH', view, body)
+            if audio_format == _WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40:
+                audio_format = struct.unpack_from('<H', view, body + 24)[0]
+            if audio_format not in (_WAVE_FORMAT_PCM, _WAVE_FORMAT_IEEE_FLOAT):
+                raise ValueError(f"不支持的WAV编码格式: {audio_format:#06x}")
+            if channels == 0 or bits not in (8, 16, 24, 32):
+                raise ValueError(f"不支持的WAV参数: {channels}声道, {bits}位")
+            fmt = (sample_rate, channels, bits // 8, audio_format == _WAVE_FORMAT_IEEE_FLOAT)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise ValueError("WAV数据块出现在格式块之前")
+            end = len(view) if chunk_size == 0 else min(body + chunk_size, len(view))
+            frame_size = fmt[1] * fmt[2]
+            end -= (end - body) % frame_size
+            return WavData(fmt[0], fmt[1], fmt[2], fmt[3], view[body:end])
+        # 块按偶数字节对齐
+        offset = body + chunk_size + (chunk_size & 1)
+
+    raise ValueError("WAV文件缺少数据块")
+
+
+def pcm_to_float(wav: WavData) -> np.ndarray:
+    """
+    将WAV的PCM数据解码为float32数组
+
+    Args:
+        wav: parse_wav的结果
+
+    Returns:
+        np.ndarray: 形状为 (帧数, 声道数) 的float32数组
+    """
+    width = wav.sample_width
+    if wav.is_float:
+        samples = np.frombuffer(wav.pcm, dtype='<f4').astype(np.float32)
+    elif width == 1:
+        samples = (np.frombuffer(wav.pcm, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(wav.pcm, dtype='<i2').astype(np.float32) / 32768.0
+    elif width == 3:
+        raw = np.frombuffer(wav.pcm, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        value = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        value = np.where(value >= 1 << 23, value - (1 << 24), value)
+        samples = value.astype(np.float32) / float(1 << 23)
+    else:
+        samples = np.frombuffer(wav.pcm, dtype='<i4').astype(np.float32) / float(1 << 31)
+    return samples.reshape(-1, wav.channels)
+
+
+def to_mono_pcm16(wav: WavData, sample_rate: int) -> memoryview:
+    """
+    转换为指定采样率的16位单声道PCM
+
+    已经是目标格式时直接返回原始数据视图（零拷贝），
+    否则在进程内完成解码、声道混合和重采样。
+
+    Args:
+        wav: parse_wav的结果
+        sample_rate: 目标采样率
+
+    Returns:
+        memoryview: 16位单声道小端PCM
+    """
+    if (wav.channels == 1 and wav.sample_width == 2 and not wav.is_float
+            and wav.sample_rate == sample_rate):
+        return wav.pcm
+
+    samples = pcm_to_float(wav)
+    mono = samples[:, 0] if wav.channels == 1 else samples.mean(axis=1, dtype=np.float32)
+    mono = resample(np.ascontiguousarray(mono), wav.sample_rate, sample_rate)
+    return memoryview(float_to_pcm16(mono).astype('<i2', copy=False).tobytes())
+
+
+def float_to_pcm16(samples: np.ndarray) -> np.ndarray:
+    """
+    将[-1, 1]范围的浮点波形转换为16位PCM
+
+    Args:
+        samples: float32波形
+
+    Returns:
+        np.ndarray: int16采样
+    """
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype(np.int16)
+
+
+def encode_wav(samples: np.ndarray, sample_rate: int) -> bytes:
+    """
+    将单声道浮点波形编码为16位WAV
+
+    Args:
+        samples: float32波形
+        sample_rate: 采样率
+
+    Returns:
+        bytes: WAV文件内容
+    """
+    pcm = float_to_pcm16(samples)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=None)
+def _soundfile():
+    """按需导入soundfile（libsndfile），只有Opus/MP3编解码需要"""
+    try:
+        import soundfile
+    except ImportError as e:
+        raise RuntimeError("Opus/MP3编解码需要安装soundfile: pip install soundfile") from e
+    return soundfile
+
+
+def encode_pcm16(samples: np.ndarray) -> bytes:
+    """
+    将单声道浮点波形编码为无文件头的16位大端PCM（audio/L16）
+
+    Args:
+        samples: float32波形
+
+    Returns:
+        bytes: PCM数据
+    """
+    return float_to_pcm16(samples).astype('>i2', copy=False).tobytes()
+
+
+def encode_ogg_opus(samples: np.ndarray, sample_rate: int,
+                    compression_level: float = OPUS_COMPRESSION_LEVEL) -> bytes:
+    """
+    将单声道浮点波形编码为OGG/Opus
+
+    Args:
+        samples: float32波形
+        sample_rate: 采样率，不是Opus支持的采样率时先重采样到48kHz
+        compression_level: 压缩级别（0-1）
+
+    Returns:
+        bytes: OGG文件内容
+    """
+    if sample_rate not in _OPUS_SAMPLE_RATES:
+        samples = resample(np.ascontiguousarray(samples, dtype=np.float32), sample_rate, 48000)
+        sample_rate = 48000
+    buffer = io.BytesIO()
+    _soundfile().write(buffer, samples, sample_rate, format='OGG', subtype='OPUS',
+                       compression_level=compression_level)
+    return buffer.getvalue()
+
+
+def encode_mp3(samples: np.ndarray, sample_rate: int) -> bytes:
+    """
+    将单声道浮点波形编码为MP3（进程内编码，不调用ffmpeg）
+
+    Args:
+        samples: float32波形
+        sample_rate: 采样率
+
+    Returns:
+        bytes: MP3文件内容
+    """
+    buffer = io.BytesIO()
+    _soundfile().write(buffer, samples, sample_rate, format='MP3', subtype='MPEG_LAYER_III')
+    return buffer.getvalue()
+
+
+def encode_audio(samples: np.ndarray, sample_rate: int, output_format: str = 'wav') -> bytes:
+    """
+    按指定格式编码音频
+
+    Args:
+        samples: float32波形
+        sample_rate: 采样率
+        output_format: wav/ogg/mp3/pcm（可用别名，见normalize_format）
+
+    Returns:
+        bytes: 编码后的音频内容
+    """
+    output_format = normalize_format(output_format)
+    if output_format == 'ogg':
+        return encode_ogg_opus(samples, sample_rate)
+    if output_format == 'mp3':
+        return encode_mp3(samples, sample_rate)
+    if output_format == 'pcm':
+        return encode_pcm16(samples)
+    return encode_wav(samples, sample_rate)
+
+
+def decode_audio(data: bytes, media_type: Optional[str] = None) -> WavData:
+    """
+    解码上传的音频
+
+    audio/L16按媒体类型参数（rate、channels）解析原始PCM；
+    WAV零拷贝解析；OGG/Opus、FLAC、MP3通过soundfile解码为32位浮点。
+
+    Args:
+        data: 音频内容
+        media_type: 上传时声明的Content-Type，可为空（按文件头识别）
+
+    Returns:
+        WavData: 可交给to_mono_pcm16的音频数据
+
+    Raises:
+        ValueError: 格式不支持或数据无效
+    """
+    mtype, params = parse_media_type(media_type or '')
+    if mtype == 'audio/l16':
+        try:
+            sample_rate = int(params.get('rate', 16000))
+            channels = int(params.get('channels', 1))
+        except ValueError:
+            raise ValueError("audio/L16的rate和channels参数必须为整数")
+        if sample_rate <= 0 or channels <= 0:
+            raise ValueError("audio/L16的rate和channels参数必须为正数")
+        frame_bytes = 2 * channels
+        pcm = np.frombuffer(data, dtype='>i2', count=len(data) // frame_bytes * channels)
+        return WavData(sample_rate, channels, 2, False, memoryview(pcm.astype('<i2').tobytes()))
+
+    head = bytes(data[:4])
+    if head == b'RIFF':
+        return parse_wav(data)
+    if head in (b'OggS', b'fLaC') or head[:3] == b'ID3' or _MEDIA_TYPE_FORMATS.get(mtype) in ('ogg', 'mp3'):
+        try:
+            samples, sample_rate = _soundfile().read(io.BytesIO(data), dtype='float32', always_2d=True)
+        except RuntimeError as e:
+            raise ValueError(f"音频解码失败: {e}") from e
+        return WavData(sample_rate, samples.shape[1], 4, True, memoryview(samples.astype('<f4').tobytes()))
+    if head == b'\x1aE\xdf\xa3':
+        raise ValueError("不支持WebM音频，请上传WAV、OGG/Opus或audio/L16格式")
+    return parse_wav(data)
+
+
+def normalize_format(output_format: str) -> str:
+    """
+    规范化格式名
+
+    Raises:
+        ValueError: 不支持的格式
+    """
+    name = str(output_format).lower()
+    name = _FORMAT_ALIASES.get(name, name)
+    if name not in MEDIA_TYPES:
+        raise ValueError(f"不支持的音频格式: {output_format}，可选: {', '.join(MEDIA_TYPES)}")
+    return name
+
+
+def media_type(output_format: str, sample_rate: int) -> str:
+    """
+    响应的Content-Type
+
+    Args:
+        output_format: 格式名
+        sample_rate: 采样率（pcm需要）
+    """
+    if output_format == 'pcm':
+        return f'audio/L16;rate={sample_rate};channels=1'
+    return MEDIA_TYPES[output_format]
+
+
+def parse_media_type(value: str) -> Tuple[str, Dict[str, str]]:
+    """
+    解析媒体类型，如 'audio/L16;rate=16000' -> ('audio/l16', {'rate': '16000'})
+    """
+    parts = value.split(';')
+    params = {}
+    for part in parts[1:]:
+        key, _, param = part.partition('=')
+        if key.strip():
+            params[key.strip().lower()] = param.strip().strip('"')
+    return parts[0].strip().lower(), params
+
+
+def negotiate_format(accept: Optional[str], requested: Optional[str] = None, default: str = 'wav') -> Optional[str]:
+    """
+    选择响应的音频格式：显式指定的格式（format参数）优先，否则按Accept头的q值选择
+
+    Args:
+        accept: Accept请求头
+        requested: format查询参数或请求体字段
+        default: 未指定、Accept为通配或Accept中没有音频类型时的格式
+
+    Returns:
+        str: 格式名；Accept只列出了无法提供的音频类型时返回None（应返回406）
+
+    Raises:
+        ValueError: format参数不支持
+    """
+    if requested:
+        return normalize_format(requested)
+    if not accept:
+        return default
+
+    candidates = []
+    # Accept中是否显式列出了具体的音频类型；只接受其他类型（如application/json）的旧客户端仍返回默认格式
+    audio_requested = False
+    for order, item in enumerate(accept.split(',')):
+        mtype, params = parse_media_type(item)
+        audio_requested = audio_requested or (mtype.startswith('audio/') and mtype != 'audio/*')
+        try:
+            quality = float(params.get('q', 1.0))
+        except ValueError:
+            quality = 0.0
+        if quality <= 0:
+            continue
+        if mtype in ('*/*', 'audio/*'):
+            fmt = default
+        else:
+            fmt = _MEDIA_TYPE_FORMATS.get(mtype)
+            if fmt is None:
+                continue
+        # 同一q值下具体类型优先于通配，其次按出现顺序
+        candidates.append((-quality, mtype.endswith('/*'), order, fmt))
+    if candidates:
+        return min(candidates)[3]
+    return None if audio_requested else default
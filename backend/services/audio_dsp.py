@@ -0,0 +1,164 @@
+"""
+基于NumPy的音频处理原语：增益、多相滤波重采样、保持音调的变速（WSOLA）
+
+所有函数接收并返回float32单声道波形，取值范围[-1, 1]。
+"""
+
+import numpy as np
+
+
+def apply_gain(samples: np.ndarray, gain_db: float, inplace: bool = False) -> np.ndarray:
+    """
+    施加增益并限幅
+
+    Args:
+        samples: float32波形
+        gain_db: 增益（dB）
+        inplace: 为True时直接修改输入缓冲区
+
+    Returns:
+        np.ndarray: 调整后的波形
+    """
+    out = samples if inplace else np.empty_like(samples)
+    np.multiply(samples, np.float32(10.0 ** (gain_db / 20.0)), out=out)
+    np.clip(out, -1.0, 1.0, out=out)
+    return out
+
+
+def _polyphase_table(cutoff: float, half_taps: int, phases: int):
+    """构造多相窗函数sinc插值滤波器表，形状为 (phases, 2 * half_taps)"""
+    offsets = np.arange(-half_taps + 1, half_taps + 1)
+    distance = np.arange(phases)[:, None] / phases - offsets[None, :]
+    window = 0.5 + 0.5 * np.cos(np.pi * distance / half_taps)
+    table = cutoff * np.sinc(cutoff * distance) * window
+    return offsets, table.astype(np.float32)
+
+
+def resample_to_length(samples: np.ndarray,
+                       num_samples: int,
+                       half_taps: int = 8,
+                       phases: int = 256,
+                       chunk_size: int = 32768) -> np.ndarray:
+    """
+    多相滤波重采样到指定长度，支持任意（非有理）比例
+
+    小数延迟量化到phases个相位，每个输出点由2 * half_taps个输入点加权得到；
+    降采样时按比例收窄截止频率并加长滤波器以抗混叠。按块向量化计算以限制内存占用。
+
+    Args:
+        samples: float32波形
+        num_samples: 目标采样点数
+        half_taps: 单侧滤波器长度（以截止频率对应的采样间隔计）
+        phases: 小数相位数
+        chunk_size: 每块输出点数
+
+    Returns:
+        np.ndarray: 重采样后的float32波形
+    """
+    n = len(samples)
+    if num_samples == n or n == 0:
+        return samples
+
+    step = n / num_samples
+    cutoff = min(1.0, 1.0 / step)
+    half = int(np.ceil(half_taps / cutoff))
+    offsets, table = _polyphase_table(cutoff, half, phases)
+    padded = np.pad(np.asarray(samples, dtype=np.float32), (half, half + 1))
+    gather = offsets + half
+
+    out = np.empty(num_samples, dtype=np.float32)
+    for start in range(0, num_samples, chunk_size):
+        end = min(start + chunk_size, num_samples)
+        position = np.arange(start, end) * step
+        base = np.floor(position).astype(np.int64)
+        phase = ((position - base) * phases).astype(np.int64)
+        neighbours = padded[base[:, None] + gather[None, :]]
+        out[start:end] = np.einsum('ij,ij->i', neighbours, table[phase])
+    return out
+
+
+def resample(samples: np.ndarray, orig_sr: float, target_sr: float) -> np.ndarray:
+    """
+    将波形从orig_sr重采样到target_sr
+
+    Args:
+        samples: float32波形
+        orig_sr: 原采样率
+        target_sr: 目标采样率
+
+    Returns:
+        np.ndarray: 重采样后的float32波形
+    """
+    if orig_sr == target_sr:
+        return samples
+    return resample_to_length(samples, int(round(len(samples) * target_sr / orig_sr)))
+
+
+def time_stretch(samples: np.ndarray,
+                 rate: float,
+                 sample_rate: int,
+                 frame_ms: float = 30.0,
+                 tolerance_ms: float = 10.0) -> np.ndarray:
+    """
+    WSOLA变速，保持音调不变
+
+    逐帧在容差范围内搜索与上一帧自然延续最相似的位置，
+    搜索先在4倍抽取的信号上粗匹配再在原信号上细化；
+    帧位置确定后以50%重叠的汉宁窗一次性向量化叠加。
+
+    Args:
+        samples: float32波形
+        rate: 播放速度倍率，大于1变快
+        sample_rate: 采样率
+        frame_ms: 帧长（毫秒）
+        tolerance_ms: 位置搜索容差（毫秒）
+
+    Returns:
+        np.ndarray: 长度约为 len(samples) / rate 的float32波形
+    """
+    if rate == 1.0 or len(samples) == 0:
+        return samples
+
+    hop_out = max(16, int(sample_rate * frame_ms / 2000))
+    frame_len = hop_out * 2
+    delta = int(sample_rate * tolerance_ms / 1000)
+    hop_in = hop_out * rate
+    target_len = int(round(len(samples) / rate))
+    num_frames = int(np.ceil(target_len / hop_out)) + 1
+
+    # 两端补零，保证搜索窗口不越界
+    pad = delta + frame_len
+    padded = np.zeros(len(samples) + 2 * pad + int(np.ceil(hop_in * num_frames)), dtype=np.float32)
+    padded[pad:pad + len(samples)] = samples
+    decimated = padded[::4]
+    coarse_delta = delta // 4
+
+    positions = np.empty(num_frames, dtype=np.int64)
+    positions[0] = pad
+    for k in range(1, num_frames):
+        nominal = pad + int(round(k * hop_in))
+        # 上一帧的自然延续作为匹配模板
+        natural = positions[k - 1] + hop_out
+
+        # 粗搜索：在抽取信号上计算互相关
+        template = decimated[natural // 4:(natural + frame_len) // 4]
+        lo = (nominal - delta) // 4
+        region = decimated[lo:lo + len(template) + 2 * coarse_delta]
+        coarse = int(np.argmax(np.correlate(region, template, mode='valid'))) * 4 + lo * 4
+
+        # 细搜索：在原信号上于粗匹配位置附近细化
+        fine_lo = max(coarse - 4, nominal - delta)
+        fine_region = padded[fine_lo:fine_lo + frame_len + 8]
+        fine_template = padded[natural:natural + frame_len]
+        positions[k] = fine_lo + int(np.argmax(np.correlate(fine_region, fine_template, mode='valid')))
+
+    # 向量化重叠相加：周期汉宁窗在50%重叠下和为1
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame_len) / frame_len)).astype(np.float32)
+    frames = padded[positions[:, None] + np.arange(frame_len)]
+    frames *= window
+    blocks = np.zeros((num_frames + 1, hop_out), dtype=np.float32)
+    blocks[:-1] += frames[:, :hop_out]
+    blocks[1:] += frames[:, hop_out:]
+    # 第一帧前半段没有前一帧叠加，用原信号补齐窗函数的衰减
+    blocks[0] = samples[:hop_out] if len(samples) >= hop_out else np.pad(samples, (0, hop_out - len(samples)))
+    return blocks.reshape(-1)[:target_len]
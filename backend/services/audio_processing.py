@@ -0,0 +1,49 @@
+"""
+合成后的音频参数调整（音量、音调、语速），基于NumPy在内存中完成
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+from services.audio_dsp import apply_gain, resample_to_length, time_stretch
+
+
+def adjust_audio(samples: np.ndarray,
+                 sample_rate: int,
+                 speed: float = 1.0,
+                 volume: float = 1.0,
+                 pitch: float = 1.0) -> Tuple[np.ndarray, int]:
+    """
+    调整音量、音调和语速
+
+    输入缓冲区可能被原地修改，调用方不应再使用传入的数组。
+
+    Args:
+        samples: float32单声道波形
+        sample_rate: 采样率
+        speed: 语速倍率
+        volume: 音量，1.0为原始音量，增益为 volume * 20 - 20 dB
+        pitch: 音调倍率
+
+    Returns:
+        tuple: (调整后的float32波形, 采样率)
+    """
+    if speed == 1.0 and volume == 1.0 and pitch == 1.0:
+        return samples, sample_rate
+
+    samples = np.asarray(samples, dtype=np.float32)
+
+    # 调整音量
+    if volume != 1.0:
+        samples = apply_gain(samples, volume * 20 - 20, inplace=samples.flags.writeable)
+
+    # 调整音调：等效于以 sample_rate * sqrt(pitch) 播放后重采样回原采样率
+    if pitch != 1.0:
+        samples = resample_to_length(samples, int(round(len(samples) / (pitch ** 0.5))))
+
+    # 调整语速（WSOLA，保持音调）
+    if speed != 1.0:
+        samples = time_stretch(samples, speed, sample_rate)
+
+    return samples, sample_rate
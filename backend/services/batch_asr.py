@@ -0,0 +1,302 @@
+"""
+批量语音识别：归档语音的转写
+
+上传的多个音频文件或tar/zip归档展开为识别任务，分发到专用的识别进程池
+（每个工作进程启动时加载一次模型），结果按完成顺序逐条返回。
+批量任务使用独立的进程池，不占用交互请求的ASR工作进程（ASR_WORKERS）和排队名额。
+
+归档只在内存中读取，成员名仅用作结果标识，不会写入磁盘。
+"""
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.inference_scheduler import _init_asr_worker, _run_batch_asr
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = ('.wav', '.wave', '.ogg', '.oga', '.opus', '.flac', '.mp3')
+ARCHIVE_MEDIA_TYPES = ('application/zip', 'application/x-zip-compressed', 'application/x-tar',
+                       'application/gzip', 'application/x-gzip', 'application/x-gtar')
+
+
+class BatchItem:
+    """
+    一个待识别的文件，内容在提交给工作进程时才读取
+
+    Args:
+        name: 文件名或归档内的路径
+        size: 文件大小（字节）
+        read: 读取文件内容的函数
+        media_type: 声明的Content-Type，为None时按文件头识别
+    """
+
+    __slots__ = ('index', 'name', 'size', 'media_type', '_read')
+
+    def __init__(self, name: str, size: int, read: Callable[[], bytes], media_type: Optional[str] = None):
+        self.index = None
+        self.name = name
+        self.size = size
+        self.media_type = media_type
+        self._read = read
+
+    def read(self) -> bytes:
+        return self._read()
+
+
+def is_audio_name(name: str) -> bool:
+    """按扩展名判断是否为音频文件，跳过隐藏文件和macOS归档的元数据目录"""
+    base = os.path.basename(name)
+    return (name.lower().endswith(AUDIO_EXTENSIONS) and not base.startswith('.')
+            and '__MACOSX/' not in name)
+
+
+def _is_archive(name: str, data: bytes, content_type: Optional[str]) -> bool:
+    if (content_type or '').split(';')[0].strip().lower() in ARCHIVE_MEDIA_TYPES:
+        return True
+    head = bytes(data[:4])
+    return (head == b'PK\x03\x04' or head[:2] == b'\x1f\x8b' or bytes(data[257:262]) == b'ustar'
+            or name.lower().endswith(('.zip', '.tar', '.tgz', '.tar.gz')))
+
+
+def _zip_items(data: bytes) -> List[BatchItem]:
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    return [
+        BatchItem(info.filename, info.file_size, lambda info=info: archive.read(info))
+        for info in archive.infolist()
+        if not info.is_dir() and is_audio_name(info.filename)
+    ]
+
+
+def _tar_items(data: bytes) -> List[BatchItem]:
+    archive = tarfile.open(fileobj=io.BytesIO(data), mode='r:*')
+    return [
+        BatchItem(member.name, member.size, lambda member=member: archive.extractfile(member).read())
+        for member in archive.getmembers()
+        if member.isfile() and is_audio_name(member.name)
+    ]
+
+
+def expand_upload(name: str, data: bytes, content_type: Optional[str] = None) -> List[BatchItem]:
+    """
+    展开一个上传文件：zip/tar（含tar.gz）归档展开为其中的音频文件，其余视为单个音频
+
+    Args:
+        name: 上传的文件名
+        data: 文件内容
+        content_type: 上传时声明的Content-Type
+
+    Returns:
+        list: 待识别的文件，保持归档内的顺序
+
+    Raises:
+        ValueError: 归档损坏
+    """
+    if not data:
+        return []
+    if not _is_archive(name, data, content_type):
+        media_type = content_type if (content_type or '').lower().startswith('audio/') else None
+        return [BatchItem(name, len(data), lambda: data, media_type)]
+    try:
+        if bytes(data[:4]) == b'PK\x03\x04':
+            return _zip_items(data)
+        return _tar_items(data)
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+        raise ValueError(f"无法读取归档 {name}: {e}") from e
+
+
+def check_batch(items: Iterable[BatchItem], max_files: int = 0, max_file_bytes: int = 0) -> List[BatchItem]:
+    """
+    检查文件数和单个文件大小（按归档中记录的大小，读取前即可拒绝），并为各文件编号
+
+    Args:
+        items: 待识别的文件
+        max_files: 最多文件数，0表示不限制
+        max_file_bytes: 单个文件的最大字节数，0表示不限制
+
+    Returns:
+        list: 编号后的文件
+
+    Raises:
+        ValueError: 超出限制
+    """
+    items = list(items)
+    if max_files and len(items) > max_files:
+        raise ValueError(f"文件数{len(items)}超过上限{max_files}")
+    for index, item in enumerate(items):
+        if max_file_bytes and item.size > max_file_bytes:
+            raise ValueError(f"文件 {item.name} 大小{item.size}字节，超过上限{max_file_bytes}字节")
+        item.index = index
+    return items
+
+
+class BatchTranscriber:
+    """
+    批量识别的进程池
+
+    Args:
+        workers: 工作进程数，0表示CPU核数
+        asr_kwargs: 工作进程内create_asr_service的参数
+        max_in_flight: 每个批次同时提交的文件数，默认为工作进程数的2倍（限制读入内存的文件数）
+        start_method: 多进程启动方式
+        log_level: 工作进程的日志级别
+    """
+
+    def __init__(self,
+                 workers: int = 0,
+                 asr_kwargs: Optional[Dict] = None,
+                 max_in_flight: int = 0,
+                 start_method: Optional[str] = None,
+                 log_level: str = 'INFO'):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or self.workers * 2
+        mp_context = multiprocessing.get_context(start_method) if start_method else None
+        # 工作进程在首次提交任务时启动，各自加载一次模型
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp_context,
+            initializer=_init_asr_worker,
+            initargs=(asr_kwargs or {}, log_level)
+        )
+        self._lock = threading.Lock()
+        self._stats = {'batches': 0, 'active_batches': 0, 'files': 0, 'errors': 0, 'audio_seconds': 0.0}
+        logger.info("批量识别进程池初始化完成 - 工作进程: %d, 每批在途上限: %d", self.workers, self.max_in_flight)
+
+    def _submit(self, item: BatchItem) -> Tuple[Future, float]:
+        # 归档成员在提交时才解压，在途文件数有上限，内存占用与批次大小无关
+        return self._executor.submit(_run_batch_asr, item.read(), item.media_type), time.perf_counter()
+
+    def _result_event(self, item: BatchItem, future: Future, submitted: float, totals: Dict) -> Dict:
+        elapsed_ms = round((time.perf_counter() - submitted) * 1000, 2)
+        try:
+            result = future.result()
+        except Exception as e:
+            totals['errors'] += 1
+            logger.warning("批量识别失败 - %s: %s", item.name, e)
+            return {'type': 'error', 'index': item.index, 'name': item.name, 'error': str(e),
+                    'elapsed_ms': elapsed_ms}
+        totals['audio_seconds'] += result['audio_seconds']
+        audio_seconds = result['audio_seconds']
+        rtf = round(result['recognize_ms'] / 1000 / audio_seconds, 4) if audio_seconds else None
+        return {'type': 'result', 'index': item.index, 'name': item.name, **result, 'rtf': rtf, 'elapsed_ms': elapsed_ms}
+
+    def _error_event(self, item: BatchItem, error: Exception, totals: Dict) -> Dict:
+        totals['errors'] += 1
+        logger.warning("批量识别文件读取失败 - %s: %s", item.name, error)
+        return {'type': 'error', 'index': item.index, 'name': item.name, 'error': str(error)}
+
+    def _begin(self) -> Tuple[Dict, float]:
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['active_batches'] += 1
+        return {'files': 0, 'errors': 0, 'audio_seconds': 0.0}, time.perf_counter()
+
+    def _end(self, totals: Dict):
+        with self._lock:
+            self._stats['active_batches'] -= 1
+            self._stats['files'] += totals['files']
+            self._stats['errors'] += totals['errors']
+            self._stats['audio_seconds'] += totals['audio_seconds']
+
+    def _done_event(self, totals: Dict, start: float) -> Dict:
+        elapsed = time.perf_counter() - start
+        return {
+            'type': 'done',
+            'files': totals['files'],
+            'errors': totals['errors'],
+            'audio_seconds': round(totals['audio_seconds'], 3),
+            'elapsed_ms': round(elapsed * 1000, 2),
+            # 吞吐：每秒墙钟时间转写的音频秒数
+            'speed': round(totals['audio_seconds'] / elapsed, 3) if elapsed > 0 else None,
+            'workers': self.workers,
+        }
+
+    def run(self, items: Iterable[BatchItem]) -> Iterator[Dict]:
+        """
+        识别一批文件
+
+        Args:
+            items: check_batch编号后的文件
+
+        Yields:
+            dict: 按完成顺序的 {'type': 'result', 'index', 'name', 'text', 'audio_seconds',
+                  'decode_ms', 'vad_ms', 'recognize_ms', 'rtf', 'elapsed_ms', 'worker'}
+                  或 {'type': 'error', 'index', 'name', 'error'}，最后为 {'type': 'done', ...}
+        """
+        totals, start = self._begin()
+        remaining = iter(items)
+        pending = {}
+        try:
+            while True:
+                while len(pending) < self.max_in_flight:
+                    item = next(remaining, None)
+                    if item is None:
+                        break
+                    totals['files'] += 1
+                    try:
+                        future, submitted = self._submit(item)
+                    except Exception as e:
+                        yield self._error_event(item, e, totals)
+                        continue
+                    pending[future] = (item, submitted)
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item, submitted = pending.pop(future)
+                    yield self._result_event(item, future, submitted, totals)
+        finally:
+            # 客户端断开时取消尚未开始的任务
+            for future in pending:
+                future.cancel()
+            self._end(totals)
+        yield self._done_event(totals, start)
+
+    async def run_async(self, items: Iterable[BatchItem]) -> AsyncIterator[Dict]:
+        """run的异步版本，等待工作进程结果时不占用线程"""
+        totals, start = self._begin()
+        remaining = iter(items)
+        pending = {}
+        try:
+            while True:
+                while len(pending) < self.max_in_flight:
+                    item = next(remaining, None)
+                    if item is None:
+                        break
+                    totals['files'] += 1
+                    try:
+                        future, submitted = self._submit(item)
+                    except Exception as e:
+                        yield self._error_event(item, e, totals)
+                        continue
+                    pending[asyncio.wrap_future(future)] = (item, future, submitted)
+                if not pending:
+                    break
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for waiter in done:
+                    item, future, submitted = pending.pop(waiter)
+                    yield self._result_event(item, future, submitted, totals)
+        finally:
+            for _, future, _ in pending.values():
+                future.cancel()
+            self._end(totals)
+        yield self._done_event(totals, start)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['audio_seconds'] = round(stats['audio_seconds'], 3)
+        stats.update(workers=self.workers, max_in_flight=self.max_in_flight)
+        return stats
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,195 @@
+"""
+替身推理引擎：不下载、不加载模型，用于基准测试和CI
+
+- FakeTTSEngine：与PaddleTTSEngine接口一致，按文本长度生成类语音信号
+- FakeRecognizer：与Vosk KaldiRecognizer接口一致，按音频时长返回固定格式的文本
+
+两者都按设定的实时率（RTF）占用时间，并像真实模型一样串行执行推理，
+因此排队、并发和尾延迟的表现与真实引擎相近，只是不消耗模型推理的CPU。
+"""
+
+import json
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.text_segmenter import split_sentences
+from services.tts_engine import concat_waveforms
+from services.vosk_pool import VoskModelRegistry
+
+# 每个字符（音素ID）对应的梅尔帧数和每帧采样点数：24kHz下每字0.2秒
+_FRAMES_PER_CHAR = 16
+_HOP_LENGTH = 300
+_MEL_BINS = 80
+# 合成耗时在声学模型和声码器之间的分配（声码器通常占大头）
+_AM_SHARE = 0.3
+# 各声码器相对Parallel WaveGAN的耗时（按名称前缀匹配），用于模拟质量档位的速度差异
+_VOC_COST = {'mb_melgan': 0.25, 'style_melgan': 0.5, 'pwgan': 1.0, 'hifigan': 1.5}
+
+
+class FakeTTSEngine:
+    """
+    TTS替身引擎
+
+    Args:
+        am: 声学模型名称（仅用于缓存键和日志）
+        voc: 声码器名称（仅用于缓存键和日志）
+        lang: 语言
+        frontend_cache_items: 忽略，与PaddleTTSEngine参数保持一致
+        extra_vocoders: 忽略，与PaddleTTSEngine参数保持一致
+        rtf: 模拟的实时率（默认声码器为pwgan时），合成1秒音频占用rtf秒
+        sample_rate: 输出采样率
+    """
+
+    def __init__(self,
+                 am: str = 'fastspeech2_male',
+                 voc: str = 'pwgan_male',
+                 lang: str = 'zh',
+                 frontend_cache_items: int = 0,
+                 extra_vocoders: Sequence[str] = (),
+                 rtf: float = 0.05,
+                 sample_rate: int = 24000):
+        self.am = am
+        self.voc = voc
+        self.lang = lang
+        self.rtf = rtf
+        self._sample_rate = sample_rate
+        self.frontend_cache = None
+        self.loaded = False
+        self.supports_batching = True
+        self._lock = threading.RLock()
+
+    def load(self):
+        self.loaded = True
+
+    @property
+    def sample_rate(self) -> int:
+        return self._sample_rate
+
+    def _seconds(self, frames: int) -> float:
+        return frames * _HOP_LENGTH / self._sample_rate
+
+    def frontend(self, text: str) -> List[np.ndarray]:
+        """按句切分，以字符码位作为音素ID"""
+        self.load()
+        return [
+            np.frombuffer(sentence.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+            for sentence in split_sentences(text) or [text]
+        ]
+
+    def acoustic(self, phone_ids: List[np.ndarray], spk_id: int = 0) -> List[np.ndarray]:
+        """每个音素展开为固定帧数，第0维保存音素ID供声码器生成音高；批量调用只按最长一条计时"""
+        longest = max(len(ids) for ids in phone_ids) * _FRAMES_PER_CHAR
+        with self._lock:
+            time.sleep(self.rtf * _AM_SHARE * self._seconds(longest))
+        mels = []
+        for ids in phone_ids:
+            mel = np.zeros((len(ids) * _FRAMES_PER_CHAR, _MEL_BINS), dtype=np.float32)
+            mel[:, 0] = np.repeat(ids, _FRAMES_PER_CHAR)
+            mels.append(mel)
+        return mels
+
+    def vocode(self, mel: np.ndarray, voc: Optional[str] = None) -> np.ndarray:
+        """按音素ID决定基频，生成带音节包络的谐波信号；耗时按声码器的相对开销缩放"""
+        voc = voc or self.voc
+        cost = next((value for prefix, value in _VOC_COST.items() if voc.startswith(prefix)), 1.0)
+        with self._lock:
+            time.sleep(self.rtf * (1 - _AM_SHARE) * cost * self._seconds(len(mel)))
+        f0 = np.repeat(100.0 + mel[:, 0] % 100.0, _HOP_LENGTH)
+        phase = 2 * np.pi * np.cumsum(f0) / self._sample_rate
+        t = np.arange(len(f0)) / self._sample_rate
+        envelope = np.clip(np.sin(2 * np.pi * 2.5 * t), 0.0, None)
+        wav = 0.3 * envelope * (np.sin(phase) + 0.5 * np.sin(2 * phase) + 0.25 * np.sin(3 * phase))
+        return wav.astype(np.float32)
+
+    def synthesize(self, text: str, spk_id: int = 0,
+                   voc: Optional[str] = None) -> Tuple[np.ndarray, int, Dict[str, float]]:
+        """
+        合成语音
+
+        Returns:
+            tuple: (float32单声道波形, 采样率, 各阶段耗时毫秒数{'frontend', 'am', 'voc'})
+        """
+        frontend_start = time.perf_counter()
+        phone_ids = self.frontend(text)
+        am_start = time.perf_counter()
+        mels = self.acoustic(phone_ids, spk_id)
+        voc_start = time.perf_counter()
+        samples = concat_waveforms([self.vocode(mel, voc) for mel in mels])
+        voc_end = time.perf_counter()
+        timings = {
+            'frontend': (am_start - frontend_start) * 1000,
+            'am': (voc_start - am_start) * 1000,
+            'voc': (voc_end - voc_start) * 1000,
+        }
+        return samples, self._sample_rate, timings
+
+
+class FakeASRModel:
+    """ASR替身模型，只记录模拟的实时率"""
+
+    def __init__(self, model_path: str, rtf: float = 0.02):
+        self.model_path = model_path
+        self.rtf = rtf
+
+
+class FakeRecognizer:
+    """
+    KaldiRecognizer替身：每送入约3秒音频产出一个分句结果
+
+    识别结果为"语音片段N"（N为片段序号），中间结果为已送入的秒数。
+    """
+
+    SEGMENT_SECONDS = 3.0
+
+    def __init__(self, model: FakeASRModel, sample_rate: int):
+        self.model = model
+        self.sample_rate = sample_rate
+        self.Reset()
+
+    def SetWords(self, enabled):
+        pass
+
+    def Reset(self):
+        self._segments = 0
+        self._pending_bytes = 0
+
+    def AcceptWaveform(self, data) -> bool:
+        seconds = len(data) / (2 * self.sample_rate)
+        time.sleep(self.model.rtf * seconds)
+        self._pending_bytes += len(data)
+        return self._pending_bytes >= self.SEGMENT_SECONDS * 2 * self.sample_rate
+
+    def _take_segment(self) -> str:
+        if self._pending_bytes == 0:
+            return ''
+        self._pending_bytes = 0
+        self._segments += 1
+        return f'语音片段{self._segments}'
+
+    def Result(self) -> str:
+        return json.dumps({'text': self._take_segment()}, ensure_ascii=False)
+
+    def PartialResult(self) -> str:
+        seconds = self._pending_bytes / (2 * self.sample_rate)
+        return json.dumps({'partial': f'{seconds:.0f}秒'}, ensure_ascii=False)
+
+    def FinalResult(self) -> str:
+        return self.Result()
+
+
+@lru_cache(maxsize=None)
+def fake_model_registry(rtf: float = 0.02) -> VoskModelRegistry:
+    """
+    使用替身模型和识别器的模型注册表（同一实时率在进程内共用，识别器池得以复用）
+
+    Args:
+        rtf: 模拟的实时率
+    """
+    return VoskModelRegistry(
+        model_factory=lambda path: FakeASRModel(path, rtf=rtf),
+        recognizer_factory=FakeRecognizer
+    )
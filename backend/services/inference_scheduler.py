@@ -0,0 +1,239 @@
+"""
+推理调度器：TTS/ASR推理在独立的工作进程池中执行
+
+每个工作进程启动时预加载模型；每类任务的在途数量（执行中 + 排队）有上限，
+超出时立即拒绝（SchedulerSaturatedError），由接口返回503和Retry-After。
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerSaturatedError(RuntimeError):
+    """推理队列已满"""
+
+    def __init__(self, kind: str, retry_after: int):
+        super().__init__(f"{kind}推理队列已满，请稍后重试")
+        self.kind = kind
+        self.retry_after = retry_after
+
+
+# ---- 工作进程内的全局状态与任务函数 ----
+
+_worker_tts_engine = None
+_worker_asr_service = None
+
+
+def _init_worker_logging(log_level):
+    from logging_setup import configure_worker_logging
+    configure_worker_logging(log_level)
+
+
+def _init_tts_worker(engine_kwargs, log_level='INFO'):
+    """TTS工作进程初始化：加载声学模型和声码器"""
+    global _worker_tts_engine
+    _init_worker_logging(log_level)
+    from services.tts_engine import create_tts_engine
+    _worker_tts_engine = create_tts_engine(**engine_kwargs)
+    _worker_tts_engine.load()
+
+
+def _run_tts(text, spk_id, voc=None):
+    return _worker_tts_engine.synthesize(text, spk_id=spk_id, voc=voc)
+
+
+def _init_asr_worker(asr_kwargs, log_level='INFO'):
+    """ASR工作进程初始化：加载Vosk模型"""
+    global _worker_asr_service
+    _init_worker_logging(log_level)
+    from services.speech_recognition import create_asr_service
+    _worker_asr_service = create_asr_service(**asr_kwargs)
+
+
+def _run_asr(audio_data, media_type=None):
+    return _worker_asr_service.recognize_from_wav(audio_data, media_type)
+
+
+def _run_batch_asr(audio_data, media_type=None):
+    """批量识别任务：出错时抛出异常，由调用方按文件报告"""
+    result = _worker_asr_service.transcribe(audio_data, media_type)
+    result['worker'] = os.getpid()
+    return result
+
+
+class WorkerPool:
+    """
+    一类推理任务的工作进程池和有界队列
+    """
+
+    def __init__(self, kind: str, workers: int, max_queue: int, retry_after: int,
+                 initializer, initargs, mp_context=None):
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        # 工作进程在首次提交任务时启动
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp_context,
+            initializer=initializer,
+            initargs=initargs
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {'submitted': 0, 'rejected': 0, 'completed': 0, 'failed': 0}
+
+    def submit(self, fn, *args) -> Future:
+        """
+        提交任务
+
+        Returns:
+            Future: 任务结果
+
+        Raises:
+            SchedulerSaturatedError: 在途任务数已达 workers + max_queue
+        """
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._stats['rejected'] += 1
+                raise SchedulerSaturatedError(self.kind, self.retry_after)
+            self._pending += 1
+            self._stats['submitted'] += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: Future):
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self._stats['failed'] += 1
+            else:
+                self._stats['completed'] += 1
+
+    @property
+    def queue_depth(self) -> int:
+        """排队中（尚未分配到工作进程）的任务数"""
+        with self._lock:
+            return max(0, self._pending - self.workers)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'in_flight': self._pending,
+                'queue_depth': max(0, self._pending - self.workers),
+            })
+        return stats
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class InferenceScheduler:
+    """
+    TTS/ASR推理调度器
+
+    工作进程数为0的任务类型不启用进程池，由调用方在请求线程内直接推理。
+    """
+
+    def __init__(self,
+                 tts_workers: int = 0,
+                 asr_workers: int = 0,
+                 max_queue: int = 16,
+                 retry_after: int = 2,
+                 tts_engine_kwargs: Optional[Dict] = None,
+                 asr_kwargs: Optional[Dict] = None,
+                 start_method: Optional[str] = None,
+                 log_level: str = 'INFO'):
+        mp_context = multiprocessing.get_context(start_method) if start_method else None
+        self.tts = None
+        self.asr = None
+        if tts_workers > 0:
+            self.tts = WorkerPool('TTS', tts_workers, max_queue, retry_after,
+                                  _init_tts_worker, (tts_engine_kwargs or {}, log_level), mp_context)
+        if asr_workers > 0:
+            self.asr = WorkerPool('ASR', asr_workers, max_queue, retry_after,
+                                  _init_asr_worker, (asr_kwargs or {}, log_level), mp_context)
+        logger.info("推理调度器初始化完成 - TTS工作进程: %d, ASR工作进程: %d, 队列上限: %d",
+                    tts_workers, asr_workers, max_queue)
+
+    def submit_tts(self, text: str, spk_id: int = 0, voc: Optional[str] = None) -> Future:
+        """
+        提交TTS合成任务
+
+        Args:
+            text: 待合成文本
+            spk_id: 说话人ID
+            voc: 声码器名称，默认为工作进程引擎的默认声码器
+
+        Returns:
+            Future: 结果为 (float32波形, 采样率, 各阶段耗时)
+        """
+        return self.tts.submit(_run_tts, text, spk_id, voc)
+
+    def submit_asr(self, audio_data: bytes, media_type: Optional[str] = None) -> Future:
+        """
+        提交ASR识别任务
+
+        Args:
+            audio_data: 上传的音频数据
+            media_type: 上传时声明的Content-Type
+
+        Returns:
+            Future: 结果为识别文本
+        """
+        return self.asr.submit(_run_asr, audio_data, media_type)
+
+    def get_stats(self) -> Dict:
+        return {
+            'tts': self.tts.get_stats() if self.tts else None,
+            'asr': self.asr.get_stats() if self.asr else None,
+        }
+
+    def shutdown(self):
+        for pool in (self.tts, self.asr):
+            if pool is not None:
+                pool.shutdown()
+
+
+class ScheduledTTSEngine:
+    """
+    与PaddleTTSEngine接口一致的引擎代理，合成在调度器的工作进程中完成
+    """
+
+    def __init__(self, scheduler: InferenceScheduler, sample_rate: int = 24000, timeout: float = 60.0):
+        self.scheduler = scheduler
+        self.timeout = timeout
+        self._sample_rate = sample_rate
+        self.loaded = True
+
+    def load(self):
+        """模型由工作进程在启动时加载"""
+
+    @property
+    def sample_rate(self) -> int:
+        return self._sample_rate
+
+    def synthesize(self, text: str, spk_id: int = 0, voc: Optional[str] = None):
+        """
+        提交合成任务并等待结果
+
+        Raises:
+            SchedulerSaturatedError: 队列已满
+            concurrent.futures.TimeoutError: 超过timeout未完成
+        """
+        return self.scheduler.submit_tts(text, spk_id, voc).result(timeout=self.timeout)
@@ -0,0 +1,273 @@
+"""
+性能指标：计数器、直方图和回调式仪表，导出为Prometheus文本格式
+
+直方图同时保留最近的观测值滑动窗口，用于计算p50/p95/p99。
+计时统一使用time.perf_counter()（单调时钟）。
+"""
+
+import bisect
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+# 默认延迟分桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 实时率分桶（处理耗时 / 音频时长）
+RTF_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类：按标签值组合分别记录"""
+
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 的标签应为 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> Iterable[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self.type}'
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self) -> Iterable[str]:
+        with self._lock:
+            values = list(self._values.items())
+        yield from self.header()
+        for key, value in values:
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {','.join(key) or self.name: value for key, value in self._values.items()}
+
+
+class _HistogramSeries:
+    __slots__ = ('counts', 'sum', 'count', 'window')
+
+    def __init__(self, num_buckets: int, window: int):
+        self.counts = [0] * num_buckets
+        self.sum = 0.0
+        self.count = 0
+        self.window = deque(maxlen=window)
+
+
+class Histogram(_Metric):
+    """
+    直方图：Prometheus累积分桶 + 最近window个观测值（用于分位数）
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, window: int = 1024):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.window = window
+        self._series = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(len(self.buckets) + 1, self.window)
+            series.counts[index] += 1
+            series.sum += value
+            series.count += 1
+            series.window.append(value)
+
+    @contextmanager
+    def time(self, **labels):
+        """计时上下文，退出时记录经过的秒数"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def quantiles(self, **labels) -> Dict[str, float]:
+        """滑动窗口内的p50/p95/p99"""
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            values = sorted(series.window) if series is not None else []
+        return _quantiles(values)
+
+    def collect(self) -> Iterable[str]:
+        with self._lock:
+            snapshot = [(key, list(s.counts), s.sum, s.count) for key, s in self._series.items()]
+        yield from self.header()
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {_format_value(total)}'
+            yield f'{self.name}_count{labels} {count}'
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            snapshot = [(key, s.count, s.sum, sorted(s.window)) for key, s in self._series.items()]
+        stats = {}
+        for key, count, total, values in snapshot:
+            entry = {'count': count, 'mean': round(total / count, 6) if count else 0.0}
+            entry.update(_quantiles(values))
+            stats[','.join(key) or self.name] = entry
+        return stats
+
+
+class Gauge(_Metric):
+    """
+    回调式仪表：导出时调用callback获取当前值
+
+    callback返回单个数值，或 {标签值元组: 数值} 字典（有标签时）。
+    """
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation, callback: Callable, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def _values(self) -> Dict[Tuple, float]:
+        try:
+            value = self.callback()
+        except Exception:
+            return {}
+        if value is None:
+            return {}
+        if isinstance(value, dict):
+            return {tuple(str(v) for v in key): val for key, val in value.items() if val is not None}
+        return {(): value}
+
+    def collect(self) -> Iterable[str]:
+        values = self._values()
+        yield from self.header()
+        for key, value in values.items():
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+    def get_stats(self) -> Dict:
+        return {','.join(key) or self.name: value for key, value in self._values().items()}
+
+
+def _quantiles(sorted_values) -> Dict[str, float]:
+    if not sorted_values:
+        return {f'p{int(q * 100)}': None for q in QUANTILES}
+    last = len(sorted_values) - 1
+    return {
+        f'p{int(q * 100)}': round(sorted_values[min(last, int(math.ceil(q * len(sorted_values))) - 1)], 6)
+        for q in QUANTILES
+    }
+
+
+class MetricsRegistry:
+    """指标注册表，同名指标只创建一次"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为 {metric.type}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def gauge(self, name: str, documentation: str, callback: Callable,
+              labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, callback, labelnames)
+
+    def render_prometheus(self) -> str:
+        """Prometheus文本格式（0.0.4）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+    def get_stats(self) -> Dict:
+        """
+        Returns:
+            dict: {指标名: {标签值: 值或分位数统计}}
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.get_stats() for metric in metrics}
+
+
+# 进程级单例
+metrics = MetricsRegistry()
+
+# 各服务共用的指标
+STAGE_SECONDS = metrics.histogram(
+    'mouth_stage_seconds', '各处理阶段耗时（秒）', ['service', 'stage']
+)
+REQUEST_SECONDS = metrics.histogram(
+    'mouth_request_seconds', '接口请求耗时（秒）', ['endpoint', 'method', 'status']
+)
+REAL_TIME_FACTOR = metrics.histogram(
+    'mouth_real_time_factor', '实时率：推理耗时 / 音频时长', ['service'], buckets=RTF_BUCKETS
+)
+BYTES_RECEIVED = metrics.counter('mouth_bytes_received_total', '接收的请求体字节数', ['endpoint'])
+BYTES_SENT = metrics.counter('mouth_bytes_sent_total', '发送的响应体字节数', ['endpoint'])
+AUDIO_SECONDS = metrics.counter('mouth_audio_seconds_total', '处理的音频时长（秒）', ['service'])
+VAD_SECONDS = metrics.counter('mouth_asr_vad_seconds_total', 'VAD判定的音频时长（秒）', ['kind'])
+TTS_QUALITY = metrics.counter('mouth_tts_quality_total', '按请求档位和实际档位统计的TTS合成次数',
+                              ['requested', 'served'])
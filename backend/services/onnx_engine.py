@@ -0,0 +1,304 @@
+"""
+ONNX Runtime推理引擎：FastSpeech2声学模型和声码器以ONNX格式加载，由onnxruntime在CPU上推理
+
+模型文件由 tools/export_onnx.py 从PaddleSpeech预训练模型导出，目录结构：
+    <model_dir>/<am>.onnx          声学模型（输入音素ID，输出反归一化后的梅尔频谱）
+    <model_dir>/<am>.json          声学模型信息（采样率、语言、是否多说话人）
+    <model_dir>/<am>_phones.txt    音素表（文本前端使用）
+    <model_dir>/<voc>.onnx         声码器（输入梅尔频谱，输出波形）
+
+与PaddleTTSEngine相比不创建TTSExecutor、不加载Paddle模型，推理只经过onnxruntime；
+文本前端仍使用PaddleSpeech的前端（按句缓存）。声学模型和声码器各自串行执行，
+一个请求的声码器推理可以与另一个请求的声学模型推理重叠。
+
+onnxruntime只在load()中导入，未安装时只有选择该引擎才会报错。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.tts_engine import concat_waveforms
+from services.tts_frontend import CachedFrontend
+
+logger = logging.getLogger(__name__)
+
+
+def _create_frontend(lang: str, phones_path: str):
+    """按语言创建PaddleSpeech文本前端"""
+    if lang.startswith('zh'):
+        from paddlespeech.t2s.frontend.zh_frontend import Frontend
+        return Frontend(phone_vocab_path=phones_path)
+    if lang == 'en':
+        from paddlespeech.t2s.frontend import English
+        return English(phone_vocab_path=phones_path)
+    raise ValueError(f"ONNX引擎不支持的语言: {lang}")
+
+
+class OnnxTTSEngine:
+    """
+    与PaddleTTSEngine接口一致的ONNX Runtime合成引擎
+
+    声学模型按单条输入导出，不支持动态批处理（supports_batching为False，多句逐句推理）。
+
+    Args:
+        am: 声学模型名称（对应<model_dir>/<am>.onnx）
+        voc: 默认声码器名称
+        lang: 语言
+        frontend_cache_items: 文本前端缓存的句子数
+        extra_vocoders: load()时一并加载的其他声码器，未列出的在首次使用时加载
+        model_dir: ONNX模型目录
+        intra_op_threads: 单个算子内的并行线程数，0表示使用onnxruntime的默认值（物理核数）
+        inter_op_threads: 图中独立分支的并行线程数，0表示使用默认值；大于1时启用并行执行模式
+    """
+
+    def __init__(self,
+                 am: str = 'fastspeech2_male',
+                 voc: str = 'pwgan_male',
+                 lang: str = 'zh',
+                 frontend_cache_items: int = 4096,
+                 extra_vocoders: Sequence[str] = (),
+                 model_dir: str = os.path.join('models', 'onnx'),
+                 intra_op_threads: int = 0,
+                 inter_op_threads: int = 0):
+        self.am = am
+        self.voc = voc
+        self.lang = lang
+        self.frontend_cache_items = frontend_cache_items
+        self.extra_vocoders = [name for name in extra_vocoders if name != voc]
+        self.model_dir = model_dir
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.frontend_cache = None
+        self.am_info = None
+        self.loaded = False
+        self.supports_batching = False
+        self._am_session = None
+        self._am_inputs = []
+        self._vocoders = {}  # 声码器名称 -> InferenceSession
+        self._lock = threading.RLock()
+        self._am_lock = threading.Lock()
+        self._voc_lock = threading.Lock()
+
+    def _path(self, name: str, suffix: str) -> str:
+        return os.path.join(self.model_dir, name + suffix)
+
+    def _open(self, name: str):
+        """创建推理会话"""
+        import onnxruntime as ort
+
+        path = self._path(name, '.onnx')
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"ONNX模型不存在: {path}，请先运行 python -m tools.export_onnx 导出")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.intra_op_threads > 0:
+            options.intra_op_num_threads = self.intra_op_threads
+        if self.inter_op_threads > 0:
+            options.inter_op_num_threads = self.inter_op_threads
+        if self.inter_op_threads > 1:
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+        return ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+
+    def load(self):
+        """
+        加载声学模型、默认声码器和文本前端（之后的调用直接返回）
+        """
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            load_start = time.time()
+            info_path = self._path(self.am, '.json')
+            if not os.path.exists(info_path):
+                raise FileNotFoundError(f"ONNX模型信息不存在: {info_path}，请先运行 python -m tools.export_onnx 导出")
+            with open(info_path, encoding='utf-8') as f:
+                self.am_info = json.load(f)
+            self._am_session = self._open(self.am)
+            self._am_inputs = [item.name for item in self._am_session.get_inputs()]
+            self._vocoders[self.voc] = self._open(self.voc)
+            frontend = _create_frontend(self.lang, self._path(self.am, '_phones.txt'))
+            self.frontend_cache = CachedFrontend(frontend.get_input_ids, max_items=self.frontend_cache_items)
+            self.loaded = True
+            logger.info("ONNX TTS模型加载完成 - am: %s, voc: %s, 线程: intra=%d inter=%d, 耗时: %.2fms",
+                        self.am, self.voc, self.intra_op_threads, self.inter_op_threads,
+                        (time.time() - load_start) * 1000)
+            for name in self.extra_vocoders:
+                self._vocoder(name)
+
+    def _vocoder(self, voc: Optional[str]):
+        """取声码器会话，未加载的先加载"""
+        self.load()
+        voc = voc or self.voc
+        session = self._vocoders.get(voc)
+        if session is not None:
+            return session
+        with self._lock:
+            session = self._vocoders.get(voc)
+            if session is None:
+                load_start = time.time()
+                session = self._vocoders[voc] = self._open(voc)
+                logger.info("ONNX声码器加载完成 - voc: %s, 耗时: %.2fms", voc, (time.time() - load_start) * 1000)
+        return session
+
+    @property
+    def sample_rate(self) -> int:
+        """模型输出采样率"""
+        self.load()
+        return int(self.am_info['sample_rate'])
+
+    def frontend(self, text: str) -> List[np.ndarray]:
+        """
+        文本前端：文本规范化、分句、G2P，按句缓存结果
+
+        Returns:
+            list: 每句一个int64音素ID数组（只读，与缓存共享）
+        """
+        self.load()
+        return self.frontend_cache(text)['phone_ids']
+
+    def acoustic(self, phone_ids: List[np.ndarray], spk_id: int = 0) -> List[np.ndarray]:
+        """
+        声学模型：音素ID -> 梅尔频谱，逐条推理
+
+        Args:
+            phone_ids: 音素ID数组列表
+            spk_id: 说话人ID（仅多说话人模型使用）
+
+        Returns:
+            list: 与输入一一对应的梅尔频谱，形状为 (帧数, 梅尔维数)
+        """
+        self.load()
+        mels = []
+        with self._am_lock:
+            for ids in phone_ids:
+                feeds = {self._am_inputs[0]: np.asarray(ids, dtype=np.int64)}
+                if len(self._am_inputs) > 1:
+                    feeds[self._am_inputs[1]] = np.array([spk_id], dtype=np.int64)
+                mels.append(self._am_session.run(None, feeds)[0])
+        return mels
+
+    def vocode(self, mel: np.ndarray, voc: Optional[str] = None) -> np.ndarray:
+        """
+        声码器：梅尔频谱 -> 波形
+
+        Args:
+            mel: 梅尔频谱
+            voc: 声码器名称，默认为构造时指定的声码器
+
+        Returns:
+            np.ndarray: float32波形
+        """
+        session = self._vocoder(voc)
+        feeds = {session.get_inputs()[0].name: np.asarray(mel, dtype=np.float32)}
+        with self._voc_lock:
+            wav = session.run(None, feeds)[0]
+        return np.asarray(wav, dtype=np.float32).reshape(-1)
+
+    def synthesize(self, text: str, spk_id: int = 0,
+                   voc: Optional[str] = None) -> Tuple[np.ndarray, int, Dict[str, float]]:
+        """
+        合成语音
+
+        Args:
+            text: 待合成文本
+            spk_id: 说话人ID
+            voc: 声码器名称，默认为构造时指定的声码器
+
+        Returns:
+            tuple: (float32单声道波形, 采样率, 各阶段耗时毫秒数{'frontend', 'am', 'voc'})
+        """
+        frontend_start = time.perf_counter()
+        phone_ids = self.frontend(text)
+        am_start = time.perf_counter()
+        mels = self.acoustic(phone_ids, spk_id)
+        voc_start = time.perf_counter()
+        samples = concat_waveforms([self.vocode(mel, voc) for mel in mels])
+        voc_end = time.perf_counter()
+        timings = {
+            'frontend': (am_start - frontend_start) * 1000,
+            'am': (voc_start - am_start) * 1000,
+            'voc': (voc_end - voc_start) * 1000,
+        }
+        return samples, self.sample_rate, timings
+
+
+# ---- 与Paddle推理结果的一致性检查 ----
+
+def band_energy_db(samples: np.ndarray, frame_length: int = 1024, hop_length: int = 256,
+                   bands: int = 32) -> np.ndarray:
+    """
+    逐帧分频带能量（dB），形状为 (帧数, 频带数)
+
+    比较的是频谱包络而不是逐点波形：PWGAN等声码器以随机噪声为激励，
+    两次推理的波形逐点不同，但频谱包络应当一致。
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    if len(samples) < frame_length:
+        samples = np.pad(samples, (0, frame_length - len(samples)))
+    frames = np.lib.stride_tricks.sliding_window_view(samples, frame_length)[::hop_length]
+    power = np.abs(np.fft.rfft(frames * np.hanning(frame_length).astype(np.float32), axis=1)) ** 2
+    edges = np.linspace(0, power.shape[1], bands + 1).astype(int)[:-1]
+    return 10.0 * np.log10(np.add.reduceat(power, edges, axis=1) + 1e-10)
+
+
+def band_distance_db(reference: np.ndarray, candidate: np.ndarray, floor_db: float = 60.0) -> float:
+    """两段波形的分频带能量平均绝对差（dB），只比较能量在参考最大值floor_db以内的时频单元"""
+    length = min(len(reference), len(candidate))
+    ref = band_energy_db(reference[:length])
+    cand = band_energy_db(candidate[:length])
+    mask = ref > ref.max() - floor_db
+    return float(np.mean(np.abs(ref - cand)[mask]))
+
+
+def compare_engines(reference, candidate, texts: Sequence[str], vocoders: Sequence[Optional[str]] = (None,),
+                    spk_id: int = 0, mel_tolerance: float = 0.02, band_tolerance_db: float = 1.5) -> List[Dict]:
+    """
+    逐句比较两个引擎（通常为PaddleTTSEngine和OnnxTTSEngine）的输出
+
+    两个引擎使用参考引擎的音素ID：声学模型比较梅尔频谱（帧数须相同，平均绝对差不超过mel_tolerance），
+    声码器以参考引擎的同一梅尔频谱为输入，比较分频带能量（平均绝对差不超过band_tolerance_db）。
+
+    Args:
+        reference: 参考引擎
+        candidate: 被检查的引擎
+        texts: 测试文本
+        vocoders: 要检查的声码器，None表示默认声码器
+        spk_id: 说话人ID
+        mel_tolerance: 梅尔频谱（对数幅度）的平均绝对差上限
+        band_tolerance_db: 分频带能量的平均绝对差上限（dB）
+
+    Returns:
+        list: 每句每个声码器一行 {'text', 'voc', 'frames', 'mel_max_abs', 'mel_mean_abs',
+              'band_db', 'length_ratio', 'passed'}
+    """
+    rows = []
+    for text in texts:
+        for ids in reference.frontend(text):
+            ref_mel = reference.acoustic([ids], spk_id)[0]
+            cand_mel = candidate.acoustic([ids], spk_id)[0]
+            mel_row = {'text': text, 'frames': [int(len(ref_mel)), int(len(cand_mel))]}
+            if ref_mel.shape != cand_mel.shape:
+                rows.append(dict(mel_row, voc=None, mel_max_abs=None, mel_mean_abs=None, band_db=None,
+                                 length_ratio=None, passed=False))
+                continue
+            diff = np.abs(np.asarray(ref_mel, dtype=np.float32) - np.asarray(cand_mel, dtype=np.float32))
+            mel_row.update(mel_max_abs=round(float(diff.max()), 5), mel_mean_abs=round(float(diff.mean()), 5))
+            for voc in vocoders:
+                ref_wav = reference.vocode(ref_mel, voc)
+                cand_wav = candidate.vocode(ref_mel, voc)
+                band_db = band_distance_db(ref_wav, cand_wav)
+                rows.append(dict(
+                    mel_row,
+                    voc=voc or reference.voc,
+                    band_db=round(band_db, 3),
+                    length_ratio=round(len(cand_wav) / len(ref_wav), 4) if len(ref_wav) else None,
+                    passed=mel_row['mel_mean_abs'] <= mel_tolerance and band_db <= band_tolerance_db
+                ))
+    return rows
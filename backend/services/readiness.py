@@ -0,0 +1,187 @@
+"""
+启动预热与就绪状态
+
+启动时加载TTS声学模型、声码器和Vosk模型，并反复执行预热合成/识别，
+直到相邻两轮耗时的相对变化小于容差（稳态），此时服务才标记为就绪。
+"""
+
+import io
+import logging
+import os
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ReadinessProbe:
+    """服务就绪状态，记录各组件的加载耗时和预热耗时"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.status = 'starting'
+        self.started_at = time.time()
+        self.ready_at = None
+        self.components = {}
+
+    def set_component(self, name: str, **fields):
+        with self._lock:
+            self.components.setdefault(name, {}).update(fields)
+
+    def set_status(self, status: str):
+        with self._lock:
+            self.status = status
+            if status == 'ready':
+                self.ready_at = time.time()
+
+    @property
+    def ready(self) -> bool:
+        return self.status == 'ready'
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            snapshot = {
+                'status': self.status,
+                'ready': self.status == 'ready',
+                'components': {name: dict(fields) for name, fields in self.components.items()},
+            }
+            if self.ready_at is not None:
+                snapshot['startup_ms'] = round((self.ready_at - self.started_at) * 1000, 2)
+        return snapshot
+
+
+def _warm_until_steady(run_once: Callable[[], None],
+                       parallel: int,
+                       min_rounds: int,
+                       max_rounds: int,
+                       tolerance: float) -> List[float]:
+    """
+    反复执行预热直到耗时稳定
+
+    每轮并发执行parallel次（覆盖每个工作进程），记录该轮耗时（毫秒）；
+    至少执行min_rounds轮，相邻两轮相对变化不超过tolerance即认为进入稳态。
+    """
+    rounds = []
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        for _ in range(max_rounds):
+            start = time.perf_counter()
+            for future in [executor.submit(run_once) for _ in range(parallel)]:
+                future.result()
+            rounds.append(round((time.perf_counter() - start) * 1000, 2))
+            if len(rounds) >= min_rounds and len(rounds) >= 2:
+                previous, current = rounds[-2], rounds[-1]
+                if abs(current - previous) <= tolerance * previous:
+                    break
+    return rounds
+
+
+def warmup_wav(seconds: float = 1.0, sample_rate: int = 16000) -> bytes:
+    """生成带音节包络的谐波WAV，用于ASR预热（静音会被VAD跳过，无法预热识别器）"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    phase = 2 * np.pi * 150 * t
+    voiced = np.sin(phase) + 0.5 * np.sin(2 * phase) + 0.25 * np.sin(3 * phase)
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+    pcm = (0.2 * 32767 * voiced * envelope).astype('<i2')
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def warm_up(probe: ReadinessProbe,
+            tts_engine,
+            asr_service,
+            scheduler,
+            text: str,
+            min_rounds: int = 2,
+            max_rounds: int = 5,
+            tolerance: float = 0.2):
+    """
+    执行启动阶段：加载模型并预热，完成后将probe标记为就绪
+
+    Args:
+        probe: 就绪状态
+        tts_engine: TTS合成引擎（进程内引擎、批处理引擎或调度器代理），None表示未启用
+        asr_service: 进程内的SpeechRecognitionService，None表示未启用
+        scheduler: InferenceScheduler
+        text: 预热合成文本
+        min_rounds: 最少预热轮数
+        max_rounds: 最多预热轮数
+        tolerance: 稳态判定的相对容差
+    """
+    probe.set_status('warming')
+    try:
+        # TTS：加载模型后预热，启用工作进程时每轮覆盖所有工作进程
+        if tts_engine is not None:
+            load_start = time.perf_counter()
+            tts_engine.load()
+            probe.set_component('tts', load_ms=round((time.perf_counter() - load_start) * 1000, 2))
+            tts_parallel = scheduler.tts.workers if scheduler.tts is not None else 1
+            rounds = _warm_until_steady(lambda: tts_engine.synthesize(text), tts_parallel,
+                                        min_rounds, max_rounds, tolerance)
+            probe.set_component('tts', warmup_ms=rounds, ready=True)
+            logger.info(f"TTS预热完成 - 各轮耗时: {rounds}")
+
+        # ASR：模型在服务初始化时已加载，缺少模型时不阻塞就绪
+        if asr_service is not None and not asr_service.model_loaded:
+            probe.set_component('asr', ready=False, disabled=True, error='Vosk模型未加载')
+            logger.warning("Vosk模型未加载，跳过ASR预热")
+        elif asr_service is not None:
+            models = asr_service.get_stats()['models']
+            probe.set_component('asr', load_ms=models.get(os.path.abspath(asr_service.model_path)))
+            audio = warmup_wav(sample_rate=asr_service.sample_rate)
+            rounds = _warm_until_steady(lambda: asr_service.recognize_from_wav(audio), 1,
+                                        min_rounds, max_rounds, tolerance)
+            if scheduler.asr is not None:
+                rounds = _warm_until_steady(
+                    lambda: scheduler.submit_asr(audio).result(),
+                    scheduler.asr.workers, min_rounds, max_rounds, tolerance
+                )
+            probe.set_component('asr', warmup_ms=rounds, ready=True)
+            logger.info(f"ASR预热完成 - 各轮耗时: {rounds}")
+
+        probe.set_status('ready')
+        logger.info(f"服务就绪 - {probe.snapshot().get('startup_ms')}ms")
+    except Exception as e:
+        probe.set_status('failed')
+        probe.set_component('startup', error=str(e))
+        logger.error(f"启动预热失败: {str(e)}", exc_info=True)
+
+
+def start_warm_up(probe: ReadinessProbe, resolve: Callable[[], Tuple],
+                  after: Optional[Callable[[], None]] = None, **kwargs) -> threading.Thread:
+    """
+    在后台线程中构建服务并执行warm_up，存活探针在此期间即可响应
+
+    Args:
+        probe: 就绪状态
+        resolve: 无参函数，返回 (tts_engine, asr_service, scheduler)，在后台线程中调用
+        after: 预热成功后在同一后台线程中调用（如预合成固定回复），不影响就绪状态
+        **kwargs: 传给warm_up的预热参数
+    """
+    def run():
+        try:
+            components = resolve()
+        except Exception as e:
+            probe.set_status('failed')
+            probe.set_component('startup', error=str(e))
+            logger.error(f"服务构建失败: {str(e)}", exc_info=True)
+            return
+        warm_up(probe, *components, **kwargs)
+        if after is not None and probe.ready:
+            try:
+                after()
+            except Exception as e:
+                logger.error("预热后续任务失败: %s", e, exc_info=True)
+
+    thread = threading.Thread(target=run, name='startup-warmup', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,141 @@
+"""
+服务注册表：服务按需构建，按部署角色启用
+
+重量级依赖（PaddleSpeech、Vosk等）只在服务首次被获取时导入和初始化，
+未启用角色对应的服务永远不会构建。
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 部署角色 -> 提供的能力
+ROLES = {
+    'all': {'chat', 'tts', 'asr'},
+    'chat': {'chat'},
+    'tts': {'tts'},
+    'asr': {'asr'},
+}
+
+
+def parse_role(role: str) -> set:
+    """
+    解析角色配置，支持逗号分隔的组合（如 "tts,asr"）
+
+    Returns:
+        set: 启用的能力集合
+    """
+    capabilities = set()
+    for name in (role or 'all').split(','):
+        name = name.strip().lower()
+        if name not in ROLES:
+            raise ValueError(f"未知的服务角色: {name}，可选: {', '.join(ROLES)}")
+        capabilities |= ROLES[name]
+    return capabilities
+
+
+class ServiceDisabledError(LookupError):
+    """当前角色不提供该服务"""
+
+    def __init__(self, name: str, role: str):
+        super().__init__(f"当前实例（SERVICE_ROLE={role}）不提供{name}服务")
+        self.name = name
+        self.role = role
+
+
+class ServiceRegistry:
+    """
+    惰性服务注册表
+
+    每个服务注册一个无参工厂函数和所属能力，首次get()时调用工厂构建并缓存实例。
+    工厂函数中可以再通过get()获取其依赖的服务。每个服务单独加锁，
+    构建慢的服务（加载模型）不会阻塞其他服务的获取。
+    """
+
+    def __init__(self, role: str = 'all'):
+        self.role = role
+        self.capabilities = parse_role(role)
+        self._factories = {}
+        self._instances = {}
+        self._load_times = {}
+        # 保护_build_locks和构建统计；各服务的构建锁可重入，工厂函数内会递归获取依赖
+        self._lock = threading.Lock()
+        self._build_locks = {}
+
+    def register(self, name: str, factory: Callable, capability: Optional[str] = None):
+        """
+        注册服务
+
+        Args:
+            name: 服务名
+            factory: 无参工厂函数
+            capability: 所属能力（chat/tts/asr），None表示所有角色都可用
+        """
+        self._factories[name] = (factory, capability)
+
+    def serves(self, capability: str) -> bool:
+        """当前角色是否提供该能力"""
+        return capability in self.capabilities
+
+    def enabled(self, name: str) -> bool:
+        """服务是否在当前角色下启用"""
+        _, capability = self._factories[name]
+        return capability is None or self.serves(capability)
+
+    def require(self, capability: str):
+        """
+        Raises:
+            ServiceDisabledError: 当前角色不提供该能力
+        """
+        if not self.serves(capability):
+            raise ServiceDisabledError(capability, self.role)
+
+    def get(self, name: str):
+        """
+        获取服务实例，首次调用时构建
+
+        Raises:
+            ServiceDisabledError: 当前角色不提供该服务
+        """
+        if name in self._instances:
+            return self._instances[name]
+        if not self.enabled(name):
+            raise ServiceDisabledError(name, self.role)
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(name, threading.RLock())
+        with build_lock:
+            if name not in self._instances:
+                factory, _ = self._factories[name]
+                build_start = time.perf_counter()
+                # 工厂函数可以返回None（如功能被配置关闭），同样缓存
+                instance = factory()
+                build_ms = (time.perf_counter() - build_start) * 1000
+                with self._lock:
+                    self._load_times[name] = build_ms
+                    self._instances[name] = instance
+                logger.info(f"服务构建完成 - {name}, 耗时: {build_ms:.2f}ms")
+            return self._instances[name]
+
+    def peek(self, name: str):
+        """获取已构建的服务实例，尚未构建或未启用时返回None（不触发构建）"""
+        return self._instances.get(name)
+
+    def get_stats(self) -> Dict:
+        """
+        Returns:
+            dict: 角色、各服务是否启用/已构建及构建耗时
+        """
+        with self._lock:
+            services = {
+                name: {
+                    'enabled': self.enabled(name),
+                    'loaded': name in self._instances,
+                    'build_ms': round(self._load_times[name], 2) if name in self._load_times else None,
+                }
+                for name in self._factories
+            }
+        return {'role': self.role, 'capabilities': sorted(self.capabilities), 'services': services}
@@ -0,0 +1,192 @@
+"""
+对话会话存储
+
+客户端原本每轮都重发完整的context列表，请求体随对话长度线性增长。
+会话存储按dialogue_id在服务端保存对话轮次，客户端每轮只发送新消息。
+
+内存有界：
+- 每个会话按轮数和估算token数截断，只保留最近的上下文窗口
+- 会话闲置超过TTL后被淘汰
+- 全部会话的总大小和会话数超出上限时淘汰最久未访问的会话
+"""
+
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+USER = 'user'
+AI = 'ai'
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的token数：非ASCII字符（中文等）每字计1，ASCII字符每4个计1
+
+    只用于上下文窗口截断，不需要与具体模型的分词一致。
+    """
+    ascii_chars = len(text.encode('ascii', 'ignore'))
+    return len(text) - ascii_chars + (ascii_chars + 3) // 4
+
+
+def _history_turns(history: Optional[List[Dict]]) -> List[tuple]:
+    """客户端发送的上下文转为 (发送者, 文本) 列表，跳过格式不对的条目"""
+    turns = []
+    for item in history or []:
+        if not isinstance(item, dict) or not isinstance(item.get('message'), str):
+            continue
+        turns.append((USER if item.get('sender') == USER else AI, item['message']))
+    return turns
+
+
+class _Session:
+    """一个会话：轮次为 (发送者, 文本, token数, 字节数) 元组"""
+
+    __slots__ = ('turns', 'tokens', 'size', 'touched')
+
+    def __init__(self, size: int):
+        self.turns = deque()
+        self.tokens = 0
+        self.size = size
+        self.touched = time.monotonic()
+
+
+class SessionStore:
+    """
+    对话会话存储（线程安全）
+
+    Args:
+        ttl: 会话闲置超时（秒）
+        max_turns: 每个会话保留的最大轮次数（用户消息和AI回复各算一轮）
+        max_tokens: 每个会话保留的最大估算token数
+        max_sessions: 最多保留的会话数
+        max_bytes: 全部会话的估算内存上限（字节）
+    """
+
+    def __init__(self, ttl: float = 1800.0, max_turns: int = 20, max_tokens: int = 2000,
+                 max_sessions: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        # dialogue_id -> _Session，按最近访问时间排序
+        self._sessions = OrderedDict()
+        self._bytes = 0
+        self._stats = {'created': 0, 'trimmed_turns': 0, 'expired': 0, 'evicted': 0, 'deleted': 0}
+
+    def context(self, dialogue_id: Optional[str]) -> List[Dict]:
+        """
+        读取会话的上下文窗口
+
+        Args:
+            dialogue_id: 对话ID
+
+        Returns:
+            List[Dict]: [{'sender': 'user'/'ai', 'message': 文本}, ...]，按时间顺序；
+                        会话不存在或已过期时为空列表
+        """
+        if not dialogue_id:
+            return []
+        with self._lock:
+            self._prune()
+            session = self._sessions.get(dialogue_id)
+            if session is None:
+                return []
+            self._touch(dialogue_id, session)
+            return [{'sender': sender, 'message': text} for sender, text, _, _ in session.turns]
+
+    def append(self, dialogue_id: str, message: str, reply: str, history: Optional[List[Dict]] = None):
+        """
+        追加一轮对话（用户消息和AI回复），超出会话上限时丢弃最早的轮次
+
+        Args:
+            dialogue_id: 对话ID
+            message: 用户消息
+            reply: AI回复
+            history: 会话不存在时先写入的上下文 [{'sender', 'message'}, ...]（旧客户端发送的context），
+                     会话已存在时忽略
+        """
+        with self._lock:
+            session = self._sessions.get(dialogue_id)
+            turns = [(USER, message), (AI, reply)]
+            if session is None:
+                session = _Session(sys.getsizeof(dialogue_id))
+                self._sessions[dialogue_id] = session
+                self._bytes += session.size
+                self._stats['created'] += 1
+                turns = _history_turns(history) + turns
+            else:
+                self._touch(dialogue_id, session)
+
+            for sender, text in turns:
+                turn = (sender, text, estimate_tokens(text), sys.getsizeof(text))
+                session.turns.append(turn)
+                session.tokens += turn[2]
+                session.size += turn[3]
+                self._bytes += turn[3]
+
+            # 保留最近的上下文窗口，至少保留最新一轮
+            while len(session.turns) > 1 and (len(session.turns) > self.max_turns or
+                                              session.tokens > self.max_tokens):
+                _, _, tokens, size = session.turns.popleft()
+                session.tokens -= tokens
+                session.size -= size
+                self._bytes -= size
+                self._stats['trimmed_turns'] += 1
+
+            self._prune()
+
+    def delete(self, dialogue_id: str) -> bool:
+        """
+        删除会话
+
+        Returns:
+            bool: 会话是否存在
+        """
+        with self._lock:
+            session = self._sessions.pop(dialogue_id, None)
+            if session is None:
+                return False
+            self._bytes -= session.size
+            self._stats['deleted'] += 1
+            return True
+
+    def _touch(self, dialogue_id: str, session: _Session):
+        session.touched = time.monotonic()
+        self._sessions.move_to_end(dialogue_id)
+
+    def _prune(self):
+        """淘汰过期会话，再按最久未访问淘汰超出总量上限的会话，调用方需持有锁"""
+        deadline = time.monotonic() - self.ttl
+        while self._sessions:
+            _, session = next(iter(self._sessions.items()))
+            if session.touched >= deadline:
+                break
+            self._remove_oldest('expired')
+        # 至少保留最近访问的会话（刚写入的会话不会被立即淘汰）
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions or
+                                           self._bytes > self.max_bytes):
+            self._remove_oldest('evicted')
+
+    def _remove_oldest(self, reason: str):
+        dialogue_id, session = self._sessions.popitem(last=False)
+        self._bytes -= session.size
+        self._stats[reason] += 1
+        logger.debug("会话已淘汰（%s）: %s", reason, dialogue_id)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            self._prune()
+            stats = dict(self._stats)
+            stats['sessions'] = len(self._sessions)
+            stats['bytes'] = self._bytes
+        stats.update(ttl=self.ttl, max_turns=self.max_turns, max_tokens=self.max_tokens,
+                     max_sessions=self.max_sessions, max_bytes=self.max_bytes)
+        return stats
@@ -0,0 +1,168 @@
+"""
+回复语音预取
+
+前端总是在/api/chat返回后立即为回复请求TTS，合成要等一次客户端往返之后才开始。
+预取在/api/chat处理过程中就提交回复的合成任务，并返回一个音频句柄，
+前端凭句柄取音频时合成已经完成或正在进行。
+
+启动时还会预先合成AI模拟服务的全部固定回复，结果写入TTS音频缓存。
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Sequence
+
+from services.audio_codec import normalize_format
+from services.tts_cache import TTSCache
+
+logger = logging.getLogger(__name__)
+
+
+class SpeechPrefetcher:
+    """
+    回复语音预取器
+
+    Args:
+        tts_service: TTSService实例
+        max_workers: 执行预取合成的线程数
+        ttl: 句柄有效期（秒），过期后音频被丢弃
+        max_handles: 最多保留的句柄数，超出时丢弃最早的句柄
+    """
+
+    def __init__(self, tts_service, max_workers: int = 2, ttl: float = 120.0, max_handles: int = 256):
+        self.tts_service = tts_service
+        self.ttl = ttl
+        self.max_handles = max_handles
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tts-prefetch')
+        # 句柄 -> (合成参数键, Future, 创建时间)
+        self._handles = OrderedDict()
+        # 合成参数键 -> 进行中的Future，相同参数的并发预取共用一次合成
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stats = {'prefetched': 0, 'deduplicated': 0, 'fetched': 0, 'expired': 0,
+                       'canned_submitted': 0, 'canned_failed': 0}
+
+    @staticmethod
+    def _key(text, speed, volume, pitch, output_format, quality):
+        return (TTSCache.normalize_text(text), f'{float(speed):.3f}', f'{float(volume):.3f}',
+                f'{float(pitch):.3f}', str(output_format).lower(), quality)
+
+    def prefetch(self, text: str, speed=1.0, volume=1.0, pitch=1.0, output_format: str = 'wav',
+                 quality: Optional[str] = None) -> str:
+        """
+        提交回复的合成任务
+
+        Args:
+            text: 回复文本
+            speed: 语速
+            volume: 音量
+            pitch: 音调
+            output_format: 输出格式（wav/ogg/mp3/pcm）
+            quality: 质量档位（fast/balanced/high），默认为TTS服务的默认档位
+
+        Returns:
+            str: 音频句柄，用于lookup()
+        """
+        output_format = normalize_format(output_format)
+        quality = self.tts_service.quality.normalize(quality)
+        key = self._key(text, speed, volume, pitch, output_format, quality)
+        handle = uuid.uuid4().hex
+        with self._lock:
+            self._prune()
+            future = self._pending.get(key)
+            if future is None:
+                future = self._executor.submit(
+                    self.tts_service.text_to_speech,
+                    text=text, speed=speed, volume=volume, pitch=pitch, output_format=output_format,
+                    quality=quality
+                )
+                self._pending[key] = future
+                future.add_done_callback(lambda f, key=key: self._finish(key, f))
+                self._stats['prefetched'] += 1
+            else:
+                self._stats['deduplicated'] += 1
+            self._handles[handle] = (key, future, time.monotonic())
+        logger.debug("已提交回复语音预取，文本长度: %d, 句柄: %s", len(text), handle)
+        return handle
+
+    def _finish(self, key, future: Future):
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning("回复语音预取失败: %s", future.exception())
+
+    def lookup(self, handle: str) -> Optional[Future]:
+        """
+        按句柄查找预取任务
+
+        Returns:
+            Future: 结果为text_to_speech的返回值 (audio_file, format, audio_content)；
+                    句柄不存在或已过期时返回None
+        """
+        with self._lock:
+            self._prune()
+            entry = self._handles.get(handle)
+            if entry is None:
+                return None
+            self._stats['fetched'] += 1
+            return entry[1]
+
+    def _prune(self):
+        """丢弃过期和超出数量上限的句柄，调用方需持有锁"""
+        deadline = time.monotonic() - self.ttl
+        while self._handles:
+            _, (_, _, created) = next(iter(self._handles.items()))
+            if created >= deadline and len(self._handles) <= self.max_handles:
+                break
+            self._handles.popitem(last=False)
+            self._stats['expired'] += 1
+
+    def prefetch_canned(self, texts: Iterable[str], voices: Sequence[Dict]) -> int:
+        """
+        预先合成固定回复，结果写入TTS音频缓存（需启用缓存才有效）
+
+        Args:
+            texts: 固定回复文本
+            voices: 合成参数列表，每项为 {'speed', 'volume', 'pitch', 'output_format'}
+
+        Returns:
+            int: 提交的合成任务数
+        """
+        if self.tts_service.cache is None:
+            logger.info("TTS缓存未启用，跳过固定回复预合成")
+            return 0
+
+        submitted = 0
+        for text in dict.fromkeys(texts):
+            for voice in voices:
+                future = self._executor.submit(self.tts_service.text_to_speech, text=text, **voice)
+                future.add_done_callback(self._count_canned)
+                submitted += 1
+        with self._lock:
+            self._stats['canned_submitted'] += submitted
+        logger.info("已提交%d个固定回复预合成任务", submitted)
+        return submitted
+
+    def _count_canned(self, future: Future):
+        if not future.cancelled() and future.exception() is not None:
+            with self._lock:
+                self._stats['canned_failed'] += 1
+            logger.warning("固定回复预合成失败: %s", future.exception())
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['handles'] = len(self._handles)
+            stats['pending'] = len(self._pending)
+        stats['ttl'] = self.ttl
+        stats['max_handles'] = self.max_handles
+        return stats
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,14 +1,58 @@
-import os
-import wave
-from vosk import Model, KaldiRecognizer
 import json
-from typing import Tuple
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+from services.audio_codec import decode_audio, to_mono_pcm16
+from services.metrics import AUDIO_SECONDS, REAL_TIME_FACTOR, STAGE_SECONDS, VAD_SECONDS
+from services.vad import VoiceActivityDetector
+from services.vosk_pool import VoskModelRegistry, model_registry
+
+
+@lru_cache(maxsize=None)
+def _vosk_ffi():
+    """vosk基于cffi，char*参数只接受bytes或cdata，from_buffer可零拷贝包装memoryview"""
+    try:
+        from vosk.vosk_cffi import ffi
+    except ImportError:
+        return None
+    return ffi
+
+
+def _as_waveform(pcm):
+    """将PCM数据转换为AcceptWaveform可接受的类型，尽量避免拷贝"""
+    if isinstance(pcm, bytes):
+        return pcm
+    ffi = _vosk_ffi()
+    if ffi is not None:
+        return ffi.from_buffer(pcm)
+    return bytes(pcm)
 
 class SpeechRecognitionService:
-    """语音识别服务（基于Vosk）"""
+    """
+    语音识别服务（基于Vosk）
+    
+    Args:
+        model_path: Vosk模型目录
+        sample_rate: 识别采样率
+        pool_size: 每个采样率的识别器池大小
+        pool_timeout: 等待空闲识别器的超时（秒）
+        registry: 模型注册表，默认为进程级的Vosk模型注册表
+        vad: 上传音频识别前的语音活动检测，为None时整段送入识别器
+    """
     
-    def __init__(self, model_path: str = 'model'):
+    def __init__(self,
+                 model_path: str = 'model',
+                 sample_rate: int = 16000,
+                 pool_size: int = 4,
+                 pool_timeout: float = None,
+                 registry: Optional[VoskModelRegistry] = None,
+                 vad: Optional[VoiceActivityDetector] = None):
+        self.model_registry = registry or model_registry
+        self.vad = vad
         self.model_path = model_path
+        self.sample_rate = sample_rate
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
         self.model = None
         self.model_loaded = False
         try:
@@ -20,19 +64,17 @@ class SpeechRecognitionService:
             print("模型下载地址: https://alphacephei.com/vosk/models")
     
     def _load_model(self):
-        """加载Vosk模型"""
-        if not os.path.exists(self.model_path):
-            raise FileNotFoundError(f"Vosk模型文件未找到: {self.model_path}")
-        
-        self.model = Model(self.model_path)
+        """从进程级注册表获取Vosk模型，同一模型只加载一次"""
+        self.model = self.model_registry.get_model(self.model_path)
         self.model_loaded = True
     
-    def recognize_from_wav(self, audio_data: bytes) -> str:
+    def recognize_from_wav(self, audio_data: bytes, media_type: str = None) -> str:
         """
-        从WAV音频数据中识别文字
+        从上传的音频数据中识别文字
         
         Args:
-            audio_data: WAV格式音频数据
+            audio_data: WAV、OGG/Opus或audio/L16音频数据（任意采样率、声道数）
+            media_type: 上传时声明的Content-Type，audio/L16必须提供（带rate参数）
             
         Returns:
             str: 识别结果
@@ -41,60 +83,118 @@ class SpeechRecognitionService:
         if not self.model_loaded:
             return "语音识别模型未加载，请下载并配置Vosk模型"
         
-        # 使用唯一的临时文件名，避免冲突
-        import uuid
-        temp_wav = f"temp_recording_{uuid.uuid4()}.wav"
-        wf = None
-        
         try:
-            # 保存音频数据到临时文件
-            with open(temp_wav, "wb") as f:
-                f.write(audio_data)
-            
-            # 读取WAV文件
-            wf = wave.open(temp_wav, "rb")
-            
-            # 创建识别器
-            recognizer = KaldiRecognizer(self.model, wf.getframerate())
-            recognizer.SetWords(True)
-            
-            # 识别音频
-            result = ""
-            while True:
-                data = wf.readframes(4000)
-                if len(data) == 0:
-                    break
-                if recognizer.AcceptWaveform(data):
-                    part_result = json.loads(recognizer.Result())
-                    result += part_result.get("text", "")
-            
-            # 获取最终结果
-            final_result = json.loads(recognizer.FinalResult())
-            result += final_result.get("text", "")
-            
-            return result.strip()
-            
+            return self.transcribe(audio_data, media_type)['text']
         except Exception as e:
             print(f"语音识别错误: {e}")
             return f"语音识别失败: {str(e)}"
-        finally:
-            # 确保关闭文件句柄
-            if wf:
-                wf.close()
-            # 清理临时文件
-            if os.path.exists(temp_wav):
-                try:
-                    os.remove(temp_wav)
-                except:
-                    # 如果删除失败，忽略错误
-                    pass
     
-    def recognize_from_stream(self, audio_stream) -> str:
+    def transcribe(self, audio_data: bytes, media_type: str = None) -> Dict:
+        """
+        识别上传的音频并返回各阶段耗时，出错时抛出异常（批量识别使用）
+        
+        Args:
+            audio_data: WAV、OGG/Opus或audio/L16音频数据（任意采样率、声道数）
+            media_type: 上传时声明的Content-Type
+            
+        Returns:
+            dict: {'text', 'audio_seconds', 'speech_seconds', 'decode_ms', 'vad_ms', 'recognize_ms'}
+            
+        Raises:
+            RuntimeError: 模型未加载
+            ValueError: 音频格式无法解析
+        """
+        if not self.model_loaded:
+            raise RuntimeError("语音识别模型未加载，请下载并配置Vosk模型")
+        
+        # 在内存中解码，非16kHz单声道的音频在进程内完成混音和重采样
+        decode_start = time.perf_counter()
+        pcm = to_mono_pcm16(decode_audio(audio_data, media_type), self.sample_rate)
+        vad_start = time.perf_counter()
+        STAGE_SECONDS.observe(vad_start - decode_start, service='asr', stage='decode')
+        
+        # 裁掉首尾静音并在停顿处切分，纯静音的录音不送入识别器
+        if self.vad is not None:
+            segments = self.vad.split(pcm, self.sample_rate)
+            speech_bytes = sum(len(segment) for segment in segments)
+            STAGE_SECONDS.observe(time.perf_counter() - vad_start, service='asr', stage='vad')
+            VAD_SECONDS.inc(speech_bytes / (2 * self.sample_rate), kind='speech')
+            VAD_SECONDS.inc((len(pcm) - speech_bytes) / (2 * self.sample_rate), kind='silence')
+        else:
+            segments = [pcm]
+            speech_bytes = len(pcm)
+        
+        recognize_start = time.perf_counter()
+        text = ''
+        if segments:
+            session = self.create_session(self.sample_rate)
+            try:
+                # 每次送入4000帧（16位单声道为8000字节），切片为零拷贝视图
+                chunk_bytes = 4000 * 2
+                for index, segment in enumerate(segments):
+                    if index:
+                        # 停顿处结束上一句，避免跨停顿的词被拼在一起
+                        session.flush()
+                    for offset in range(0, len(segment), chunk_bytes):
+                        session.accept(segment[offset:offset + chunk_bytes])
+                
+                text = session.finish()['text']
+            finally:
+                session.close()
+        
+        recognize_end = time.perf_counter()
+        recognize_time = recognize_end - recognize_start
+        audio_seconds = len(pcm) / (2 * self.sample_rate)
+        STAGE_SECONDS.observe(recognize_time, service='asr', stage='recognize')
+        if audio_seconds > 0:
+            REAL_TIME_FACTOR.observe(recognize_time / audio_seconds, service='asr')
+        AUDIO_SECONDS.inc(audio_seconds, service='asr')
+        return {
+            'text': text,
+            'audio_seconds': round(audio_seconds, 3),
+            'speech_seconds': round(speech_bytes / (2 * self.sample_rate), 3),
+            'decode_ms': round((vad_start - decode_start) * 1000, 2),
+            'vad_ms': round((recognize_start - vad_start) * 1000, 2),
+            'recognize_ms': round(recognize_time * 1000, 2),
+        }
+    
+    def create_session(self, sample_rate: int = 16000) -> 'RecognitionSession':
+        """
+        创建流式识别会话，识别器从池中借出，会话结束时归还
+        
+        Args:
+            sample_rate: 输入PCM的采样率（8000-48000）
+            
+        Returns:
+            RecognitionSession: 识别会话
+        """
+        if not self.model_loaded:
+            raise RuntimeError("语音识别模型未加载，请下载并配置Vosk模型")
+        if not 8000 <= int(sample_rate) <= 48000:
+            raise ValueError(f"不支持的采样率: {sample_rate}")
+        
+        pool = self.model_registry.get_pool(self.model_path, sample_rate, self.pool_size)
+        recognizer = pool.acquire(timeout=self.pool_timeout)
+        return RecognitionSession(recognizer, release=pool.release)
+    
+    def get_stats(self) -> Dict:
+        """
+        获取模型加载和识别器池统计
+        
+        Returns:
+            dict: 模型加载耗时及各识别器池的利用率、等待耗时
+        """
+        stats = self.model_registry.get_stats()
+        stats['model_loaded'] = self.model_loaded
+        return stats
+    
+    def recognize_from_stream(self, audio_stream, sample_rate: int = 16000) -> str:
         """
         从音频流中识别文字
         
         Args:
-            audio_stream: 音频流对象
+            audio_stream: 音频流对象，read()返回16位单声道PCM
+            sample_rate: PCM采样率
             
         Returns:
             str: 识别结果
@@ -104,22 +204,114 @@ class SpeechRecognitionService:
             return "语音识别模型未加载，请下载并配置Vosk模型"
         
         try:
-            recognizer = KaldiRecognizer(self.model, 16000)
-            recognizer.SetWords(True)
-            
-            result = ""
-            while True:
-                data = audio_stream.read(4000)
-                if len(data) == 0:
-                    break
-                if recognizer.AcceptWaveform(data):
-                    part_result = json.loads(recognizer.Result())
-                    result += part_result.get("text", "")
-            
-            final_result = json.loads(recognizer.FinalResult())
-            result += final_result.get("text", "")
-            
-            return result.strip()
+            session = self.create_session(sample_rate)
+            try:
+                while True:
+                    data = audio_stream.read(4000)
+                    if len(data) == 0:
+                        break
+                    session.accept(data)
+                
+                return session.finish()['text']
+            finally:
+                session.close()
         except Exception as e:
             print(f"语音识别错误: {e}")
             return f"语音识别失败: {str(e)}"
+
+
+ASR_ENGINES = ('vosk', 'fake')
+
+
+def create_asr_service(engine: str = 'vosk', fake_rtf: float = 0.02, **kwargs) -> SpeechRecognitionService:
+    """
+    按引擎名称创建语音识别服务
+    
+    Args:
+        engine: vosk 或 fake（替身识别器，不加载模型，用于基准测试和CI）
+        fake_rtf: 替身识别器模拟的实时率
+        **kwargs: SpeechRecognitionService的参数
+        
+    Raises:
+        ValueError: 未知的引擎名称
+    """
+    if engine == 'vosk':
+        return SpeechRecognitionService(**kwargs)
+    if engine == 'fake':
+        from services.fake_engines import fake_model_registry
+        return SpeechRecognitionService(registry=fake_model_registry(fake_rtf), **kwargs)
+    raise ValueError(f"未知的ASR引擎: {engine}，可选: {', '.join(ASR_ENGINES)}")
+
+
+class RecognitionSession:
+    """
+    流式识别会话
+    
+    PCM数据到达即送入识别器，每次送入后返回中间结果或分句结果，
+    结束时只需处理最后一小段尾音，最终结果可在停止说话后立即得到。
+    finish()或close()后识别器归还识别器池。
+    """
+    
+    def __init__(self, recognizer, release: Optional[Callable] = None):
+        self.recognizer = recognizer
+        self._release = release
+        self.segments = []
+        self.bytes_received = 0
+        self._last_partial = ''
+    
+    def accept(self, pcm: bytes) -> Optional[Dict]:
+        """
+        送入一段PCM数据
+        
+        Args:
+            pcm: 16位单声道PCM（bytes或memoryview）
+            
+        Returns:
+            dict: {'type': 'result', 'text': 分句结果} 或 {'type': 'partial', 'text': 中间结果}；
+                  中间结果与上次相同时返回None
+        """
+        self.bytes_received += len(pcm)
+        if self.recognizer.AcceptWaveform(_as_waveform(pcm)):
+            text = json.loads(self.recognizer.Result()).get("text", "")
+            self._last_partial = ''
+            if text:
+                self.segments.append(text)
+            return {'type': 'result', 'text': text}
+        
+        partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        if partial == self._last_partial:
+            return None
+        self._last_partial = partial
+        return {'type': 'partial', 'text': partial}
+    
+    def flush(self) -> Dict:
+        """
+        结束当前语句（如在停顿处），会话可继续送入数据
+        
+        Returns:
+            dict: {'type': 'result', 'text': 分句结果}
+        """
+        text = json.loads(self.recognizer.FinalResult()).get("text", "")
+        self._last_partial = ''
+        if text:
+            self.segments.append(text)
+        return {'type': 'result', 'text': text}
+    
+    def finish(self) -> Dict:
+        """
+        结束会话并获取最终结果
+        
+        Returns:
+            dict: {'type': 'final', 'text': 完整识别结果}
+        """
+        text = json.loads(self.recognizer.FinalResult()).get("text", "")
+        if text:
+            self.segments.append(text)
+        self.close()
+        return {'type': 'final', 'text': "".join(self.segments).strip()}
+    
+    def close(self):
+        """归还识别器，可重复调用"""
+        if self._release is not None and self.recognizer is not None:
+            self._release(self.recognizer)
+        self.recognizer = None
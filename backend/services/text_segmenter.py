@@ -0,0 +1,93 @@
+"""
+文本分句工具，用于分段合成和流式输出
+"""
+
+import re
+from typing import List
+
+# 句末标点（中英文），英文句点后需跟空白或位于末尾，避免拆开小数和缩写
+_SENTENCE_END = re.compile(r'([。！？!?；;…]+["”’』」）)]*|\.(?=\s|$)|\n+)')
+# 句内停顿标点，超长句在这些位置继续切分
+_CLAUSE_END = re.compile(r'([，,、：:]+)')
+
+
+def split_sentences(text: str, max_chars: int = 60, min_chars: int = 4) -> List[str]:
+    """
+    按中英文句末标点切分文本
+
+    Args:
+        text: 待切分文本
+        max_chars: 单句最大长度，超出时按逗号等停顿标点继续切分
+        min_chars: 过短的片段并入下一句，避免合成大量极短音频
+
+    Returns:
+        list: 句子列表（保留标点，去除首尾空白）
+    """
+    sentences = []
+    for sentence in _split_keep(text, _SENTENCE_END):
+        if len(sentence) > max_chars:
+            sentences.extend(_split_long(sentence, max_chars))
+        else:
+            sentences.append(sentence)
+
+    merged = []
+    pending = ''
+    for sentence in sentences:
+        pending = _join(pending, sentence)
+        if len(pending) >= min_chars:
+            merged.append(pending)
+            pending = ''
+    if pending:
+        if merged and len(_join(merged[-1], pending)) <= max_chars:
+            merged[-1] = _join(merged[-1], pending)
+        else:
+            merged.append(pending)
+    return merged
+
+
+def _join(left: str, right: str) -> str:
+    """拼接两段已去除首尾空白的文本，英文等ASCII文本之间补回空格（如 "Hi." + "How" -> "Hi. How"）"""
+    if left and right and left[-1].isascii() and right[0].isascii() and right[0].isalnum():
+        return left + ' ' + right
+    return left + right
+
+
+def _split_keep(text: str, pattern) -> List[str]:
+    """按标点切分并把标点保留在前一段末尾"""
+    parts = pattern.split(text)
+    pieces = []
+    for i in range(0, len(parts), 2):
+        piece = parts[i]
+        if i + 1 < len(parts):
+            piece += parts[i + 1]
+        piece = piece.strip()
+        if piece:
+            pieces.append(piece)
+    return pieces
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    """超长句先按停顿标点切分，仍超长的片段按固定长度截断（有空白时在最后一个空白处截断，不拆开单词）"""
+    chunks = []
+    current = ''
+    for clause in _split_keep(sentence, _CLAUSE_END):
+        while len(clause) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ''
+            cut = max(clause.rfind(' ', 0, max_chars + 1), clause.rfind('\t', 0, max_chars + 1))
+            if cut <= 0:
+                cut = max_chars
+            chunks.append(clause[:cut].rstrip())
+            clause = clause[cut:].lstrip()
+        if not clause:
+            continue
+        joined = _join(current, clause)
+        if current and len(joined) > max_chars:
+            chunks.append(current)
+            current = clause
+        else:
+            current = joined
+    if current:
+        chunks.append(current)
+    return chunks
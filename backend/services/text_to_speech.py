@@ -1,30 +1,46 @@
-import os
-import tempfile
-from paddlespeech.cli.tts.infer import TTSExecutor
-from typing import Tuple
+from services.audio_codec import encode_audio
+from services.audio_dsp import resample
+from services.audio_processing import adjust_audio
+from services.tts_engine import PaddleTTSEngine
+from services.tts_quality import QualitySelector, QualityTier
 
 class TextToSpeechService:
     """文字转语音服务（基于PaddleSpeech）"""
     
+    # 质量档位：high为原有的HiFiGAN声码器，其余档位的声码器在首次使用时加载；
+    # 声码器须与aishell3声学模型匹配，fast只缩小输出
+    QUALITY_TIERS = {
+        'fast': QualityTier('fast', 'pwgan_aishell3', 16000),
+        'balanced': QualityTier('balanced', 'pwgan_aishell3', 24000),
+        'high': QualityTier('high', 'hifigan_zh-cn_aishell3_ckpt_1.1.0', 24000),
+    }
+    
     def __init__(self, 
                  speaker: str = 'zhiyuan',
                  speed: float = 1.0,
                  volume: float = 1.0,
-                 pitch: float = 1.0):
+                 pitch: float = 1.0,
+                 quality: str = 'high'):
         self.speaker = speaker
         self.speed = speed
         self.volume = volume
         self.pitch = pitch
-        self.tts = TTSExecutor()
+        self.quality = QualitySelector(self.QUALITY_TIERS, default=quality)
+        self.engine = PaddleTTSEngine(
+            am='fastspeech2_zh-cn_zhiyuan_aishell3_ckpt_1.1.0',
+            voc=self.QUALITY_TIERS['high'].voc,
+            lang='zh-cn'
+        )
     
     def synthesize_speech(self, 
                           text: str, 
                           output_format: str = 'wav',
                           speed: float = None,
                           volume: float = None,
-                          pitch: float = None) -> bytes:
+                          pitch: float = None,
+                          quality: str = None) -> bytes:
         """
-        将文字合成为语音
+        将文字合成为语音（全程在内存中完成，不产生临时文件）
         
         Args:
             text: 要合成的文字
@@ -32,6 +48,7 @@ class TextToSpeechService:
             speed: 语速（0.5-2.0）
             volume: 音量（0.5-2.0）
             pitch: 语调（0.5-2.0）
+            quality: 质量档位（fast/balanced/high），默认为构造时指定的档位
             
         Returns:
             bytes: 音频数据
@@ -41,34 +58,22 @@ class TextToSpeechService:
         current_volume = volume or self.volume
         current_pitch = pitch or self.pitch
         
-        # 创建临时文件
-        with tempfile.NamedTemporaryFile(suffix=f'.{output_format}', delete=False) as temp_file:
-            temp_filename = temp_file.name
+        # 使用PaddleSpeech合成语音，按档位选择声码器和输出采样率
+        tier = self.quality.resolve(quality)
+        samples, sample_rate, _ = self.engine.synthesize(text, spk_id=0, voc=tier.voc)
+        if tier.sample_rate != sample_rate:
+            samples = resample(samples, sample_rate, tier.sample_rate)
+            sample_rate = tier.sample_rate
         
-        try:
-            # 使用PaddleSpeech合成语音
-            self.tts(
-                text=text,
-                output=temp_filename,
-                am='fastspeech2_zh-cn_zhiyuan_aishell3_ckpt_1.1.0',
-                spk_id=0,
-                voc='hifigan_zh-cn_aishell3_ckpt_1.1.0',
-                lang='zh-cn',
-                speed=current_speed,
-                volume=current_volume,
-                pitch=current_pitch
-            )
-            
-            # 读取音频数据
-            with open(temp_filename, 'rb') as f:
-                audio_data = f.read()
-            
-            return audio_data
-            
-        finally:
-            # 清理临时文件
-            if os.path.exists(temp_filename):
-                os.remove(temp_filename)
+        # 调整参数并编码
+        samples, sample_rate = adjust_audio(
+            samples,
+            sample_rate,
+            speed=current_speed,
+            volume=current_volume,
+            pitch=current_pitch
+        )
+        return encode_audio(samples, sample_rate, output_format)
     
     def get_speaker_list(self) -> list:
         """
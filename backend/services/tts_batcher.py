@@ -0,0 +1,151 @@
+"""
+声学模型动态批处理
+
+并发到达的短文本合成请求在max_wait_ms内或凑满max_batch条后合并，
+补齐音素序列后一次前向计算，再按请求拆分梅尔频谱。
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List
+
+import numpy as np
+
+from services.tts_engine import concat_waveforms
+
+logger = logging.getLogger(__name__)
+
+
+class AcousticBatcher:
+    """
+    声学模型批处理器，后台线程负责收集请求并执行批量推理
+    """
+
+    def __init__(self, engine, max_wait_ms: float = 10.0, max_batch: int = 8):
+        self.engine = engine
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max_batch
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {'batches': 0, 'items': 0, 'max_batch_seen': 0, 'am_ms': 0.0}
+        self._thread = threading.Thread(target=self._run, name='tts-acoustic-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, phone_ids: np.ndarray, spk_id: int = 0) -> Future:
+        """
+        提交一条音素序列
+
+        Returns:
+            Future: 结果为对应的梅尔频谱
+        """
+        future = Future()
+        self._queue.put((phone_ids, spk_id, future))
+        return future
+
+    def _collect(self) -> List:
+        """阻塞取第一条请求，然后在等待窗口内继续收集，直到凑满一批"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # 不同说话人不能放在同一批
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+            for spk_id, items in groups.items():
+                self._run_batch(spk_id, items)
+
+    def _run_batch(self, spk_id: int, items: List):
+        start = time.time()
+        try:
+            mels = self.engine.acoustic([item[0] for item in items], spk_id)
+        except Exception as e:
+            logger.error("声学模型批量推理失败 - 批大小: %d, 错误: %s", len(items), e)
+            for item in items:
+                item[2].set_exception(e)
+            return
+
+        am_ms = (time.time() - start) * 1000
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['items'] += len(items)
+            self._stats['max_batch_seen'] = max(self._stats['max_batch_seen'], len(items))
+            self._stats['am_ms'] += am_ms
+        logger.debug("声学模型批量推理完成 - 批大小: %d, 耗时: %.2fms", len(items), am_ms)
+        for item, mel in zip(items, mels):
+            item[2].set_result(mel)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['avg_batch_size'] = round(stats['items'] / stats['batches'], 3) if stats['batches'] else 0.0
+        stats['am_ms'] = round(stats['am_ms'], 2)
+        stats['queued'] = self._queue.qsize()
+        stats['max_wait_ms'] = self.max_wait * 1000
+        stats['max_batch'] = self.max_batch
+        return stats
+
+
+class BatchingTTSEngine:
+    """
+    与PaddleTTSEngine接口一致的引擎：文本前端和声码器在调用线程执行，
+    声学模型经AcousticBatcher与其他请求合并执行
+    """
+
+    def __init__(self, engine, max_wait_ms: float = 10.0, max_batch: int = 8):
+        if not engine.supports_batching:
+            raise ValueError(f"声学模型 {engine.am} 不支持批量推理")
+        self.engine = engine
+        self.batcher = AcousticBatcher(engine, max_wait_ms=max_wait_ms, max_batch=max_batch)
+
+    @property
+    def loaded(self) -> bool:
+        return self.engine.loaded
+
+    def load(self):
+        self.engine.load()
+
+    @property
+    def sample_rate(self) -> int:
+        return self.engine.sample_rate
+
+    def synthesize(self, text: str, spk_id: int = 0, voc=None):
+        """
+        合成语音（voc为声码器名称，默认为引擎的默认声码器）
+
+        Returns:
+            tuple: (float32单声道波形, 采样率, 各阶段耗时毫秒数{'frontend', 'am', 'voc'})，
+                   am包含等待凑批的时间
+        """
+        frontend_start = time.time()
+        phone_ids = self.engine.frontend(text)
+        am_start = time.time()
+        futures = [self.batcher.submit(ids, spk_id) for ids in phone_ids]
+        mels = [future.result() for future in futures]
+        voc_start = time.time()
+        samples = concat_waveforms([self.engine.vocode(mel, voc) for mel in mels])
+        voc_end = time.time()
+        timings = {
+            'frontend': (am_start - frontend_start) * 1000,
+            'am': (voc_start - am_start) * 1000,
+            'voc': (voc_end - voc_start) * 1000,
+        }
+        return samples, self.sample_rate, timings
+
+    def get_stats(self) -> Dict:
+        return self.batcher.get_stats()
@@ -0,0 +1,250 @@
+"""
+TTS音频缓存（内容寻址，内存LRU + 磁盘两级）
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TTSCache:
+    """
+    TTS合成结果缓存
+
+    以（规范化文本、声学模型、声码器、说话人、语速、音量、音调、格式，以及非默认的输出采样率）
+    的SHA-256作为键。内存层为有界LRU，磁盘层按总大小限额淘汰最久未访问的条目，
+    进程重启后磁盘层仍然有效。
+    """
+
+    def __init__(self,
+                 max_memory_items: int = 256,
+                 max_memory_bytes: int = 64 * 1024 * 1024,
+                 cache_dir: Optional[str] = None,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        self.max_memory_items = max_memory_items
+        self.max_memory_bytes = max_memory_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> bytes
+        self._memory_bytes = 0
+        self._disk_index = OrderedDict()  # key -> 文件大小，按访问时间排序
+        self._disk_bytes = 0
+
+        self._stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0,
+            'puts': 0,
+        }
+
+        if self.cache_dir:
+            self._load_disk_index()
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """
+        规范化文本：全半角统一、去除首尾空白、合并连续空白
+        """
+        text = unicodedata.normalize('NFKC', text)
+        return ' '.join(text.split())
+
+    @staticmethod
+    def make_key(text, am, voc, spk_id, speed, volume, pitch, output_format, sample_rate=None) -> str:
+        """
+        计算缓存键（不依赖缓存实例，离线预渲染使用相同的键）
+
+        Args:
+            sample_rate: 输出采样率，为None时不计入键（模型原始采样率）
+
+        Returns:
+            str: 十六进制SHA-256摘要
+        """
+        parts = [
+            TTSCache.normalize_text(text),
+            str(am),
+            str(voc),
+            str(spk_id),
+            f'{float(speed):.3f}',
+            f'{float(volume):.3f}',
+            f'{float(pitch):.3f}',
+            str(output_format).lower(),
+        ]
+        if sample_rate is not None:
+            parts.append(str(int(sample_rate)))
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        查询缓存，内存未命中时回落到磁盘，磁盘命中的条目会提升到内存层
+
+        Returns:
+            bytes: 音频内容，未命中返回None
+        """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return data
+            on_disk = key in self._disk_index
+
+        if on_disk:
+            data = self._read_disk(key)
+            if data is not None:
+                with self._lock:
+                    self._stats['disk_hits'] += 1
+                    if key in self._disk_index:
+                        self._disk_index.move_to_end(key)
+                    self._put_memory(key, data)
+                return data
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+
+    def put(self, key: str, data: bytes):
+        """
+        写入缓存（内存层和磁盘层）
+        """
+        with self._lock:
+            self._stats['puts'] += 1
+            self._put_memory(key, data)
+            need_disk = self.cache_dir and key not in self._disk_index
+
+        if need_disk:
+            self._write_disk(key, data)
+
+    def clear(self):
+        """
+        清空内存层和磁盘层
+        """
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            keys = list(self._disk_index.keys())
+            self._disk_index.clear()
+            self._disk_bytes = 0
+        for key in keys:
+            self._remove_disk_file(key)
+
+    def get_stats(self) -> Dict:
+        """
+        获取缓存统计信息
+
+        Returns:
+            dict: 命中/未命中/淘汰计数及各层占用
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'memory_items': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_items': len(self._disk_index),
+                'disk_bytes': self._disk_bytes,
+            })
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+
+    # ---- 内存层 ----
+
+    def _put_memory(self, key: str, data: bytes):
+        """写入内存层并按条目数/字节数淘汰（调用方持有锁）"""
+        if len(data) > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory and (len(self._memory) > self.max_memory_items
+                                or self._memory_bytes > self.max_memory_bytes):
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self._stats['memory_evictions'] += 1
+
+    # ---- 磁盘层 ----
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f'{key}.bin')
+
+    def _load_disk_index(self):
+        """启动时扫描缓存目录，按修改时间重建LRU索引"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.bin'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, name[:-4], st.st_size))
+        entries.sort()
+        for _, key, size in entries:
+            self._disk_index[key] = size
+            self._disk_bytes += size
+        logger.info("TTS磁盘缓存加载完成 - 条目: %d, 大小: %d字节", len(self._disk_index), self._disk_bytes)
+        with self._lock:
+            self._evict_disk()
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path, None)
+            return data
+        except OSError:
+            # 文件被外部删除，同步索引
+            with self._lock:
+                size = self._disk_index.pop(key, None)
+                if size is not None:
+                    self._disk_bytes -= size
+            return None
+
+    def _write_disk(self, key: str, data: bytes):
+        path = self._disk_path(key)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("TTS磁盘缓存写入失败: %s", e)
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+
+        with self._lock:
+            if key not in self._disk_index:
+                self._disk_index[key] = len(data)
+                self._disk_bytes += len(data)
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """按总大小淘汰最久未访问的磁盘条目（调用方持有锁）"""
+        while self._disk_index and self._disk_bytes > self.max_disk_bytes:
+            key, size = self._disk_index.popitem(last=False)
+            self._disk_bytes -= size
+            self._stats['disk_evictions'] += 1
+            self._remove_disk_file(key)
+
+    def _remove_disk_file(self, key: str):
+        try:
+            os.unlink(self._disk_path(key))
+        except OSError:
+            pass
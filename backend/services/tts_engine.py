@@ -0,0 +1,285 @@
+"""
+TTS推理引擎，直接驱动PaddleSpeech的声学模型和声码器，结果保留在内存中
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.tts_frontend import CachedFrontend
+
+logger = logging.getLogger(__name__)
+
+# 多说话人声学模型对应的数据集
+_MULTI_SPEAKER_DATASETS = {'aishell3', 'vctk', 'mix', 'canton'}
+
+
+class PaddleTTSEngine:
+    """
+    基于PaddleSpeech TTSExecutor的内存合成引擎
+
+    跳过TTSExecutor.__call__中写WAV文件的postprocess步骤。FastSpeech2声学模型
+    按 文本前端 -> 声学模型 -> 声码器 三个阶段分别调用，声学模型支持批量推理；
+    其他声学模型直接调用infer()并从输出张量中取出波形。
+
+    除默认声码器外还可使用其他声码器（质量档位），它们与默认声码器共用声学模型和文本前端。
+
+    Args:
+        am: 声学模型
+        voc: 默认声码器
+        lang: 语言
+        frontend_cache_items: 文本前端缓存的句子数
+        extra_vocoders: load()时一并加载的其他声码器，未列出的在首次使用时加载
+    """
+
+    def __init__(self,
+                 am: str = 'fastspeech2_male',
+                 voc: str = 'pwgan_male',
+                 lang: str = 'zh',
+                 frontend_cache_items: int = 4096,
+                 extra_vocoders: Sequence[str] = ()):
+        self.am = am
+        self.voc = voc
+        self.lang = lang
+        self.extra_vocoders = [name for name in extra_vocoders if name != voc]
+        self._vocoders = {}  # 声码器名称 -> 推理对象
+        # PaddleSpeech（及paddle）体积大、导入慢，在load()中才导入
+        self.executor = None
+        self.frontend_cache = None
+        self.frontend_cache_items = frontend_cache_items
+        self.loaded = False
+        self.supports_batching = am.startswith('fastspeech2_')
+        self._multi_speaker = am[am.rindex('_') + 1:] in _MULTI_SPEAKER_DATASETS
+        # 声学模型和声码器不能并发调用；文本前端在CachedFrontend中单独加锁，可与模型推理重叠
+        self._lock = threading.RLock()
+
+    def load(self):
+        """
+        加载声学模型和声码器（首次调用时下载并初始化，之后直接返回）
+        """
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            load_start = time.time()
+            from paddlespeech.cli.tts.infer import TTSExecutor
+            self.executor = TTSExecutor()
+            self.executor._init_from_path(am=self.am, voc=self.voc, lang=self.lang)
+            self.frontend_cache = CachedFrontend(
+                self.executor.frontend.get_input_ids,
+                max_items=self.frontend_cache_items
+            )
+            self._vocoders[self.voc] = self.executor.voc_inference
+            self.loaded = True
+            logger.info(f"TTS模型加载完成 - am: {self.am}, voc: {self.voc}, "
+                        f"耗时: {(time.time() - load_start) * 1000:.2f}ms")
+            for name in self.extra_vocoders:
+                self._vocoder(name)
+
+    def _vocoder(self, voc: Optional[str]):
+        """
+        取声码器推理对象，未加载的先加载
+
+        TTSExecutor只能整体加载声学模型和声码器，其他声码器借助一个临时的TTSExecutor加载，
+        只保留其声码器，临时加载的声学模型随之释放。
+        """
+        self.load()
+        voc = voc or self.voc
+        inference = self._vocoders.get(voc)
+        if inference is not None:
+            return inference
+        with self._lock:
+            inference = self._vocoders.get(voc)
+            if inference is None:
+                load_start = time.time()
+                from paddlespeech.cli.tts.infer import TTSExecutor
+                executor = TTSExecutor()
+                executor._init_from_path(am=self.am, voc=voc, lang=self.lang)
+                inference = self._vocoders[voc] = executor.voc_inference
+                logger.info(f"声码器加载完成 - voc: {voc}, 耗时: {(time.time() - load_start) * 1000:.2f}ms")
+        return inference
+
+    @property
+    def sample_rate(self) -> int:
+        """模型输出采样率"""
+        self.load()
+        return int(self.executor.am_config.fs)
+
+    def frontend(self, text: str) -> List[np.ndarray]:
+        """
+        文本前端：文本规范化、分句、G2P，按句缓存结果
+
+        Args:
+            text: 待合成文本
+
+        Returns:
+            list: 每句一个int64音素ID数组（只读，与缓存共享）
+        """
+        self.load()
+        return self.frontend_cache(text)['phone_ids']
+
+    def acoustic(self, phone_ids: List[np.ndarray], spk_id: int = 0) -> List[np.ndarray]:
+        """
+        声学模型：音素ID -> 梅尔频谱，多条输入补齐后一次前向计算
+
+        Args:
+            phone_ids: 音素ID数组列表
+            spk_id: 说话人ID（仅多说话人模型使用）
+
+        Returns:
+            list: 与输入一一对应的梅尔频谱，形状为 (帧数, 梅尔维数)
+        """
+        import paddle
+
+        self.load()
+        with self._lock, paddle.no_grad():
+            if len(phone_ids) == 1:
+                args = [paddle.to_tensor(phone_ids[0])]
+                if self._multi_speaker:
+                    args.append(paddle.to_tensor(spk_id))
+                return [self.executor.am_inference(*args).numpy()]
+
+            lengths = np.array([len(ids) for ids in phone_ids], dtype=np.int64)
+            padded = np.zeros((len(phone_ids), int(lengths.max())), dtype=np.int64)
+            for i, ids in enumerate(phone_ids):
+                padded[i, :len(ids)] = ids
+
+            model = self.executor.am_inference.acoustic_model
+            normalizer = self.executor.am_inference.normalizer
+            kwargs = {}
+            if self._multi_speaker:
+                kwargs['spk_id'] = paddle.to_tensor(np.full(len(phone_ids), spk_id, dtype=np.int64))
+            outputs = model._forward(
+                paddle.to_tensor(padded),
+                paddle.to_tensor(lengths),
+                is_inference=True,
+                **kwargs
+            )
+            # _forward返回 (before_outs, after_outs, d_outs, ...)，按预测时长截掉补齐部分
+            after_outs, durations = outputs[1], outputs[2]
+            frames = durations.sum(axis=-1).numpy()
+            return [
+                normalizer.inverse(after_outs[i, :int(frames[i])]).numpy()
+                for i in range(len(phone_ids))
+            ]
+
+    def vocode(self, mel: np.ndarray, voc: Optional[str] = None) -> np.ndarray:
+        """
+        声码器：梅尔频谱 -> 波形
+
+        Args:
+            mel: 梅尔频谱
+            voc: 声码器名称，默认为构造时指定的声码器
+
+        Returns:
+            np.ndarray: float32波形
+        """
+        import paddle
+
+        inference = self._vocoder(voc)
+        with self._lock, paddle.no_grad():
+            wav = inference(paddle.to_tensor(mel))
+        return np.asarray(wav.numpy(), dtype=np.float32).reshape(-1)
+
+    def synthesize(self, text: str, spk_id: int = 0,
+                   voc: Optional[str] = None) -> Tuple[np.ndarray, int, Dict[str, float]]:
+        """
+        合成语音
+
+        Args:
+            text: 待合成文本
+            spk_id: 说话人ID
+            voc: 声码器名称，默认为构造时指定的声码器
+
+        Returns:
+            tuple: (float32单声道波形, 采样率, 各阶段耗时毫秒数{'frontend', 'am', 'voc'})
+        """
+        if not self.supports_batching:
+            return self._synthesize_with_executor(text, spk_id, voc)
+
+        frontend_start = time.time()
+        phone_ids = self.frontend(text)
+        am_start = time.time()
+        mels = self.acoustic(phone_ids, spk_id)
+        voc_start = time.time()
+        samples = concat_waveforms([self.vocode(mel, voc) for mel in mels])
+        voc_end = time.time()
+        timings = {
+            'frontend': (am_start - frontend_start) * 1000,
+            'am': (voc_start - am_start) * 1000,
+            'voc': (voc_end - voc_start) * 1000,
+        }
+        return samples, self.sample_rate, timings
+
+    def _synthesize_with_executor(self, text: str, spk_id: int, voc: Optional[str] = None):
+        """非FastSpeech2声学模型：整体调用TTSExecutor.infer()，持锁期间临时替换声码器"""
+        inference = self._vocoder(voc)
+        with self._lock:
+            default_inference = self.executor.voc_inference
+            self.executor.voc_inference = inference
+            try:
+                self.executor.infer(text=text, lang=self.lang, am=self.am, spk_id=spk_id)
+            finally:
+                self.executor.voc_inference = default_inference
+            wav = self.executor._outputs['wav'].numpy()
+            timings = {
+                'frontend': getattr(self.executor, 'frontend_time', 0.0) * 1000,
+                'am': getattr(self.executor, 'am_time', 0.0) * 1000,
+                'voc': getattr(self.executor, 'voc_time', 0.0) * 1000,
+            }
+        samples = np.ascontiguousarray(wav.reshape(-1), dtype=np.float32)
+        return samples, self.sample_rate, timings
+
+
+TTS_ENGINES = ('paddle', 'onnx', 'fake')
+
+
+def create_tts_engine(engine: str = 'paddle',
+                      fake_rtf: float = 0.05,
+                      onnx_model_dir: str = os.path.join('models', 'onnx'),
+                      onnx_intra_op_threads: int = 0,
+                      onnx_inter_op_threads: int = 0,
+                      **kwargs):
+    """
+    按名称创建合成引擎
+
+    Args:
+        engine: paddle（PaddleSpeech）、onnx（ONNX Runtime，模型由tools/export_onnx.py导出）
+                或 fake（替身引擎，不加载模型，用于基准测试和CI）
+        fake_rtf: 替身引擎模拟的实时率
+        onnx_model_dir: ONNX模型目录
+        onnx_intra_op_threads: ONNX Runtime算子内线程数，0表示默认值
+        onnx_inter_op_threads: ONNX Runtime算子间线程数，0表示默认值
+        **kwargs: 引擎参数（am、voc、lang、frontend_cache_items、extra_vocoders）
+
+    Raises:
+        ValueError: 未知的引擎名称
+    """
+    if engine == 'paddle':
+        return PaddleTTSEngine(**kwargs)
+    if engine == 'onnx':
+        from services.onnx_engine import OnnxTTSEngine
+        return OnnxTTSEngine(
+            model_dir=onnx_model_dir,
+            intra_op_threads=onnx_intra_op_threads,
+            inter_op_threads=onnx_inter_op_threads,
+            **kwargs
+        )
+    if engine == 'fake':
+        from services.fake_engines import FakeTTSEngine
+        return FakeTTSEngine(rtf=fake_rtf, **kwargs)
+    raise ValueError(f"未知的TTS引擎: {engine}，可选: {', '.join(TTS_ENGINES)}")
+
+
+def concat_waveforms(waveforms: List[np.ndarray]) -> np.ndarray:
+    """拼接多段float32波形"""
+    if len(waveforms) == 1:
+        return waveforms[0]
+    if not waveforms:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(waveforms).astype(np.float32, copy=False)
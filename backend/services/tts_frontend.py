@@ -0,0 +1,105 @@
+"""
+TTS文本前端缓存
+
+PaddleSpeech中文前端（文本规范化、分词、G2P、变调）对每次调用都完整执行一遍。
+回复文本大多由少量常用句子组成，因此按句缓存前端结果：文本先切分成句子，
+命中的句子直接复用音素/声调ID数组，只有未见过的句子才调用前端。
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from services.text_segmenter import split_sentences
+from services.tts_cache import TTSCache
+
+logger = logging.getLogger(__name__)
+
+
+class CachedFrontend:
+    """
+    按句缓存的文本前端
+
+    Args:
+        get_input_ids: 前端函数，签名同PaddleSpeech frontend.get_input_ids(text, merge_sentences=False)，
+                       返回包含'phone_ids'（及可选'tone_ids'）张量列表的字典
+        max_items: 最多缓存的句子数，0表示不缓存
+        max_sentence_chars: 切分句子的最大长度
+    """
+
+    def __init__(self, get_input_ids: Callable, max_items: int = 4096, max_sentence_chars: int = 60):
+        self.get_input_ids = get_input_ids
+        self.max_items = max_items
+        self.max_sentence_chars = max_sentence_chars
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # PaddleSpeech前端不是线程安全的
+        self._frontend_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def __call__(self, text: str) -> Dict[str, List[np.ndarray]]:
+        """
+        Args:
+            text: 待合成文本
+
+        Returns:
+            dict: {'phone_ids': [每个分句一个int64数组], 'tone_ids': [...]（前端提供时）}
+        """
+        if self.max_items <= 0:
+            return self._run_frontend(text)
+
+        result = {}
+        for sentence in split_sentences(text, max_chars=self.max_sentence_chars, min_chars=1):
+            key = TTSCache.normalize_text(sentence)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+            if entry is None:
+                entry = self._run_frontend(sentence)
+                self._put(key, entry)
+            for name, arrays in entry.items():
+                result.setdefault(name, []).extend(arrays)
+        return result
+
+    def _run_frontend(self, text: str) -> Dict[str, List[np.ndarray]]:
+        with self._frontend_lock:
+            input_ids = self.get_input_ids(text, merge_sentences=False)
+        entry = {}
+        for name in ('phone_ids', 'tone_ids'):
+            if name in input_ids:
+                arrays = []
+                for ids in input_ids[name]:
+                    array = np.asarray(ids.numpy(), dtype=np.int64).reshape(-1)
+                    # 缓存中的数组会被多个请求共享，设为只读
+                    array.setflags(write=False)
+                    arrays.append(array)
+                entry[name] = arrays
+        return entry
+
+    def _put(self, key: str, entry: Dict):
+        with self._lock:
+            self._stats['misses'] += 1
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['items'] = len(self._entries)
+        stats['max_items'] = self.max_items
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
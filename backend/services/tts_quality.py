@@ -0,0 +1,253 @@
+"""
+TTS质量档位与负载自适应降档
+
+声码器通常占合成耗时的大头。每个请求可选质量档位：
+- fast：Parallel WaveGAN，输出重采样到16kHz（音频体积更小，合成耗时与balanced相同）
+- balanced：Parallel WaveGAN（默认）
+- high：HiFiGAN
+
+三档共用同一个声学模型，只切换声码器和输出采样率。声码器须与声学模型使用相同的
+训练数据（梅尔频谱统计量一致），否则音质明显下降。声码器在引擎中按需（或启动时）加载，
+各档位的合成结果分别缓存（声码器和采样率都计入缓存键）。
+
+自适应模式下，TTS排队深度或最近一段时间的合成p95延迟超过阈值时，
+所有请求降一档（持续过载时继续降，最低到fast）；负载回落后逐档恢复。
+降档只在声码器不同的档位之间进行：与当前档位声码器相同的较低档位不减少合成耗时，
+只多一次重采样，跳过不用。相邻两次调整至少间隔hold_seconds，避免在阈值附近来回切换。
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# 由快到慢
+QUALITY_LEVELS = ('fast', 'balanced', 'high')
+
+
+class QualityTier(NamedTuple):
+    """质量档位：声码器名称和输出采样率"""
+    name: str
+    voc: str
+    sample_rate: int
+
+
+DEFAULT_TIERS = {
+    'fast': QualityTier('fast', 'pwgan_male', 16000),
+    'balanced': QualityTier('balanced', 'pwgan_male', 24000),
+    'high': QualityTier('high', 'hifigan_male', 24000),
+}
+
+
+# PaddleSpeech预训练模型名称末尾的数据集
+_PRETRAINED_DATASETS = {'csmsc', 'male', 'aishell3', 'ljspeech', 'vctk', 'mix', 'canton'}
+
+
+def mismatched_vocoders(am: str, tiers: Dict[str, QualityTier]) -> Dict[str, str]:
+    """
+    与声学模型训练数据不同的档位声码器（只检查PaddleSpeech预训练模型名称）
+
+    Returns:
+        dict: {档位名: 声码器名称}
+    """
+    dataset = am[am.rindex('_') + 1:] if '_' in am else None
+    if dataset not in _PRETRAINED_DATASETS:
+        return {}
+    mismatched = {}
+    for name, tier in tiers.items():
+        voc_dataset = tier.voc[tier.voc.rindex('_') + 1:] if '_' in tier.voc else None
+        if voc_dataset in _PRETRAINED_DATASETS and voc_dataset != dataset:
+            mismatched[name] = tier.voc
+    return mismatched
+
+
+class QualitySelector:
+    """
+    按请求的质量档位和当前负载选择实际使用的档位
+
+    Args:
+        tiers: 各档位配置 {档位名: QualityTier}，须包含QUALITY_LEVELS中的全部档位
+        default: 请求未指定档位时使用的档位
+        adaptive: 是否按负载自动降档
+        capacity: 可同时执行的合成数（TTS工作进程数，进程内推理为1），超出部分视为排队
+        max_queue: 排队深度达到该值时降档
+        max_p95_ms: 窗口内合成延迟p95超过该值（毫秒）时降档，0表示不按延迟降档
+        window_seconds: 延迟统计窗口（秒）
+        hold_seconds: 相邻两次调整档位的最短间隔（秒）
+        min_samples: 按延迟判断所需的最少样本数
+    """
+
+    def __init__(self,
+                 tiers: Optional[Dict[str, QualityTier]] = None,
+                 default: str = 'balanced',
+                 adaptive: bool = False,
+                 capacity: int = 1,
+                 max_queue: int = 4,
+                 max_p95_ms: float = 1500.0,
+                 window_seconds: float = 30.0,
+                 hold_seconds: float = 10.0,
+                 min_samples: int = 5):
+        self.tiers = dict(tiers or DEFAULT_TIERS)
+        missing = [name for name in QUALITY_LEVELS if name not in self.tiers]
+        if missing:
+            raise ValueError(f"缺少质量档位配置: {', '.join(missing)}")
+        # 最大降档级数：从最高档位起可切换声码器的次数
+        self.max_level = self._steps_below(QUALITY_LEVELS[-1])
+        self.default = self.normalize(default)
+        self.adaptive = adaptive
+        self.capacity = max(1, capacity)
+        self.max_queue = max_queue
+        self.max_p95_ms = max_p95_ms
+        self.window_seconds = window_seconds
+        self.hold_seconds = hold_seconds
+        self.min_samples = min_samples
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._latencies = deque()  # (完成时间, 延迟毫秒)
+        # 降档级数：0为不降档，每级将请求的档位降低一档
+        self._level = 0
+        self._changed_at = -math.inf
+        self._served = {name: 0 for name in QUALITY_LEVELS}
+        self._stats = {'downgraded': 0, 'level_ups': 0, 'level_downs': 0}
+
+    def normalize(self, quality: Optional[str]) -> str:
+        """
+        规范化档位名称
+
+        Raises:
+            ValueError: 未知的档位
+        """
+        if quality in (None, ''):
+            return self.default
+        name = str(quality).strip().lower()
+        if name not in QUALITY_LEVELS:
+            raise ValueError(f"不支持的质量档位: {quality}，可选: {', '.join(QUALITY_LEVELS)}")
+        return name
+
+    def requested(self, quality: Optional[str] = None) -> QualityTier:
+        """请求的档位（不考虑负载）"""
+        return self.tiers[self.normalize(quality)]
+
+    def resolve(self, quality: Optional[str] = None) -> QualityTier:
+        """
+        实际使用的档位：自适应模式下按当前降档级数降低
+
+        Raises:
+            ValueError: 未知的档位
+        """
+        name = self.normalize(quality)
+        with self._lock:
+            self._update(time.monotonic())
+            served = self._downgrade(name, self._level)
+            self._served[served] += 1
+            if served != name:
+                self._stats['downgraded'] += 1
+        return self.tiers[served]
+
+    def _lower(self, name: str) -> Optional[str]:
+        """比name低、且声码器不同的最近档位，没有时为None"""
+        voc = self.tiers[name].voc
+        for lower in reversed(QUALITY_LEVELS[:QUALITY_LEVELS.index(name)]):
+            if self.tiers[lower].voc != voc:
+                return lower
+        return None
+
+    def _steps_below(self, name: str) -> int:
+        steps = 0
+        while (name := self._lower(name)) is not None:
+            steps += 1
+        return steps
+
+    def _downgrade(self, name: str, level: int) -> str:
+        """按降档级数逐级切换到声码器不同的较低档位，无法再降时停在当前档位"""
+        for _ in range(level):
+            lower = self._lower(name)
+            if lower is None:
+                break
+            name = lower
+        return name
+
+    @contextmanager
+    def track(self):
+        """统计一次合成：计入在途数，成功完成时记录延迟"""
+        start = time.monotonic()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            yield
+        except BaseException:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        end = time.monotonic()
+        with self._lock:
+            self._in_flight -= 1
+            self._latencies.append((end, (end - start) * 1000))
+            self._update(end)
+
+    def _queue_depth(self) -> int:
+        return max(0, self._in_flight - self.capacity)
+
+    def _p95_ms(self, now: float) -> Optional[float]:
+        """窗口内的延迟p95，样本不足时为None；调用方需持有锁"""
+        while self._latencies and self._latencies[0][0] < now - self.window_seconds:
+            self._latencies.popleft()
+        if len(self._latencies) < self.min_samples:
+            return None
+        values = sorted(latency for _, latency in self._latencies)
+        return values[min(len(values) - 1, int(math.ceil(0.95 * len(values))) - 1)]
+
+    def _update(self, now: float):
+        """按排队深度和延迟调整降档级数，调用方需持有锁"""
+        if not self.adaptive or now - self._changed_at < self.hold_seconds:
+            return
+        queue_depth = self._queue_depth()
+        p95 = self._p95_ms(now)
+        slow = self.max_p95_ms > 0 and p95 is not None
+        overloaded = queue_depth >= self.max_queue or (slow and p95 > self.max_p95_ms)
+        # 恢复的条件比降档更严，留出回差
+        relaxed = queue_depth <= self.max_queue // 2 and not (slow and p95 > self.max_p95_ms * 0.7)
+
+        if overloaded and self._level < self.max_level:
+            self._level += 1
+            self._stats['level_ups'] += 1
+        elif relaxed and self._level > 0:
+            self._level -= 1
+            self._stats['level_downs'] += 1
+        else:
+            return
+        self._changed_at = now
+        # 换档后延迟分布随之改变，旧样本不再参与判断
+        self._latencies.clear()
+        logger.info("TTS质量自适应调整 - 降档级数: %d, 排队深度: %d, p95: %s",
+                    self._level, queue_depth, f'{p95:.0f}ms' if p95 is not None else '-')
+
+    @property
+    def level(self) -> int:
+        """当前降档级数"""
+        with self._lock:
+            return self._level
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            p95 = self._p95_ms(now)
+            stats = dict(self._stats)
+            stats.update({
+                'default': self.default,
+                'adaptive': self.adaptive,
+                'level': self._level,
+                'in_flight': self._in_flight,
+                'queue_depth': self._queue_depth(),
+                'p95_ms': round(p95, 2) if p95 is not None else None,
+                'served': dict(self._served),
+                'tiers': {name: {'voc': tier.voc, 'sample_rate': tier.sample_rate}
+                          for name, tier in self.tiers.items()},
+            })
+        return stats
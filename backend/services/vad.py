@@ -0,0 +1,175 @@
+"""
+语音活动检测（VAD）：基于短时能量和过零率，NumPy向量化实现
+
+浏览器录音常带1-3秒的首尾静音，识别器对静音帧同样要做完整的声学计算。
+识别前先检测语音段：裁掉首尾静音，在较长停顿处切分，纯静音的录音不送入识别器，
+识别耗时随去除的静音成比例下降。
+
+检测流程（帧长30ms，无重叠）：
+1. 每帧计算能量（dBFS）和过零率
+2. 以能量的低分位数估计噪声底（不超过绝对上限，录音没有静音时低分位数落在语音上），
+   高于噪声底一定裕量（且高于绝对下限）的帧判为语音；能量略低但过零率高的帧
+   （清辅音，如s、sh、f）也判为语音。能量动态范围小于裕量且整体高于下限的录音
+   （持续说话没有停顿）整段视为语音
+3. 填补短于最小停顿的间隙，去掉短于最小时长的语音段（点击声等脉冲噪声）
+4. 语音段前后各扩展一段余量，避免切掉词首词尾的弱音
+5. 超过最大时长的语音段在能量最低的帧处继续切分
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """布尔序列中连续True区间的起止下标（左闭右开）"""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges[0::2], edges[1::2]
+
+
+def _merge_close(starts: np.ndarray, ends: np.ndarray, min_gap: int) -> Tuple[np.ndarray, np.ndarray]:
+    """合并间隔小于min_gap的相邻区间"""
+    if len(starts) < 2:
+        return starts, ends
+    keep = starts[1:] - ends[:-1] >= min_gap
+    return (np.concatenate((starts[:1], starts[1:][keep])),
+            np.concatenate((ends[:-1][keep], ends[-1:])))
+
+
+class VoiceActivityDetector:
+    """
+    能量+过零率语音活动检测
+
+    Args:
+        frame_ms: 帧长（毫秒）
+        energy_margin_db: 语音帧能量需高于噪声底的裕量（dB）
+        max_noise_floor_db: 噪声底估计的上限（dBFS）
+        min_energy_db: 语音帧的最低能量（dBFS），低于该值一律视为静音
+        zcr_threshold: 清辅音帧的过零率下限（每个采样点的过零次数）
+        zcr_margin_db: 高过零率帧的能量可低于语音阈值的幅度（dB）
+        min_speech_ms: 最短语音段，更短的视为噪声
+        min_silence_ms: 切分语音段的最短停顿，更短的间隙视为语音内部的停顿
+        padding_ms: 语音段前后保留的余量
+        max_segment_seconds: 单个语音段的最大时长，超过时在能量最低处切分
+        drop_silence: 未检测到语音时是否丢弃整段录音，False时整段送入识别器
+    """
+
+    def __init__(self,
+                 frame_ms: int = 30,
+                 energy_margin_db: float = 12.0,
+                 max_noise_floor_db: float = -45.0,
+                 min_energy_db: float = -50.0,
+                 zcr_threshold: float = 0.25,
+                 zcr_margin_db: float = 6.0,
+                 min_speech_ms: int = 90,
+                 min_silence_ms: int = 400,
+                 padding_ms: int = 200,
+                 max_segment_seconds: float = 15.0,
+                 drop_silence: bool = True):
+        self.frame_ms = frame_ms
+        self.energy_margin_db = energy_margin_db
+        self.max_noise_floor_db = max_noise_floor_db
+        self.min_energy_db = min_energy_db
+        self.zcr_threshold = zcr_threshold
+        self.zcr_margin_db = zcr_margin_db
+        self.min_speech_ms = min_speech_ms
+        self.min_silence_ms = min_silence_ms
+        self.padding_ms = padding_ms
+        self.max_segment_seconds = max_segment_seconds
+        self.drop_silence = drop_silence
+
+    def _frames(self, ms: float) -> int:
+        return max(1, int(round(ms / self.frame_ms)))
+
+    def frame_features(self, samples: np.ndarray, frame_length: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        逐帧能量和过零率
+
+        Args:
+            samples: 16位PCM采样
+            frame_length: 每帧采样点数
+
+        Returns:
+            tuple: (能量dBFS, 过零率)，长度为完整帧数
+        """
+        count = len(samples) // frame_length
+        frames = samples[:count * frame_length].reshape(count, frame_length).astype(np.float32)
+        frames *= 1.0 / 32768.0
+        power = np.einsum('ij,ij->i', frames, frames) / frame_length
+        energy_db = 10.0 * np.log10(power + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / max(frame_length - 1, 1)
+        return energy_db, zcr
+
+    def detect(self, pcm, sample_rate: int) -> List[Tuple[int, int]]:
+        """
+        检测语音段
+
+        Args:
+            pcm: 16位单声道小端PCM（bytes或memoryview）
+            sample_rate: 采样率
+
+        Returns:
+            list: 语音段的 (起始采样点, 结束采样点)，按时间顺序，无语音时为空列表
+        """
+        samples = np.frombuffer(pcm, dtype='<i2')
+        frame_length = int(sample_rate * self.frame_ms / 1000)
+        if len(samples) < frame_length:
+            return []
+        energy_db, zcr = self.frame_features(samples, frame_length)
+        count = len(energy_db)
+
+        low, high = np.percentile(energy_db, [10, 90])
+        if high - low < self.energy_margin_db and low > self.min_energy_db:
+            # 没有明显的静音段，整段都是语音
+            return [(0, len(samples))]
+        noise_floor = min(float(low), self.max_noise_floor_db)
+        threshold = max(noise_floor + self.energy_margin_db, self.min_energy_db)
+        speech = (energy_db > threshold) | (
+            (energy_db > threshold - self.zcr_margin_db) & (zcr > self.zcr_threshold)
+        )
+
+        starts, ends = _runs(speech)
+        starts, ends = _merge_close(starts, ends, self._frames(self.min_silence_ms))
+        long_enough = ends - starts >= self._frames(self.min_speech_ms)
+        starts, ends = starts[long_enough], ends[long_enough]
+        if len(starts) == 0:
+            return []
+
+        padding = self._frames(self.padding_ms)
+        starts = np.maximum(starts - padding, 0)
+        ends = np.minimum(ends + padding, count)
+        starts, ends = _merge_close(starts, ends, 1)
+
+        max_frames = self._frames(self.max_segment_seconds * 1000)
+        segments = []
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            # 过长的语音段在后半个窗口内能量最低的帧处切分
+            while end - start > max_frames:
+                low = start + max_frames // 2
+                split = low + int(np.argmin(energy_db[low:start + max_frames]))
+                segments.append((start, split))
+                start = split
+            segments.append((start, end))
+
+        # 末尾不足一帧的采样点并入最后一段
+        return [(start * frame_length, len(samples) if end == count else end * frame_length)
+                for start, end in segments]
+
+    def split(self, pcm, sample_rate: int) -> List[memoryview]:
+        """
+        按语音段切分PCM
+
+        Args:
+            pcm: 16位单声道小端PCM（bytes或memoryview）
+            sample_rate: 采样率
+
+        Returns:
+            list: 各语音段的PCM零拷贝视图；未检测到语音时为空列表（drop_silence为False时为整段）
+        """
+        view = memoryview(pcm).cast('B')
+        segments = [view[start * 2:end * 2] for start, end in self.detect(view, sample_rate)]
+        if not segments and not self.drop_silence:
+            return [view]
+        return segments
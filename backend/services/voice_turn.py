@@ -0,0 +1,257 @@
+"""
+语音对话轮次：ASR → 对话 → TTS 在服务端串成流水线
+
+前端原本需要三次顺序往返（/api/asr、/api/chat、/api/tts）。/api/voice-turn在一次请求中
+完成全部阶段，以NDJSON逐行返回事件：
+
+    {"type": "transcript", "text": ...}
+    {"type": "reply", "text": ..., "dialogue_id": ...}
+    {"type": "audio", "index": 0, "text": 句子, "format": "ogg", "media_type": ..., "audio": base64}
+    {"type": "done", "timings": {...}}
+
+出错时返回 {"type": "error", "stage": ..., "error": ...} 后结束。
+回复一确定（对话模拟延迟之前）就按句提交合成，首句合成与其余阶段重叠。
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from services.audio_codec import media_type, normalize_format
+from services.metrics import STAGE_SECONDS
+from services.text_segmenter import split_sentences
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+
+class SpeechUnavailableError(ValueError):
+    """请求了语音，但当前实例不提供TTS"""
+
+
+def encode_event(event: Dict) -> bytes:
+    """事件编码为一行JSON"""
+    return (json.dumps(event, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def audio_event(index: int, sentence: str, audio_content: bytes,
+                output_format: str = 'wav', sample_rate: int = 24000) -> Dict:
+    return {
+        'type': 'audio',
+        'index': index,
+        'text': sentence,
+        'format': output_format,
+        'media_type': media_type(output_format, sample_rate),
+        'audio': base64.b64encode(audio_content).decode('ascii')
+    }
+
+
+def parse_tts_options(raw: Optional[str]) -> Optional[Dict]:
+    """
+    解析表单中的tts字段
+
+    Args:
+        raw: JSON字符串，如 {"speed": 1.0, "volume": 0.8, "pitch": 1.0, "format": "ogg", "quality": "fast"}；
+             为空或false表示不合成语音
+
+    Returns:
+        dict: 合成参数（format已规范化，默认wav），不需要语音时为None
+
+    Raises:
+        ValueError: 字段不是合法的JSON对象或格式不支持
+    """
+    options = json.loads(raw) if raw else {}
+    if options is False or options is None:
+        return None
+    if not isinstance(options, dict):
+        raise ValueError("tts参数应为JSON对象或false")
+    options['format'] = normalize_format(options.get('format') or 'wav')
+    return options
+
+
+class VoiceTurn:
+    """
+    一次语音对话轮次的合成状态
+
+    Args:
+        executor: 执行分句合成的线程池
+        tts_service: TTSService实例，为None时不合成语音（客户端使用浏览器TTS）
+        tts_options: 合成参数 {speed, volume, pitch, format, quality}
+        max_sentence_chars: 分句最大长度
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, tts_service, tts_options: Dict, max_sentence_chars: int):
+        self.executor = executor
+        self.tts_service = tts_service
+        self.tts_options = tts_options
+        self.max_sentence_chars = max_sentence_chars
+        self.output_format = tts_options.get('format', 'wav')
+        self.sample_rate = tts_service.default_params['sample_rate'] if tts_service is not None else None
+        self.segments: List[Tuple[int, str, object]] = []
+        self.started = time.perf_counter()
+        self.timings = {}
+
+    def mark(self, name: str):
+        """记录从轮次开始到当前的耗时（毫秒）"""
+        self.timings[name] = round((time.perf_counter() - self.started) * 1000, 2)
+
+    def on_reply(self, reply: str):
+        """
+        回复确定后立即按句提交合成（作为对话服务的on_reply回调）
+
+        Args:
+            reply: 回复文本
+        """
+        if self.tts_service is None or not reply or not reply.strip():
+            return
+        sentences = split_sentences(reply, max_chars=self.max_sentence_chars)
+        self.segments = [
+            (index, sentence, self.executor.submit(
+                self.tts_service.text_to_speech,
+                text=sentence,
+                speed=self.tts_options.get('speed', 1.0),
+                volume=self.tts_options.get('volume', 1.0),
+                pitch=self.tts_options.get('pitch', 1.0),
+                output_format=self.output_format,
+                quality=self.tts_options.get('quality')
+            ))
+            for index, sentence in enumerate(sentences)
+        ]
+
+    def audio_ready(self, index: int):
+        """某句音频已可发送，记录首句耗时"""
+        if index == 0:
+            self.mark('first_audio_ms')
+            STAGE_SECONDS.observe(self.timings['first_audio_ms'] / 1000, service='voice_turn', stage='first_audio')
+
+    def iter_audio_events(self, timeout: float) -> Iterator[Dict]:
+        """
+        按句子顺序等待合成结果并产出audio事件（阻塞）
+
+        Args:
+            timeout: 每句等待合成的超时（秒）
+        """
+        for index, sentence, future in self.segments:
+            _, _, audio_content = future.result(timeout=timeout)
+            self.audio_ready(index)
+            yield audio_event(index, sentence, audio_content, self.output_format, self.sample_rate)
+
+    def done_event(self) -> Dict:
+        self.mark('total_ms')
+        STAGE_SECONDS.observe(self.timings['total_ms'] / 1000, service='voice_turn', stage='total')
+        return {'type': 'done', 'timings': self.timings}
+
+    def cancel(self):
+        """客户端断开或出错时取消尚未开始的合成"""
+        for _, _, future in self.segments:
+            future.cancel()
+
+
+class VoiceTurnPipeline:
+    """
+    语音对话流水线（负责对话和合成阶段，识别由接口按/api/asr的方式完成）
+
+    Args:
+        chat_service: AISimulationService实例
+        tts_service: TTSService实例，当前角色不提供TTS时为None
+        max_workers: 分句合成线程数
+        max_sentence_chars: 分句最大长度
+    """
+
+    def __init__(self, chat_service, tts_service, max_workers: int = 2, max_sentence_chars: int = 60):
+        self.chat_service = chat_service
+        self.tts_service = tts_service
+        self.max_sentence_chars = max_sentence_chars
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='voice-turn-tts')
+
+    def start(self, tts_options: Optional[Dict]) -> VoiceTurn:
+        """
+        开始一个轮次
+
+        Args:
+            tts_options: 合成参数，为None时不合成语音
+
+        Raises:
+            SpeechUnavailableError: 请求了语音但当前实例不提供TTS
+        """
+        if tts_options is not None and self.tts_service is None:
+            raise SpeechUnavailableError("当前实例不提供语音合成，请将tts设为false或请求提供TTS的实例")
+        tts_service = self.tts_service if tts_options is not None else None
+        return VoiceTurn(self._executor, tts_service, tts_options or {}, self.max_sentence_chars)
+
+    def run(self, turn: VoiceTurn, transcript: str, dialogue_id: Optional[str], timeout: float) -> Iterator[bytes]:
+        """
+        对话和合成阶段（同步版本），逐行产出NDJSON事件
+
+        Args:
+            turn: start()返回的轮次
+            transcript: 识别结果
+            dialogue_id: 对话ID
+            timeout: 每句等待合成的超时（秒）
+        """
+        stage = 'chat'
+        try:
+            yield encode_event({'type': 'transcript', 'text': transcript})
+            if transcript.strip():
+                result = self.chat_service.process_chat(transcript, dialogue_id=dialogue_id, on_reply=turn.on_reply)
+                turn.mark('reply_ms')
+                yield encode_event({'type': 'reply', 'text': result['reply'], 'dialogue_id': result['dialogue_id']})
+                stage = 'tts'
+                for event in turn.iter_audio_events(timeout):
+                    yield encode_event(event)
+            yield encode_event(turn.done_event())
+        except FuturesTimeoutError:
+            logger.error("语音对话合成超时")
+            yield encode_event({'type': 'error', 'stage': stage, 'error': '语音合成超时'})
+        except Exception as e:
+            logger.error("语音对话%s阶段失败: %s", stage, e, exc_info=True)
+            yield encode_event({'type': 'error', 'stage': stage, 'error': str(e)})
+        finally:
+            turn.cancel()
+
+    async def run_async(self, turn: VoiceTurn, transcript: str, dialogue_id: Optional[str],
+                        timeout: float) -> AsyncIterator[bytes]:
+        """
+        对话和合成阶段（异步版本），等待模拟延迟和合成结果时不占用线程
+
+        Args:
+            turn: start()返回的轮次
+            transcript: 识别结果
+            dialogue_id: 对话ID
+            timeout: 每句等待合成的超时（秒）
+        """
+        stage = 'chat'
+        try:
+            yield encode_event({'type': 'transcript', 'text': transcript})
+            if transcript.strip():
+                result = await self.chat_service.process_chat_async(
+                    transcript, dialogue_id=dialogue_id, on_reply=turn.on_reply
+                )
+                turn.mark('reply_ms')
+                yield encode_event({'type': 'reply', 'text': result['reply'], 'dialogue_id': result['dialogue_id']})
+                stage = 'tts'
+                for index, sentence, future in turn.segments:
+                    # shield：等待超时不应取消共享线程池中的合成任务本身（由finally统一处理）
+                    _, _, audio_content = await asyncio.wait_for(
+                        asyncio.shield(asyncio.wrap_future(future)), timeout
+                    )
+                    turn.audio_ready(index)
+                    yield encode_event(audio_event(index, sentence, audio_content, turn.output_format, turn.sample_rate))
+            yield encode_event(turn.done_event())
+        except asyncio.TimeoutError:
+            logger.error("语音对话合成超时")
+            yield encode_event({'type': 'error', 'stage': stage, 'error': '语音合成超时'})
+        except Exception as e:
+            logger.error("语音对话%s阶段失败: %s", stage, e, exc_info=True)
+            yield encode_event({'type': 'error', 'stage': stage, 'error': str(e)})
+        finally:
+            turn.cancel()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
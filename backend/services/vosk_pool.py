@@ -0,0 +1,212 @@
+"""
+Vosk模型注册表与识别器池
+
+同一进程内每个模型只加载一次；每个（模型, 采样率）对应一个有界识别器池，
+识别器用完后Reset()放回池中复用，避免每次请求重复创建。
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RecognizerPool:
+    """
+    KaldiRecognizer对象池
+
+    最多同时借出max_size个识别器，池满时acquire()阻塞等待，超时抛出TimeoutError。
+    recognizer_factory用于替换KaldiRecognizer（如基准测试的替身识别器）。
+    """
+
+    def __init__(self, model, sample_rate: int, max_size: int = 4,
+                 recognizer_factory: Optional[Callable] = None):
+        self.model = model
+        self.sample_rate = sample_rate
+        self.max_size = max_size
+        self._recognizer_factory = recognizer_factory
+
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._in_use = 0
+        self._stats = {
+            'created': 0,
+            'acquisitions': 0,
+            'timeouts': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+        }
+
+    def acquire(self, timeout: float = None):
+        """
+        借出一个识别器
+
+        Args:
+            timeout: 最长等待秒数，None表示一直等待
+
+        Returns:
+            KaldiRecognizer: 已重置的识别器
+        """
+        wait_start = time.perf_counter()
+        if not self._slots.acquire(timeout=timeout):
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise TimeoutError(f"识别器池已满（{self.max_size}），等待超时")
+        wait_ms = (time.perf_counter() - wait_start) * 1000
+
+        with self._lock:
+            self._in_use += 1
+            self._stats['acquisitions'] += 1
+            self._stats['total_wait_ms'] += wait_ms
+            self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], wait_ms)
+            recognizer = self._idle.pop() if self._idle else None
+
+        if recognizer is None:
+            try:
+                factory = self._recognizer_factory
+                if factory is None:
+                    from vosk import KaldiRecognizer as factory
+                recognizer = factory(self.model, self.sample_rate)
+                recognizer.SetWords(True)
+            except Exception:
+                self._release_slot()
+                raise
+            with self._lock:
+                self._stats['created'] += 1
+        return recognizer
+
+    def release(self, recognizer, discard: bool = False):
+        """
+        归还识别器
+
+        Args:
+            recognizer: acquire()借出的识别器
+            discard: 为True时丢弃该识别器（例如识别过程中出错）
+        """
+        if not discard:
+            try:
+                recognizer.Reset()
+            except Exception as e:
+                logger.warning("识别器重置失败，丢弃: %s", e)
+                discard = True
+        with self._lock:
+            if not discard:
+                self._idle.append(recognizer)
+        self._release_slot()
+
+    def _release_slot(self):
+        with self._lock:
+            self._in_use -= 1
+        self._slots.release()
+
+    def get_stats(self) -> Dict:
+        """
+        获取池的使用情况
+
+        Returns:
+            dict: 借出数、空闲数、利用率、等待耗时等
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'sample_rate': self.sample_rate,
+                'max_size': self.max_size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'utilization': round(self._in_use / self.max_size, 4),
+            })
+        acquisitions = stats['acquisitions']
+        stats['avg_wait_ms'] = round(stats['total_wait_ms'] / acquisitions, 3) if acquisitions else 0.0
+        stats['total_wait_ms'] = round(stats['total_wait_ms'], 3)
+        stats['max_wait_ms'] = round(stats['max_wait_ms'], 3)
+        return stats
+
+
+class VoskModelRegistry:
+    """
+    进程级Vosk模型注册表，每个模型路径只加载一次
+
+    Args:
+        model_factory: 替换vosk.Model的模型构造函数，参数为模型路径
+        recognizer_factory: 替换KaldiRecognizer的识别器构造函数
+    """
+
+    def __init__(self, model_factory: Optional[Callable] = None, recognizer_factory: Optional[Callable] = None):
+        self._model_factory = model_factory
+        self._recognizer_factory = recognizer_factory
+        self._lock = threading.Lock()
+        self._models = {}
+        self._load_times = {}
+        self._pools = {}
+
+    def get_model(self, model_path: str):
+        """
+        获取已加载的模型，首次调用时加载
+
+        Args:
+            model_path: 模型目录
+
+        Returns:
+            Model: Vosk模型
+        """
+        key = os.path.abspath(model_path)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                return model
+            factory = self._model_factory
+            if factory is None:
+                if not os.path.exists(key):
+                    raise FileNotFoundError(f"Vosk模型文件未找到: {model_path}")
+                from vosk import Model as factory
+            # 持锁加载，保证并发请求下同一模型只加载一次
+            load_start = time.perf_counter()
+            model = factory(key)
+            self._load_times[key] = (time.perf_counter() - load_start) * 1000
+            self._models[key] = model
+            logger.info(f"Vosk模型加载完成 - 路径: {key}, 耗时: {self._load_times[key]:.2f}ms")
+            return model
+
+    def get_pool(self, model_path: str, sample_rate: int, max_size: int = 4) -> RecognizerPool:
+        """
+        获取（模型, 采样率）对应的识别器池
+
+        Args:
+            model_path: 模型目录
+            sample_rate: 识别器采样率
+            max_size: 池大小，仅在首次创建时生效
+
+        Returns:
+            RecognizerPool: 识别器池
+        """
+        model = self.get_model(model_path)
+        key = (os.path.abspath(model_path), int(sample_rate))
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = RecognizerPool(model, int(sample_rate), max_size, self._recognizer_factory)
+                self._pools[key] = pool
+            return pool
+
+    def get_stats(self) -> Dict:
+        """
+        获取所有模型和识别器池的统计信息
+
+        Returns:
+            dict: {'models': {路径: 加载耗时}, 'pools': [池统计]}
+        """
+        with self._lock:
+            pools = list(self._pools.items())
+            load_times = {path: round(ms, 2) for path, ms in self._load_times.items()}
+        return {
+            'models': load_times,
+            'pools': [dict(pool.get_stats(), model_path=path) for (path, _), pool in pools],
+        }
+
+
+# 进程级单例
+model_registry = VoskModelRegistry()
@@ -0,0 +1,31 @@
+from services.fake_engines import FakeTTSEngine
+from services.inference_scheduler import InferenceScheduler
+from services.readiness import ReadinessProbe, start_warm_up
+
+
+# 预热成功后在后台线程中调用after（如预合成固定回复）
+def test_start_warm_up_runs_after_hook():
+    probe = ReadinessProbe()
+    scheduler = InferenceScheduler()
+    calls = []
+    thread = start_warm_up(probe, lambda: (FakeTTSEngine(rtf=0.001), None, scheduler),
+                           after=lambda: calls.append(probe.ready), text='您好', min_rounds=1, max_rounds=1)
+    thread.join(timeout=10)
+    scheduler.shutdown()
+
+    assert probe.ready
+    assert calls == [True]
+
+
+# 服务构建失败时不就绪，也不调用after
+def test_start_warm_up_skips_after_hook_on_failure():
+    probe = ReadinessProbe()
+    calls = []
+
+    def resolve():
+        raise RuntimeError('模型加载失败')
+
+    start_warm_up(probe, resolve, after=lambda: calls.append(True), text='您好').join(timeout=10)
+
+    assert probe.snapshot()['status'] == 'failed'
+    assert calls == []
@@ -0,0 +1,20 @@
+from services.text_segmenter import split_sentences
+
+
+# 合并短句时英文句子之间保留空格
+def test_merge_keeps_space_between_english_sentences():
+    assert split_sentences('Hi. How are you?') == ['Hi. How are you?']
+    assert split_sentences('你好。我很好！') == ['你好。我很好！']
+
+
+# 超长英文句在空白处截断，不拆开单词
+def test_long_clause_breaks_at_whitespace():
+    chunks = split_sentences('The quick brown fox jumps over the lazy dog again and again', max_chars=20)
+
+    assert chunks == ['The quick brown fox', 'jumps over the lazy', 'dog again and again']
+    assert all(len(chunk) <= 20 for chunk in chunks)
+
+
+# 没有空白的超长片段（中文）仍按固定长度截断
+def test_long_clause_without_whitespace_hard_cut():
+    assert split_sentences('一' * 25, max_chars=10) == ['一' * 10, '一' * 10, '一' * 5]
@@ -0,0 +1,48 @@
+from contextlib import ExitStack
+
+from services.tts_quality import DEFAULT_TIERS, QualitySelector, QualityTier
+
+
+def _overloaded_selector(tiers):
+    """立即按排队深度降档的自适应选择器"""
+    return QualitySelector(tiers, adaptive=True, capacity=1, max_queue=1, max_p95_ms=0, hold_seconds=0)
+
+
+def _resolve_under_load(selector, quality, in_flight=2):
+    with ExitStack() as stack:
+        for _ in range(in_flight):
+            stack.enter_context(selector.track())
+        # 每次resolve最多调整一级，多调用几次达到最大降档级数
+        for _ in range(3):
+            tier = selector.resolve(quality)
+        return tier, selector.level
+
+
+# 降档切换声码器，而不只是降低输出采样率
+def test_downgrade_changes_vocoder():
+    selector = _overloaded_selector(DEFAULT_TIERS)
+    requested = selector.requested('high')
+    served, level = _resolve_under_load(selector, 'high')
+
+    assert served.name == 'balanced'
+    assert served.voc != requested.voc
+
+
+# 较低档位的声码器与当前档位相同时不降档（只会多一次重采样）
+def test_downgrade_skips_tier_with_same_vocoder():
+    selector = _overloaded_selector(DEFAULT_TIERS)
+    served, level = _resolve_under_load(selector, 'balanced')
+
+    assert DEFAULT_TIERS['fast'].voc == DEFAULT_TIERS['balanced'].voc
+    assert served.name == 'balanced'
+    assert level == selector.max_level == 1
+
+
+def test_downgrade_reaches_fast_with_distinct_vocoder():
+    tiers = dict(DEFAULT_TIERS, fast=QualityTier('fast', 'mb_melgan_male', 16000))
+    selector = _overloaded_selector(tiers)
+    served, level = _resolve_under_load(selector, 'high')
+
+    assert level == selector.max_level == 2
+    assert served.name == 'fast'
+    assert served.voc != tiers['high'].voc
@@ -0,0 +1 @@
+# 命令行工具
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量转写命令行工具
+
+本地模式（默认）：在本机启动识别进程池（每个工作进程加载一次模型），直接转写文件、目录或tar/zip归档
+远程模式（--url）：打包上传到服务的 /api/asr/batch，逐行接收结果
+
+结果按完成顺序以NDJSON逐行输出，进度和汇总输出到标准错误；有文件识别失败时以状态码1退出。
+
+在backend目录下运行：
+    python -m tools.batch_asr recordings/ --output results.ndjson
+    python -m tools.batch_asr archive.tar.gz --workers 8
+    python -m tools.batch_asr a.wav b.wav --url http://127.0.0.1:5000
+"""
+
+import argparse
+import http.client
+import io
+import json
+import os
+import sys
+import urllib.parse
+import zipfile
+from typing import Iterator, List
+
+from config import Config
+from services.batch_asr import BatchItem, BatchTranscriber, check_batch, expand_upload, is_audio_name
+
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tgz', '.tar.gz')
+
+
+def _file_item(path: str) -> BatchItem:
+    def read():
+        with open(path, 'rb') as f:
+            return f.read()
+    return BatchItem(path, os.path.getsize(path), read)
+
+
+def collect(paths: List[str]) -> List[BatchItem]:
+    """展开命令行给出的文件、目录（递归）和归档"""
+    items = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                items.extend(_file_item(os.path.join(root, name)) for name in sorted(files) if is_audio_name(name))
+        elif path.lower().endswith(ARCHIVE_EXTENSIONS):
+            with open(path, 'rb') as f:
+                items.extend(expand_upload(path, f.read()))
+        else:
+            items.append(_file_item(path))
+    return items
+
+
+def run_local(items: List[BatchItem], args) -> Iterator[dict]:
+    vad = None
+    if not args.no_vad and Config.ASR_VAD_ENABLED:
+        from services.vad import VoiceActivityDetector
+        vad = VoiceActivityDetector(
+            energy_margin_db=Config.ASR_VAD_ENERGY_MARGIN_DB,
+            max_noise_floor_db=Config.ASR_VAD_MAX_NOISE_FLOOR_DB,
+            min_energy_db=Config.ASR_VAD_MIN_ENERGY_DB,
+            min_silence_ms=Config.ASR_VAD_MIN_SILENCE_MS,
+            padding_ms=Config.ASR_VAD_PADDING_MS,
+            max_segment_seconds=Config.ASR_VAD_MAX_SEGMENT_SECONDS,
+            drop_silence=Config.ASR_VAD_DROP_SILENCE
+        )
+    transcriber = BatchTranscriber(
+        workers=args.workers,
+        asr_kwargs={
+            'engine': args.asr_engine,
+            'fake_rtf': Config.FAKE_ASR_RTF,
+            'model_path': args.asr_model,
+            'sample_rate': Config.SAMPLE_RATE,
+            'pool_size': 1,
+            'vad': vad,
+        },
+        start_method=Config.INFERENCE_START_METHOD,
+        log_level='WARNING'
+    )
+    try:
+        yield from transcriber.run(items)
+    finally:
+        transcriber.shutdown()
+
+
+def run_remote(items: List[BatchItem], args) -> Iterator[dict]:
+    """全部文件打包为不压缩的zip（音频本身已难以压缩）上传，逐行读取NDJSON结果"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        for item in items:
+            archive.writestr(item.name, item.read())
+    body = buffer.getvalue()
+
+    parsed = urllib.parse.urlsplit(args.url)
+    connection_class = http.client.HTTPSConnection if parsed.scheme == 'https' else http.client.HTTPConnection
+    connection = connection_class(parsed.netloc, timeout=args.timeout)
+    try:
+        connection.request('POST', parsed.path.rstrip('/') + '/api/asr/batch', body=body,
+                           headers={'Content-Type': 'application/zip'})
+        response = connection.getresponse()
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}: {response.read().decode('utf-8', 'replace')}")
+        for line in response:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量语音转写')
+    parser.add_argument('paths', nargs='+', help='音频文件、目录或tar/zip归档')
+    parser.add_argument('--output', '-o', help='结果输出路径（NDJSON），默认输出到标准输出')
+    parser.add_argument('--url', help='服务地址，指定时上传到 /api/asr/batch，否则在本机转写')
+    parser.add_argument('--timeout', type=float, default=600.0, help='远程模式的读取超时（秒）')
+    parser.add_argument('--workers', type=int, default=Config.ASR_BATCH_WORKERS, help='本地工作进程数，0表示CPU核数')
+    parser.add_argument('--asr-engine', default=Config.ASR_ENGINE, help='本地ASR引擎：vosk/fake')
+    parser.add_argument('--asr-model', default=Config.ASR_MODEL_PATH, help='本地Vosk模型目录')
+    parser.add_argument('--no-vad', action='store_true', help='本地转写不做语音活动检测')
+    args = parser.parse_args()
+
+    try:
+        items = check_batch(collect(args.paths))
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if not items:
+        parser.error('没有找到音频文件')
+
+    events = run_remote(items, args) if args.url else run_local(items, args)
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    errors = 0
+    try:
+        completed = 0
+        for event in events:
+            output.write(json.dumps(event, ensure_ascii=False) + '\n')
+            output.flush()
+            if event['type'] == 'done':
+                errors = event['errors']
+                print(f"完成 {event['files']}个文件，失败{event['errors']}个，音频{event['audio_seconds']:.1f}秒，"
+                      f"耗时{event['elapsed_ms'] / 1000:.1f}秒（{event['speed']}倍实时，{event['workers']}个工作进程）",
+                      file=sys.stderr)
+                continue
+            completed += 1
+            status = event['text'] if event['type'] == 'result' else f"失败: {event['error']}"
+            print(f"[{completed}/{len(items)}] {event['name']}: {status}", file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出TTS声学模型和声码器为ONNX，并检查与Paddle推理结果的一致性
+
+PaddleSpeech预训练模型先转为静态图（paddle.jit.save），再由paddle2onnx转换为ONNX，
+输出目录结构见 services/onnx_engine.py。默认导出服务使用的声学模型和全部质量档位的声码器。
+
+需要额外安装：pip install paddle2onnx onnxruntime
+
+在backend目录下运行：
+    python -m tools.export_onnx --output-dir models/onnx
+    python -m tools.export_onnx --voc pwgan_male hifigan_male --check-only
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from config import Config
+from services.onnx_engine import OnnxTTSEngine, compare_engines
+from services.tts_engine import _MULTI_SPEAKER_DATASETS, PaddleTTSEngine
+from tts_service import TTSService
+
+CHECK_TEXTS = [
+    '您好，欢迎使用语音服务。',
+    '今天的天气很好，适合出去走走。',
+    '请问有什么可以帮您？我会尽力解答。',
+]
+
+
+def _to_onnx(prefix: str, save_file: str, opset: int):
+    """静态图模型转ONNX（调用paddle2onnx命令行，各版本参数一致）"""
+    command = shutil.which('paddle2onnx')
+    if command is None:
+        raise RuntimeError("未找到paddle2onnx，请先安装：pip install paddle2onnx")
+    subprocess.run([
+        command,
+        '--model_dir', os.path.dirname(prefix),
+        '--model_filename', os.path.basename(prefix) + '.pdmodel',
+        '--params_filename', os.path.basename(prefix) + '.pdiparams',
+        '--save_file', save_file,
+        '--opset_version', str(opset),
+        '--enable_onnx_checker', 'True',
+    ], check=True)
+
+
+def export(am: str, vocoders, lang: str, output_dir: str, opset: int):
+    """导出声学模型（含音素表和模型信息）和各声码器"""
+    import paddle
+    from paddle.static import InputSpec
+    from paddlespeech.cli.tts.infer import TTSExecutor
+
+    os.makedirs(output_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory() as static_dir:
+        am_exported = False
+        for voc in vocoders:
+            executor = TTSExecutor()
+            executor._init_from_path(am=am, voc=voc, lang=lang)
+            if not am_exported:
+                multi_speaker = am[am.rindex('_') + 1:] in _MULTI_SPEAKER_DATASETS
+                specs = [InputSpec([-1], dtype='int64')]
+                if multi_speaker:
+                    specs.append(InputSpec([1], dtype='int64'))
+                prefix = os.path.join(static_dir, am)
+                paddle.jit.save(paddle.jit.to_static(executor.am_inference, input_spec=specs), prefix)
+                _to_onnx(prefix, os.path.join(output_dir, am + '.onnx'), opset)
+                shutil.copyfile(executor.phones_dict, os.path.join(output_dir, am + '_phones.txt'))
+                with open(os.path.join(output_dir, am + '.json'), 'w', encoding='utf-8') as f:
+                    json.dump({
+                        'am': am,
+                        'lang': lang,
+                        'sample_rate': int(executor.am_config.fs),
+                        'n_mels': int(executor.am_config.n_mels),
+                        'multi_speaker': multi_speaker,
+                    }, f, ensure_ascii=False, indent=2)
+                am_exported = True
+                print(f"已导出声学模型 {am}", file=sys.stderr)
+
+            n_mels = int(executor.am_config.n_mels)
+            prefix = os.path.join(static_dir, voc)
+            spec = [InputSpec([-1, n_mels], dtype='float32')]
+            paddle.jit.save(paddle.jit.to_static(executor.voc_inference, input_spec=spec), prefix)
+            _to_onnx(prefix, os.path.join(output_dir, voc + '.onnx'), opset)
+            print(f"已导出声码器 {voc}", file=sys.stderr)
+
+
+def check(am: str, vocoders, lang: str, output_dir: str, args) -> bool:
+    """逐句对比Paddle和ONNX推理结果，输出对比表，全部在容差内时返回True"""
+    reference = PaddleTTSEngine(am=am, voc=vocoders[0], lang=lang)
+    candidate = OnnxTTSEngine(am=am, voc=vocoders[0], lang=lang, model_dir=output_dir,
+                              intra_op_threads=args.intra_op_threads, inter_op_threads=args.inter_op_threads)
+    rows = compare_engines(reference, candidate, CHECK_TEXTS, vocoders=vocoders,
+                           mel_tolerance=args.mel_tolerance, band_tolerance_db=args.band_tolerance_db)
+    print(f"{'声码器':<20} {'帧数':>11} {'mel最大差':>10} {'mel平均差':>10} {'频带差(dB)':>11} {'结果':>4}  文本")
+    for row in rows:
+        def cell(key, width, digits):
+            value = row.get(key)
+            return f'{value:>{width}.{digits}f}' if value is not None else f"{'-':>{width}}"
+        frames = '/'.join(str(n) for n in row['frames'])
+        print(f"{row['voc'] or '-':<20} {frames:>11} {cell('mel_max_abs', 10, 4)} {cell('mel_mean_abs', 10, 4)} "
+              f"{cell('band_db', 11, 3)} {'通过' if row['passed'] else '失败':>4}  {row['text']}")
+    return all(row['passed'] for row in rows)
+
+
+def main():
+    tiers = [Config.TTS_QUALITY_BALANCED_VOC, Config.TTS_QUALITY_FAST_VOC, Config.TTS_QUALITY_HIGH_VOC]
+    parser = argparse.ArgumentParser(description='导出TTS模型为ONNX')
+    parser.add_argument('--output-dir', '-o', default=Config.TTS_ONNX_MODEL_DIR, help='输出目录')
+    parser.add_argument('--am', default=TTSService.DEFAULT_PARAMS['am'], help='声学模型')
+    parser.add_argument('--voc', nargs='+', default=list(dict.fromkeys(tiers)),
+                        help='声码器，第一个为默认声码器（默认导出全部质量档位的声码器）')
+    parser.add_argument('--lang', default=TTSService.DEFAULT_PARAMS['lang'], help='语言')
+    parser.add_argument('--opset', type=int, default=11, help='ONNX opset版本')
+    parser.add_argument('--check-only', action='store_true', help='不导出，只检查已导出的模型')
+    parser.add_argument('--no-check', action='store_true', help='导出后不做一致性检查')
+    parser.add_argument('--mel-tolerance', type=float, default=0.02, help='梅尔频谱平均绝对差的上限')
+    parser.add_argument('--band-tolerance-db', type=float, default=1.5, help='波形分频带能量平均绝对差的上限（dB）')
+    parser.add_argument('--intra-op-threads', type=int, default=Config.TTS_ONNX_INTRA_OP_THREADS,
+                        help='检查时ONNX Runtime的算子内线程数')
+    parser.add_argument('--inter-op-threads', type=int, default=Config.TTS_ONNX_INTER_OP_THREADS,
+                        help='检查时ONNX Runtime的算子间线程数')
+    args = parser.parse_args()
+
+    if not args.check_only:
+        export(args.am, args.voc, args.lang, args.output_dir, args.opset)
+    if args.no_check:
+        return
+    passed = check(args.am, args.voc, args.lang, args.output_dir, args)
+    print('一致性检查通过' if passed else '一致性检查未通过', file=sys.stderr)
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
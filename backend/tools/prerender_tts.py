@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线批量预渲染TTS提示音
+
+输入为CSV（表头含text，可选id、speed、volume、pitch、format、quality）或JSONL（每行一个同名字段的对象），
+多个工作进程并行合成（每个进程启动时加载一次模型，之后所有条目复用），
+音频按内容地址写入输出目录，最后输出清单。
+
+内容地址与TTS缓存键相同：SHA-256（规范化文本、模型、声码器、说话人、语速、音量、音调、格式），
+文件路径为 <输出目录>/<键前两位>/<键>.<扩展名>。文本和参数不变的条目重复运行时直接跳过，
+大批量提示音可以分多次增量渲染；中断后重新运行即可从未完成的条目继续。
+
+在backend目录下运行：
+    python -m tools.prerender_tts prompts.csv --output-dir prerendered --workers 4 --format ogg
+    python -m tools.prerender_tts prompts.jsonl -o prerendered --engine fake
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List
+
+from config import Config
+from services.audio_codec import decode_audio, media_type, normalize_format
+from services.tts_quality import QualitySelector, QualityTier
+from tts_service import TTSService
+
+# 各格式的文件扩展名
+EXTENSIONS = {'wav': '.wav', 'ogg': '.ogg', 'mp3': '.mp3', 'pcm': '.pcm'}
+
+MANIFEST_NAME = 'manifest.jsonl'
+
+_worker_service = None
+
+
+def quality_selector(default: str) -> QualitySelector:
+    """与服务相同的质量档位配置（不做自适应降档）"""
+    return QualitySelector(
+        tiers={
+            'fast': QualityTier('fast', Config.TTS_QUALITY_FAST_VOC, Config.TTS_QUALITY_FAST_SAMPLE_RATE),
+            'balanced': QualityTier('balanced', Config.TTS_QUALITY_BALANCED_VOC,
+                                    Config.TTS_QUALITY_BALANCED_SAMPLE_RATE),
+            'high': QualityTier('high', Config.TTS_QUALITY_HIGH_VOC, Config.TTS_QUALITY_HIGH_SAMPLE_RATE),
+        },
+        default=default
+    )
+
+
+def _init_worker(engine_kwargs, quality):
+    """工作进程初始化：加载模型并构建不带缓存的TTSService"""
+    global _worker_service
+    from logging_setup import configure_worker_logging
+    from services.tts_engine import create_tts_engine
+    configure_worker_logging('WARNING')
+    engine = create_tts_engine(**engine_kwargs)
+    engine.load()
+    _worker_service = TTSService(cache=None, engine=engine, quality=quality_selector(quality))
+
+
+def _render(text, speed, volume, pitch, output_format, quality, path) -> Dict:
+    """合成一条并原子写入（先写临时文件再改名，中断时不会留下不完整的音频）"""
+    start = time.perf_counter()
+    _, _, audio_content = _worker_service.text_to_speech(
+        text, speed=speed, volume=volume, pitch=pitch, output_format=output_format, quality=quality
+    )
+    render_ms = (time.perf_counter() - start) * 1000
+    wav = decode_audio(audio_content, media_type(output_format, _worker_service.default_params['sample_rate']))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(audio_content)
+    os.replace(tmp_path, path)
+    return {
+        'bytes': len(audio_content),
+        'audio_seconds': round(wav.pcm.nbytes / (wav.sample_width * wav.channels * wav.sample_rate), 3),
+        'render_ms': round(render_ms, 2),
+    }
+
+
+def read_entries(path: str) -> Iterator[Dict]:
+    """读取CSV或JSONL（按扩展名判断，.csv以外均按JSONL读取）"""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if path.lower().endswith('.csv'):
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def plan(entries, defaults: Dict, key_service: TTSService) -> List[Dict]:
+    """
+    补全默认参数、限制参数范围并计算内容地址
+
+    Returns:
+        list: 按输入顺序的条目 {'line', 'id', 'text', 'speed', 'volume', 'pitch', 'format', 'quality', 'key', 'path'}
+    """
+    planned = []
+    for line, entry in enumerate(entries, 1):
+        text = (entry.get('text') or '').strip()
+        if not text:
+            raise ValueError(f"第{line}条缺少text")
+
+        def param(name):
+            value = entry.get(name)
+            return defaults[name] if value in (None, '') else value
+
+        speed, volume, pitch = TTSService.clamp_params(param('speed'), param('volume'), param('pitch'))
+        output_format = normalize_format(param('format'))
+        tier = key_service.quality.requested(param('quality'))
+        key = key_service.content_key(text, speed, volume, pitch, output_format, tier)
+        planned.append({
+            'line': line,
+            'id': entry.get('id') or None,
+            'text': text,
+            'speed': speed,
+            'volume': volume,
+            'pitch': pitch,
+            'format': output_format,
+            'quality': tier.name,
+            'key': key,
+            'path': os.path.join(key[:2], key + EXTENSIONS[output_format]),
+        })
+    return planned
+
+
+def load_manifest(path: str) -> Dict[str, Dict]:
+    """读取上次的清单，跳过的条目沿用其中的时长等信息"""
+    previous = {}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    previous[entry['key']] = entry
+    return previous
+
+
+def write_manifest(path: str, entries: List[Dict]):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    os.replace(tmp_path, path)
+
+
+def render_all(todo: List[Dict], output_dir: str, workers: int, engine_kwargs: Dict,
+               quality: str) -> Iterator[tuple]:
+    """
+    多进程渲染，按完成顺序产出 (条目, 结果或异常)
+
+    同时提交的任务数不超过工作进程数的2倍，中断时未开始的任务被取消。
+    """
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(engine_kwargs, quality))
+    remaining = iter(todo)
+    pending = {}
+    try:
+        while True:
+            while len(pending) < workers * 2:
+                entry = next(remaining, None)
+                if entry is None:
+                    break
+                future = executor.submit(_render, entry['text'], entry['speed'], entry['volume'], entry['pitch'],
+                                         entry['format'], entry['quality'], os.path.join(output_dir, entry['path']))
+                pending[future] = entry
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                entry = pending.pop(future)
+                try:
+                    yield entry, future.result()
+                except Exception as e:
+                    yield entry, e
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线批量预渲染TTS')
+    parser.add_argument('input', help='CSV或JSONL文件')
+    parser.add_argument('--output-dir', '-o', default='prerendered', help='输出目录')
+    parser.add_argument('--manifest', help=f'清单路径，默认为输出目录下的{MANIFEST_NAME}')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='工作进程数')
+    parser.add_argument('--engine', default=Config.TTS_ENGINE, help='TTS引擎：paddle/onnx/fake')
+    parser.add_argument('--format', default='wav', help='未指定format的条目使用的格式')
+    parser.add_argument('--speed', type=float, default=Config.TTS_SPEED, help='未指定speed的条目使用的语速')
+    parser.add_argument('--volume', type=float, default=Config.TTS_VOLUME, help='未指定volume的条目使用的音量')
+    parser.add_argument('--pitch', type=float, default=Config.TTS_PITCH, help='未指定pitch的条目使用的音调')
+    parser.add_argument('--quality', default=Config.TTS_QUALITY_DEFAULT,
+                        help='未指定quality的条目使用的质量档位：fast/balanced/high')
+    parser.add_argument('--force', action='store_true', help='重新渲染已存在的音频')
+    args = parser.parse_args()
+
+    defaults = {'speed': args.speed, 'volume': args.volume, 'pitch': args.pitch, 'format': args.format,
+                'quality': args.quality}
+    engine_kwargs = {
+        'engine': args.engine,
+        'fake_rtf': Config.FAKE_TTS_RTF,
+        'onnx_model_dir': Config.TTS_ONNX_MODEL_DIR,
+        'onnx_intra_op_threads': Config.TTS_ONNX_INTRA_OP_THREADS,
+        'onnx_inter_op_threads': Config.TTS_ONNX_INTER_OP_THREADS,
+        'am': TTSService.DEFAULT_PARAMS['am'],
+        'voc': TTSService.DEFAULT_PARAMS['voc'],
+        'lang': TTSService.DEFAULT_PARAMS['lang'],
+        'frontend_cache_items': Config.TTS_FRONTEND_CACHE_ITEMS,
+    }
+    try:
+        # 只用于计算内容地址，不加载模型
+        from services.tts_engine import create_tts_engine
+        key_service = TTSService(cache=None, engine=create_tts_engine(**engine_kwargs),
+                                 quality=quality_selector(args.quality))
+        entries = plan(read_entries(args.input), defaults, key_service)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    manifest_path = args.manifest or os.path.join(args.output_dir, MANIFEST_NAME)
+    os.makedirs(args.output_dir, exist_ok=True)
+    previous = load_manifest(manifest_path)
+
+    # 相同内容地址的条目只渲染一次
+    results = {}
+    todo = []
+    for entry in entries:
+        if entry['key'] in results:
+            continue
+        target = os.path.join(args.output_dir, entry['path'])
+        if not args.force and os.path.exists(target):
+            known = previous.get(entry['key'], {})
+            results[entry['key']] = {'status': 'skipped', 'bytes': os.path.getsize(target),
+                                     'audio_seconds': known.get('audio_seconds')}
+        else:
+            results[entry['key']] = None
+            todo.append(entry)
+
+    print(f"共{len(entries)}条（{len(results)}个不同的音频），已存在{len(results) - len(todo)}个，"
+          f"待渲染{len(todo)}个，工作进程{args.workers}个", file=sys.stderr)
+    start = time.perf_counter()
+    failed = 0
+    audio_seconds = 0.0
+    for completed, (entry, result) in enumerate(render_all(todo, args.output_dir, args.workers, engine_kwargs, args.quality), 1):
+        if isinstance(result, Exception):
+            failed += 1
+            results[entry['key']] = {'status': 'error', 'error': str(result)}
+            print(f"[{completed}/{len(todo)}] 失败 第{entry['line']}条: {result}", file=sys.stderr)
+        else:
+            audio_seconds += result['audio_seconds']
+            results[entry['key']] = dict(result, status='rendered')
+            print(f"[{completed}/{len(todo)}] {entry['path']} {result['render_ms']:.0f}ms", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+
+    write_manifest(manifest_path, [dict(entry, **results[entry['key']]) for entry in entries])
+    print(f"渲染{len(todo) - failed}个，失败{failed}个，音频{audio_seconds:.1f}秒，耗时{elapsed:.1f}秒；"
+          f"清单已写入 {manifest_path}", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
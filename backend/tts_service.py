@@ -5,11 +5,15 @@ TTS服务类，封装PaddleSpeech调用
 """
 
 import logging
-import tempfile
-import os
 import time
-from pydub import AudioSegment
-from paddlespeech.cli.tts.infer import TTSExecutor
+from services.audio_codec import encode_audio, normalize_format
+from services.audio_dsp import resample
+from services.audio_processing import adjust_audio
+from services.metrics import AUDIO_SECONDS, REAL_TIME_FACTOR, STAGE_SECONDS, TTS_QUALITY
+from services.text_segmenter import split_sentences
+from services.tts_cache import TTSCache
+from services.tts_engine import PaddleTTSEngine
+from services.tts_quality import QualitySelector
 
 logger = logging.getLogger(__name__)
 
@@ -18,42 +22,110 @@ class TTSService:
     TTS服务类，用于将文本转换为语音
     """
     
-    def __init__(self):
+    # 配置男声模型
+    DEFAULT_PARAMS = {
+        'am': 'fastspeech2_male',
+        'voc': 'pwgan_male',
+        'lang': 'zh',
+        'spk_id': 0,
+        'sample_rate': 24000
+    }
+    
+    def __init__(self, cache=None, engine=None, quality=None):
         """
         初始化TTS服务
+        
+        Args:
+            cache: 可选的TTSCache实例，命中时跳过合成
+            engine: 可选的合成引擎，默认使用男声模型的PaddleTTSEngine
+            quality: 可选的QualitySelector，默认使用内置档位、不做自适应降档
         """
-        self.tts_executor = TTSExecutor()
-        # 配置男声模型
-        self.default_params = {
-            'am': 'fastspeech2_male',
-            'voc': 'pwgan_male',
-            'lang': 'zh',
-            'spk_id': 0,
-            'sample_rate': 24000
-        }
+        self.default_params = dict(self.DEFAULT_PARAMS)
+        self.engine = engine or PaddleTTSEngine(
+            am=self.default_params['am'],
+            voc=self.default_params['voc'],
+            lang=self.default_params['lang']
+        )
+        self.cache = cache
+        self.quality = quality or QualitySelector()
         logger.info("TTS服务初始化完成")
     
-    def text_to_speech(self, text, speed=1.0, volume=1.0, pitch=1.0, output_format="wav"):
+    @staticmethod
+    def clamp_params(speed, volume, pitch):
+        """
+        将合成参数限制到允许范围
+        
+        Returns:
+            tuple: (语速0.5-2.0, 音量0.0-1.0, 音调0.5-2.0)
+        """
+        return (max(0.5, min(2.0, float(speed))),
+                max(0.0, min(1.0, float(volume))),
+                max(0.5, min(2.0, float(pitch))))
+    
+    def output_sample_rate(self, tier, output_format):
+        """
+        输出采样率：按质量档位；pcm没有文件头，始终使用default_params中的采样率
+        """
+        if output_format == 'pcm':
+            return self.default_params['sample_rate']
+        return tier.sample_rate
+    
+    def content_key(self, text, speed, volume, pitch, output_format, tier=None):
+        """
+        合成结果的内容地址：文本、模型和参数相同的请求得到相同的键（缓存和离线预渲染共用）
+        
+        Args:
+            speed, volume, pitch: 已经clamp_params限制的参数
+            output_format: 已规范化的格式名
+            tier: 质量档位（QualityTier），默认为默认档位
+        """
+        tier = tier or self.quality.requested()
+        sample_rate = self.output_sample_rate(tier, output_format)
+        return TTSCache.make_key(
+            text,
+            am=self.default_params['am'],
+            voc=tier.voc,
+            spk_id=self.default_params['spk_id'],
+            speed=speed,
+            volume=volume,
+            pitch=pitch,
+            output_format=output_format,
+            # 默认采样率不计入键，与引入质量档位前的缓存和预渲染结果保持一致
+            sample_rate=sample_rate if sample_rate != self.default_params['sample_rate'] else None
+        )
+    
+    def _cached(self, cache_key, total_start):
+        """查询缓存，命中时记录耗时并返回音频内容"""
+        with STAGE_SECONDS.time(service='tts', stage='cache_lookup'):
+            cached_content = self.cache.get(cache_key)
+        if cached_content is not None:
+            total_time = time.perf_counter() - total_start
+            STAGE_SECONDS.observe(total_time, service='tts', stage='total_cached')
+            logger.info("TTS缓存命中 - 总耗时: %.2fms, 大小: %d字节", total_time * 1000, len(cached_content))
+        return cached_content
+    
+    def text_to_speech(self, text, speed=1.0, volume=1.0, pitch=1.0, output_format="wav", quality=None):
         """
         将文本转换为语音
         
+        合成、参数调整和格式编码全部在内存中完成，不产生临时文件。
+        
         Args:
             text: 待合成文本
             speed: 语速，范围0.5-2.0，默认1.0
             volume: 音量，范围0.0-1.0，默认1.0
             pitch: 音调，范围0.5-2.0，默认1.0
-            output_format: 输出格式，支持wav和mp3，默认wav
+            output_format: 输出格式，支持wav、ogg（Opus）、mp3和pcm（16位大端PCM），默认wav
+            quality: 质量档位fast/balanced/high，默认为服务的默认档位；自适应模式下负载高时可能降档
         
         Returns:
-            tuple: (音频文件路径, 音频格式, 音频内容)
+            tuple: (音频文件路径, 音频格式, 音频内容)，音频不再落盘，音频文件路径恒为None
         """
-        # 记录总开始时间
-        total_start_time = time.time()
-        logger.debug(f"TTS服务开始处理请求，文本长度: {len(text)}, 输出格式: {output_format}")
+        total_start = time.perf_counter()
+        logger.debug("TTS服务开始处理请求，文本长度: %d, 输出格式: %s", len(text), output_format)
         
         try:
             # 1. 参数校验阶段
-            param_start = time.time()
             if not text or not text.strip():
                 raise ValueError("文本不能为空")
             
@@ -62,135 +134,115 @@ class TTSService:
                 raise ValueError("文本长度不能超过1000字符")
             
             # 参数校验
-            speed = max(0.5, min(2.0, float(speed)))
-            volume = max(0.0, min(1.0, float(volume)))
-            pitch = max(0.5, min(2.0, float(pitch)))
-            param_end = time.time()
-            param_time = (param_end - param_start) * 1000
-            logger.debug(f"参数校验完成 - 耗时: {param_time:.2f}ms")
+            speed, volume, pitch = self.clamp_params(speed, volume, pitch)
+            export_format = normalize_format(output_format)
             
-            # 2. 临时文件创建阶段
-            file_start = time.time()
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                temp_path = temp_file.name
-            file_end = time.time()
-            file_time = (file_end - file_start) * 1000
-            logger.debug(f"临时文件创建完成 - 耗时: {file_time:.2f}ms, 文件路径: {temp_path}")
+            requested = self.quality.requested(quality)
             
-            # 3. 语音合成核心阶段
-            tts_start = time.time()
-            logger.debug(f"开始调用PaddleSpeech合成语音")
+            # 缓存查询：相同文本和参数直接返回已合成的音频
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self.content_key(text, speed, volume, pitch, export_format, requested)
+                cached_content = self._cached(cache_key, total_start)
+                if cached_content is not None:
+                    return None, export_format, cached_content
             
-            # 直接调用TTSExecutor，使用正确的模型参数
-            # 使用支持的男声模型
-            self.tts_executor(text=text, 
-                            output=temp_path,
-                            am='fastspeech2_male',
-                            voc='pwgan_male',
-                            lang='zh',
-                            spk_id=0)
+            # 请求的档位未命中缓存时才按负载选择实际档位，降档后的结果按降档后的档位缓存
+            tier = self.quality.resolve(quality)
+            if tier != requested and self.cache is not None:
+                cache_key = self.content_key(text, speed, volume, pitch, export_format, tier)
+                cached_content = self._cached(cache_key, total_start)
+                if cached_content is not None:
+                    return None, export_format, cached_content
+            TTS_QUALITY.inc(requested=requested.name, served=tier.name)
             
-            tts_end = time.time()
-            tts_time = (tts_end - tts_start) * 1000
-            logger.debug(f"语音合成完成 - 耗时: {tts_time:.2f}ms")
+            # 2. 语音合成核心阶段（波形保留在内存中）
+            synth_start = time.perf_counter()
+            with self.quality.track():
+                samples, sample_rate, stage_times = self.engine.synthesize(
+                    text, spk_id=self.default_params['spk_id'], voc=tier.voc
+                )
+            synth_time = time.perf_counter() - synth_start
+            audio_seconds = len(samples) / sample_rate
+            STAGE_SECONDS.observe(synth_time, service='tts', stage='synthesize')
+            for stage in ('frontend', 'am', 'voc'):
+                STAGE_SECONDS.observe(stage_times.get(stage, 0.0) / 1000, service='tts', stage=stage)
+            if audio_seconds > 0:
+                REAL_TIME_FACTOR.observe(synth_time / audio_seconds, service='tts')
+            AUDIO_SECONDS.inc(audio_seconds, service='tts')
             
-            # 4. 音频处理阶段
-            audio_start = time.time()
-            logger.debug(f"开始音频处理")
+            # 3. 音频处理阶段：先降到档位的采样率，之后的参数调整和编码处理的采样点更少
+            output_rate = self.output_sample_rate(tier, export_format)
+            if output_rate != sample_rate:
+                with STAGE_SECONDS.time(service='tts', stage='resample'):
+                    samples = resample(samples, sample_rate, output_rate)
+                    sample_rate = output_rate
             
-            # 直接返回原始WAV文件，跳过所有音频处理
-            # 只有在明确需要时才进行处理
-            export_format = "wav"
-            audio_content = None
+            with STAGE_SECONDS.time(service='tts', stage='adjust'):
+                samples, sample_rate = adjust_audio(
+                    samples, sample_rate, speed=speed, volume=volume, pitch=pitch
+                )
             
-            # 快速路径：如果没有调整参数且格式为wav，直接返回
-            if speed == 1.0 and volume == 1.0 and pitch == 1.0 and output_format.lower() == "wav":
-                logger.debug(f"使用快速路径，直接返回原始WAV文件")
-                with open(temp_path, "rb") as f:
-                    audio_content = f.read()
-                logger.debug(f"读取文件内容完成 - 大小: {len(audio_content)}字节")
-            else:
-                logger.debug(f"使用慢速路径，需要调整参数或转换格式")
-                # 慢速路径：需要调整参数或转换格式
-                audio = AudioSegment.from_wav(temp_path)
-                logger.debug(f"加载音频文件完成 - 时长: {len(audio)/1000}秒")
-                
-                # 调整音量
-                if volume != 1.0:
-                    vol_start = time.time()
-                    audio = audio.apply_gain(volume * 20 - 20)
-                    vol_end = time.time()
-                    logger.debug(f"音量调整完成 - 耗时: {(vol_end - vol_start)*1000:.2f}ms")
-                
-                # 调整音调
-                if pitch != 1.0:
-                    pitch_start = time.time()
-                    new_sample_rate = int(audio.frame_rate * (pitch ** 0.5))
-                    audio = audio._spawn(audio.raw_data, overrides={'frame_rate': new_sample_rate})
-                    audio = audio.set_frame_rate(24000)
-                    pitch_end = time.time()
-                    logger.debug(f"音调调整完成 - 耗时: {(pitch_end - pitch_start)*1000:.2f}ms")
-                
-                # 调整语速
-                if speed != 1.0:
-                    speed_start = time.time()
-                    audio = audio.speedup(playback_speed=speed)
-                    speed_end = time.time()
-                    logger.debug(f"语速调整完成 - 耗时: {(speed_end - speed_start)*1000:.2f}ms")
-                
-                # 转换格式
-                export_format = output_format.lower()
-                if export_format == "mp3":
-                    mp3_start = time.time()
-                    # 直接导出到内存流
-                    from io import BytesIO
-                    mp3_stream = BytesIO()
-                    audio.export(mp3_stream, format="mp3")
-                    mp3_stream.seek(0)
-                    audio_content = mp3_stream.read()
-                    mp3_end = time.time()
-                    logger.debug(f"MP3格式转换完成 - 耗时: {(mp3_end - mp3_start)*1000:.2f}ms, 大小: {len(audio_content)}字节")
-                else:
-                    wav_start = time.time()
-                    # 覆盖原始文件
-                    audio.export(temp_path, format="wav")
-                    with open(temp_path, "rb") as f:
-                        audio_content = f.read()
-                    wav_end = time.time()
-                    logger.debug(f"WAV格式保存完成 - 耗时: {(wav_end - wav_start)*1000:.2f}ms, 大小: {len(audio_content)}字节")
-            
-            audio_end = time.time()
-            audio_time = (audio_end - audio_start) * 1000
-            logger.debug(f"音频处理完成 - 总耗时: {audio_time:.2f}ms")
+            # 4. 编码阶段
+            with STAGE_SECONDS.time(service='tts', stage='encode'):
+                audio_content = encode_audio(samples, sample_rate, export_format)
             
-            # 5. 清理阶段
-            cleanup_start = time.time()
-            os.unlink(temp_path)
-            cleanup_end = time.time()
-            cleanup_time = (cleanup_end - cleanup_start) * 1000
-            logger.debug(f"临时文件清理完成 - 耗时: {cleanup_time:.2f}ms")
+            if cache_key is not None:
+                self.cache.put(cache_key, audio_content)
             
-            # 6. 总耗时统计
-            total_end_time = time.time()
-            total_time = (total_end_time - total_start_time) * 1000
-            logger.info(f"TTS服务处理完成 - 总耗时: {total_time:.2f}ms")
-            logger.info(f"各阶段耗时统计：")
-            logger.info(f"  - 参数校验: {param_time:.2f}ms")
-            logger.info(f"  - 文件操作: {file_time:.2f}ms")
-            logger.info(f"  - 语音合成: {tts_time:.2f}ms (占比: {(tts_time/total_time)*100:.1f}%)")
-            logger.info(f"  - 音频处理: {audio_time:.2f}ms (占比: {(audio_time/total_time)*100:.1f}%)")
-            logger.info(f"  - 清理操作: {cleanup_time:.2f}ms")
+            total_time = time.perf_counter() - total_start
+            STAGE_SECONDS.observe(total_time, service='tts', stage='total')
+            logger.info("TTS服务处理完成 - 档位: %s, 总耗时: %.2fms, 合成: %.2fms, 音频时长: %.2f秒, 大小: %d字节",
+                        tier.name, total_time * 1000, synth_time * 1000, audio_seconds, len(audio_content))
             
-            return temp_path, export_format, audio_content
+            return None, export_format, audio_content
                 
         except Exception as e:
             # 记录异常情况下的总耗时
-            total_end_time = time.time()
-            total_time = (total_end_time - total_start_time) * 1000
-            logger.error(f"语音合成失败 - 总耗时: {total_time:.2f}ms, 错误: {str(e)}")
-            
-            # 清理临时文件
-            if 'temp_path' in locals() and os.path.exists(temp_path):
-                os.unlink(temp_path)
-                logger.debug(f"清理临时文件: {temp_path}")
+            total_time = (time.perf_counter() - total_start) * 1000
+            logger.error("语音合成失败 - 总耗时: %.2fms, 错误: %s", total_time, e)
             raise
+    
+    def iter_speech(self, text, speed=1.0, volume=1.0, pitch=1.0, max_sentence_chars=60, output_format="wav",
+                    quality=None):
+        """
+        分句合成语音，逐句产出完整的音频文件，用于流式响应
+        
+        文本校验在调用时立即进行（参数错误直接抛出ValueError），
+        合成在迭代返回的生成器时逐句进行。
+        
+        Args:
+            text: 待合成文本
+            speed: 语速，范围0.5-2.0，默认1.0
+            volume: 音量，范围0.0-1.0，默认1.0
+            pitch: 音调，范围0.5-2.0，默认1.0
+            max_sentence_chars: 单句最大长度
+            output_format: 每句音频的格式，同text_to_speech
+            quality: 质量档位，同text_to_speech（自适应模式下每句单独选择）
+        
+        Returns:
+            generator: 逐句产出 (句子序号, 句子文本, 音频内容)
+        """
+        if not text or not text.strip():
+            raise ValueError("文本不能为空")
+        if len(text) > 1000:
+            raise ValueError("文本长度不能超过1000字符")
+        output_format = normalize_format(output_format)
+        quality = self.quality.normalize(quality)
+        
+        sentences = split_sentences(text, max_chars=max_sentence_chars)
+        logger.info("TTS流式合成 - 文本长度: %d, 分句数: %d", len(text), len(sentences))
+        
+        def generate():
+            for index, sentence in enumerate(sentences):
+                _, _, audio_content = self.text_to_speech(
+                    text=sentence,
+                    speed=speed,
+                    volume=volume,
+                    pitch=pitch,
+                    output_format=output_format,
+                    quality=quality
+                )
+                yield index, sentence, audio_content
+        
+        return generate()
@@ -5,6 +5,7 @@ class ChatManager {
         this.chatHistory = [];
         this.dialogueId = null;
         this.isProcessing = false;
+        this.voiceTurnLoading = null;
         
         // DOM元素
         this.chatHistoryElement = document.getElementById('chat-history');
@@ -138,14 +139,16 @@ class ChatManager {
         return messageElement;
     }
 
-    async sendMessage(message) {
+    async sendMessage(message, ttsOptions = null) {
         // 发送消息到AI服务
         // 
         // Args:
         //     message: 用户消息
+        //     ttsOptions: 回复语音的合成参数 {speed, volume, pitch}，
+        //                 传入时后端在确定回复后立即开始合成；为null表示不需要后端语音
         //     
         // Returns:
-        //     str: AI响应
+        //     dict: {reply: AI响应, audioUrl: 预取语音地址（可能为null）}
         console.time('AI消息处理总耗时');
         if (this.isProcessing) {
             console.warn('正在处理中，请稍后再试');
@@ -166,7 +169,7 @@ class ChatManager {
             
             console.time('AI API调用耗时');
             // 发送请求到AI服务
-            const response = await this.callAIChatAPI(message);
+            const response = await this.callAIChatAPI(message, ttsOptions);
             console.timeEnd('AI API调用耗时');
             
             // 移除加载状态
@@ -190,7 +193,10 @@ class ChatManager {
                 console.timeEnd('AI消息处理总耗时');
             });
             
-            return response.reply;
+            return {
+                reply: response.reply,
+                audioUrl: response.audio_url || null
+            };
             
         } catch (error) {
             console.error('发送消息失败:', error);
@@ -202,20 +208,22 @@ class ChatManager {
         }
     }
 
-    async callAIChatAPI(message) {
+    async callAIChatAPI(message, ttsOptions = null) {
         // 调用AI对话API
         // 
         // Args:
         //     message: 用户消息
+        //     ttsOptions: 回复语音的合成参数，为null时不请求预取
         //     
         // Returns:
         //     dict: API响应
         const url = `${this.config.apiBaseUrl}/chat`;
         
         const requestData = {
+            // 上下文由服务端按dialogue_id保存，只发送新消息
             message: message,
-            context: this.chatHistory.slice(-5), // 只发送最近5条消息作为上下文
-            dialogue_id: this.dialogueId
+            dialogue_id: this.dialogueId,
+            tts: ttsOptions || false
         };
         
         const response = await fetch(url, {
@@ -233,6 +241,40 @@ class ChatManager {
         return await response.json();
     }
 
+    displayTranscript(text) {
+        // 显示语音对话接口返回的识别结果，并在回复到达前显示加载状态
+        // 
+        // Args:
+        //     text: 识别结果
+        this.displayMessage(text, 'user');
+        this.voiceTurnLoading = this.displayLoadingMessage();
+        this.updateStatus('正在处理...');
+    }
+
+    displayReply(reply, dialogueId) {
+        // 显示语音对话接口返回的AI回复（语音由SpeechManager播放）
+        // 
+        // Args:
+        //     reply: AI回复
+        //     dialogueId: 对话ID
+        this.clearVoiceTurnLoading();
+        if (dialogueId) {
+            this.dialogueId = dialogueId;
+        }
+        this.updateStatus('AI正在回复...');
+        this.displayMessageWithTypingEffect(reply, 'ai', () => {
+            this.updateStatus('就绪');
+        });
+    }
+
+    clearVoiceTurnLoading() {
+        // 移除语音对话的加载状态
+        if (this.voiceTurnLoading) {
+            this.voiceTurnLoading.remove();
+            this.voiceTurnLoading = null;
+        }
+    }
+
     displayLoadingMessage() {
         // 显示AI加载状态
         // 
@@ -334,7 +376,12 @@ class ChatManager {
     }
 
     clearChatHistory() {
-        // 清空聊天历史
+        // 清空聊天历史，并通知服务端释放会话（失败无影响，会话会超时淘汰）
+        if (this.dialogueId) {
+            fetch(`${this.config.apiBaseUrl}/chat/${encodeURIComponent(this.dialogueId)}`, {
+                method: 'DELETE'
+            }).catch(() => {});
+        }
         this.chatHistory = [];
         this.dialogueId = null;
         this.chatHistoryElement.innerHTML = `
@@ -23,6 +23,11 @@ class AIChatApp {
             this.speechManager = new SpeechManager({
                 apiBaseUrl: this.config.apiBaseUrl,
                 onSpeechRecognized: this.handleSpeechRecognized.bind(this),
+                onVoiceTurnEvent: this.handleVoiceTurnEvent.bind(this),
+                getVoiceTurnParams: () => ({
+                    pitch: this.videoManager.getCurrentPitch(),
+                    dialogueId: this.chatManager.dialogueId
+                }),
                 onAudioPlayed: this.handleAudioPlayed.bind(this),
                 onAudioEnded: this.handleAudioEnded.bind(this),
                 onProgress: (progress) => {
@@ -207,12 +212,12 @@ class AIChatApp {
         }
         
         // 发送消息
-        this.chatManager.sendMessage(message)
-            .then(async (aiResponse) => {
-                // 转换为语音
-                // --- 修改点：获取当前角色音调并传入 ---
-                const currentPitch = this.videoManager.getCurrentPitch();
-                await this.speechManager.textToSpeech(aiResponse, currentPitch);
+        // --- 修改点：获取当前角色音调并传入 ---
+        const currentPitch = this.videoManager.getCurrentPitch();
+        this.chatManager.sendMessage(message, this.speechManager.getTTSOptions(currentPitch))
+            .then(async ({ reply, audioUrl }) => {
+                // 转换为语音（后端已在返回回复前开始合成）
+                await this.speechManager.textToSpeech(reply, currentPitch, audioUrl);
             })
             .catch(error => {
                 console.error('发送消息失败:', error);
@@ -239,12 +244,12 @@ class AIChatApp {
             this.chatManager.displayMessage(text, 'user');
             
             // 发送到AI处理
-            this.chatManager.sendMessage(text)
-                .then(async (aiResponse) => {
-                    // 转换为语音
-                    // --- 修改点：获取当前角色音调并传入 ---
-                    const currentPitch = this.videoManager.getCurrentPitch();
-                    await this.speechManager.textToSpeech(aiResponse, currentPitch);
+            // --- 修改点：获取当前角色音调并传入 ---
+            const currentPitch = this.videoManager.getCurrentPitch();
+            this.chatManager.sendMessage(text, this.speechManager.getTTSOptions(currentPitch))
+                .then(async ({ reply, audioUrl }) => {
+                    // 转换为语音（后端已在返回回复前开始合成）
+                    await this.speechManager.textToSpeech(reply, currentPitch, audioUrl);
                 })
                 .catch(error => {
                     console.error('AI处理失败:', error);
@@ -253,6 +258,30 @@ class AIChatApp {
         }
     }
 
+    handleVoiceTurnEvent(event) {
+        // 处理语音对话接口的事件（音频事件由SpeechManager直接播放）
+        switch (event.type) {
+            case 'transcript':
+                if (event.text.trim()) {
+                    this.chatManager.displayTranscript(event.text);
+                }
+                break;
+            case 'reply':
+                this.chatManager.displayReply(event.text, event.dialogue_id);
+                // 使用浏览器TTS时服务端不合成语音
+                if (this.speechManager.getBrowserTTSEnabled()) {
+                    this.speechManager.textToSpeech(event.text, this.videoManager.getCurrentPitch());
+                }
+                break;
+            case 'error':
+                console.error(`语音对话${event.stage}阶段失败:`, event.error);
+                this.chatManager.clearVoiceTurnLoading();
+                this.chatManager.updateStatus('就绪');
+                this.showError('AI处理失败，请重试');
+                break;
+        }
+    }
+
     handleAudioPlayed() {
         // 处理音频开始播放 -> 切换到说话视频
         this.videoManager.switchToSpeaking();
@@ -6,8 +6,23 @@ class SpeechManager {
         this.mediaRecorder = null;
         this.audioChunks = [];
         this.audioContext = null;
+        // 录音格式：浏览器能录Ogg/Opus时直接上传，否则（WebM）解码为16kHz PCM16上传
+        this.recordingMimeType = window.MediaRecorder && MediaRecorder.isTypeSupported('audio/ogg;codecs=opus')
+            ? 'audio/ogg;codecs=opus'
+            : 'audio/webm;codecs=opus';
         this.audioElement = null;
         this.volume = 0.8;
+        // 流式TTS播放相关
+        this.streamingTTSEnabled = options.streamingTTS !== false;
+        this.playbackContext = null;
+        this.playbackGain = null;
+        this.activeSources = [];
+        // 回复语音格式：支持Opus时请求OGG（10秒约25KB），否则请求WAV
+        this.ttsFormat = this.checkOpusPlaybackSupport() ? 'ogg' : 'wav';
+        // 流式识别相关
+        this.streamingASREnabled = options.streamingASR !== false && 'WebSocket' in window;
+        this.streamingSession = null;
+        this.finalResultPromise = null;
         // 浏览器TTS相关
         this.browserTTSEnabled = false;
         this.isBrowserTTSSupported = this.checkBrowserTTSSupport();
@@ -21,6 +36,11 @@ class SpeechManager {
         this.initAudioElement();
     }
     
+    checkOpusPlaybackSupport() {
+        // 检查浏览器能否解码Ogg/Opus
+        return new Audio().canPlayType('audio/ogg; codecs=opus') !== '';
+    }
+    
     checkBrowserTTSSupport() {
         // 检查浏览器是否支持原生TTS API
         return 'speechSynthesis' in window;
@@ -68,9 +88,16 @@ class SpeechManager {
             // 请求麦克风权限
             const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
             
+            // 优先使用流式识别，连接失败时回退到录音结束后整段上传
+            if (this.streamingASREnabled && await this.startStreamingRecognition(stream)) {
+                this.isRecording = true;
+                this.updateRecordingUI(true);
+                return;
+            }
+            
             // 创建MediaRecorder实例
             this.mediaRecorder = new MediaRecorder(stream, {
-                mimeType: 'audio/webm;codecs=opus'
+                mimeType: this.recordingMimeType
             });
             
             // 重置音频块
@@ -106,6 +133,13 @@ class SpeechManager {
 
     stopRecording() {
         // 停止录音
+        if (this.streamingSession && this.isRecording) {
+            this.isRecording = false;
+            this.updateRecordingUI(false);
+            this.finishStreamingRecognition();
+            return;
+        }
+        
         if (this.mediaRecorder && this.isRecording) {
             this.mediaRecorder.stop();
             this.isRecording = false;
@@ -115,17 +149,114 @@ class SpeechManager {
         }
     }
 
+    openASRSocket() {
+        // 建立流式识别WebSocket连接
+        const url = `${this.options.apiBaseUrl.replace(/^http/, 'ws')}/asr/stream`;
+        return new Promise((resolve, reject) => {
+            const socket = new WebSocket(url);
+            socket.binaryType = 'arraybuffer';
+            socket.onopen = () => resolve(socket);
+            socket.onerror = () => reject(new Error('WebSocket连接失败'));
+        });
+    }
+    
+    async startStreamingRecognition(stream) {
+        // 边录音边识别：麦克风PCM实时推送到服务端，服务端返回中间结果
+        let socket;
+        try {
+            socket = await this.openASRSocket();
+        } catch (error) {
+            console.warn('流式识别不可用，改用整段上传:', error);
+            return false;
+        }
+        
+        const context = this.getCaptureContext();
+        if (context.state === 'suspended') {
+            await context.resume();
+        }
+        const source = context.createMediaStreamSource(stream);
+        const processor = context.createScriptProcessor(4096, 1, 1);
+        
+        // 声明实际采样率，浏览器不支持16kHz时由服务端按实际采样率识别
+        socket.send(JSON.stringify({ sample_rate: context.sampleRate }));
+        
+        processor.onaudioprocess = (e) => {
+            if (socket.readyState === WebSocket.OPEN) {
+                socket.send(this.floatTo16BitPCM(e.inputBuffer.getChannelData(0)));
+            }
+        };
+        source.connect(processor);
+        processor.connect(context.destination);
+        
+        this.finalResultPromise = new Promise((resolve, reject) => {
+            socket.onmessage = (event) => {
+                const message = JSON.parse(event.data);
+                if (message.type === 'partial' || message.type === 'result') {
+                    this.showPartialResult(message.text);
+                } else if (message.type === 'final') {
+                    resolve(message.text);
+                } else if (message.type === 'error') {
+                    reject(new Error(message.error));
+                }
+            };
+            socket.onclose = () => reject(new Error('识别连接已关闭'));
+        });
+        // 避免结果未被等待前出错产生未处理的Promise拒绝
+        this.finalResultPromise.catch(() => {});
+        
+        this.streamingSession = { socket, context, source, processor, stream };
+        return true;
+    }
+    
+    async finishStreamingRecognition() {
+        // 结束流式识别并等待最终结果
+        const { socket, source, processor, stream } = this.streamingSession;
+        this.streamingSession = null;
+        
+        processor.disconnect();
+        source.disconnect();
+        stream.getTracks().forEach(track => track.stop());
+        
+        try {
+            if (socket.readyState === WebSocket.OPEN) {
+                socket.send(JSON.stringify({ eof: true }));
+            }
+            const text = await this.finalResultPromise;
+            socket.close();
+            
+            if (this.options.onSpeechRecognized) {
+                this.options.onSpeechRecognized(text);
+            }
+        } catch (error) {
+            console.error('流式识别失败:', error);
+            alert('语音识别失败，请重试');
+        }
+    }
+    
+    showPartialResult(text) {
+        // 在录音提示中显示中间识别结果
+        const textElement = this.recordingIndicator.querySelector('.recording-text');
+        if (textElement && text) {
+            textElement.textContent = text;
+        }
+    }
+
     async processRecording() {
         // 处理录音数据
         try {
             // 创建音频Blob
-            const audioBlob = new Blob(this.audioChunks, { type: 'audio/webm;codecs=opus' });
+            const audioBlob = new Blob(this.audioChunks, { type: this.recordingMimeType });
             
-            // 转换为WAV格式（Vosk要求WAV格式）
-            const wavBlob = await this.convertToWav(audioBlob);
+            // 转换为服务端可直接解码的上传格式
+            const uploadBlob = await this.prepareUpload(audioBlob);
+            
+            // 优先一次请求完成识别、对话和合成，接口不可用时回退到分步请求
+            if (this.options.onVoiceTurnEvent && await this.sendVoiceTurn(uploadBlob)) {
+                return;
+            }
             
             // 发送到ASR API
-            const text = await this.sendToASR(wavBlob);
+            const text = await this.sendToASR(uploadBlob);
             
             // 调用回调函数
             if (this.options.onSpeechRecognized) {
@@ -138,123 +269,76 @@ class SpeechManager {
         }
     }
 
-    async convertToWav(webmBlob) {
-        // 将WebM格式转换为WAV格式（单声道、16位、16000Hz）
-        // 省略了详细注释以节省篇幅，逻辑与之前相同
-        this.audioContext = this.audioContext || new (window.AudioContext || window.webkitAudioContext)({
-            sampleRate: 16000
-        });
-        
-        const arrayBuffer = await webmBlob.arrayBuffer();
-        const audioBuffer = await this.audioContext.decodeAudioData(arrayBuffer);
-        
-        const resampledBuffer = this.resampleAudio(audioBuffer, 16000);
-        const monoBuffer = this.toMono(resampledBuffer);
-        const pcm16 = this.floatTo16BitPCM(monoBuffer.getChannelData(0));
-        const wavHeader = this.createWavHeader(pcm16.length);
-        
-        const wavData = new Uint8Array(wavHeader.length + pcm16.length);
-        wavData.set(wavHeader, 0);
-        wavData.set(pcm16, wavHeader.length);
-        
-        return new Blob([wavData], { type: 'audio/wav' });
+    getCaptureContext() {
+        // 录音相关处理共用一个16kHz的AudioContext（流式识别采集、录音解码）
+        if (!this.audioContext) {
+            this.audioContext = new (window.AudioContext || window.webkitAudioContext)({
+                sampleRate: 16000
+            });
+        }
+        return this.audioContext;
     }
-    
-    resampleAudio(audioBuffer, targetSampleRate) {
-        const sourceSampleRate = audioBuffer.sampleRate;
-        const resampledContext = new (window.AudioContext || window.webkitAudioContext)({
-            sampleRate: targetSampleRate
-        });
-        
-        const resampledBuffer = resampledContext.createBuffer(
-            audioBuffer.numberOfChannels,
-            Math.ceil(audioBuffer.length * targetSampleRate / sourceSampleRate),
-            targetSampleRate
-        );
-        
-        for (let channel = 0; channel < audioBuffer.numberOfChannels; channel++) {
-            const sourceData = audioBuffer.getChannelData(channel);
-            const resampledData = resampledBuffer.getChannelData(channel);
-            
-            for (let i = 0; i < resampledData.length; i++) {
-                const sourceIndex = i * sourceSampleRate / targetSampleRate;
-                const index1 = Math.floor(sourceIndex);
-                const index2 = Math.min(index1 + 1, sourceData.length - 1);
-                const fraction = sourceIndex - index1;
-                
-                resampledData[i] = sourceData[index1] * (1 - fraction) + sourceData[index2] * fraction;
-            }
+
+    async prepareUpload(recordingBlob) {
+        // 准备上传的录音
+        // Ogg/Opus服务端可直接解码，原样上传；WebM服务端无法解码，
+        // 解码为单声道PCM16（audio/L16，大端）上传
+        // Args:
+        //     recordingBlob: MediaRecorder录制的音频
+        // Returns:
+        //     Blob: 带有正确MIME类型的上传数据
+        if (recordingBlob.type.startsWith('audio/ogg')) {
+            return recordingBlob;
         }
-        return resampledBuffer;
+        
+        // decodeAudioData按AudioContext的采样率重采样，无需另建上下文
+        const context = this.getCaptureContext();
+        const audioBuffer = await context.decodeAudioData(await recordingBlob.arrayBuffer());
+        const pcm16 = this.floatTo16BitPCM(this.mixToMono(audioBuffer), false);
+        return new Blob([pcm16], {
+            type: `audio/L16;rate=${audioBuffer.sampleRate};channels=1`
+        });
     }
     
-    toMono(audioBuffer) {
+    mixToMono(audioBuffer) {
+        // 多声道取平均混为单声道
         if (audioBuffer.numberOfChannels === 1) {
-            return audioBuffer;
+            return audioBuffer.getChannelData(0);
         }
-        const monoContext = new (window.AudioContext || window.webkitAudioContext)({
-            sampleRate: audioBuffer.sampleRate
-        });
-        const monoBuffer = monoContext.createBuffer(1, audioBuffer.length, audioBuffer.sampleRate);
-        const monoData = monoBuffer.getChannelData(0);
-        
-        for (let i = 0; i < audioBuffer.length; i++) {
-            let sum = 0;
-            for (let channel = 0; channel < audioBuffer.numberOfChannels; channel++) {
-                sum += audioBuffer.getChannelData(channel)[i];
+        const mono = new Float32Array(audioBuffer.length);
+        for (let channel = 0; channel < audioBuffer.numberOfChannels; channel++) {
+            const data = audioBuffer.getChannelData(channel);
+            for (let i = 0; i < data.length; i++) {
+                mono[i] += data[i];
             }
-            monoData[i] = sum / audioBuffer.numberOfChannels;
         }
-        return monoBuffer;
+        for (let i = 0; i < mono.length; i++) {
+            mono[i] /= audioBuffer.numberOfChannels;
+        }
+        return mono;
     }
     
-    floatTo16BitPCM(float32Array) {
+    floatTo16BitPCM(float32Array, littleEndian = true) {
+        // 浮点采样转16位PCM；流式识别发送小端，audio/L16上传为大端
         const buffer = new ArrayBuffer(float32Array.length * 2);
         const view = new DataView(buffer);
         for (let i = 0; i < float32Array.length; i++) {
             const sample = Math.max(-1, Math.min(1, float32Array[i]));
             const int16 = sample < 0 ? sample * 0x8000 : sample * 0x7FFF;
-            view.setInt16(i * 2, int16, true);
+            view.setInt16(i * 2, int16, littleEndian);
         }
         return new Uint8Array(buffer);
     }
     
-    createWavHeader(dataLength) {
-        const sampleRate = 16000;
-        const numChannels = 1;
-        const bytesPerSample = 2;
-        const blockAlign = numChannels * bytesPerSample;
-        const byteRate = sampleRate * blockAlign;
-        const totalLength = 44 + dataLength;
-        
-        const buffer = new ArrayBuffer(44);
-        const view = new DataView(buffer);
-        
-        view.setUint8(0, 0x52); view.setUint8(1, 0x49); view.setUint8(2, 0x46); view.setUint8(3, 0x46); // RIFF
-        view.setUint32(4, totalLength - 8, true);
-        view.setUint8(8, 0x57); view.setUint8(9, 0x41); view.setUint8(10, 0x56); view.setUint8(11, 0x45); // WAVE
-        view.setUint8(12, 0x66); view.setUint8(13, 0x6d); view.setUint8(14, 0x74); view.setUint8(15, 0x20); // fmt 
-        view.setUint32(16, 16, true);
-        view.setUint16(20, 1, true);
-        view.setUint16(22, numChannels, true);
-        view.setUint32(24, sampleRate, true);
-        view.setUint32(28, byteRate, true);
-        view.setUint16(32, blockAlign, true);
-        view.setUint16(34, bytesPerSample * 8, true);
-        view.setUint8(36, 0x64); view.setUint8(37, 0x61); view.setUint8(38, 0x74); view.setUint8(39, 0x61); // data
-        view.setUint32(40, dataLength, true);
-        
-        return new Uint8Array(buffer);
-    }
-
     async sendToASR(audioBlob) {
+        // 直接以音频作为请求体上传，Content-Type声明格式（L16需带采样率）
         const url = `${this.options.apiBaseUrl}/asr`;
-        const formData = new FormData();
-        formData.append('audio', audioBlob, 'recording.webm');
-        
         const response = await fetch(url, {
             method: 'POST',
-            body: formData
+            headers: {
+                'Content-Type': audioBlob.type
+            },
+            body: audioBlob
         });
         
         if (!response.ok) {
@@ -265,12 +349,102 @@ class SpeechManager {
         return result.text || '';
     }
 
+    async sendVoiceTurn(audioBlob) {
+        // 调用语音对话接口：服务端依次识别、对话、分句合成，以NDJSON逐行返回事件
+        // 音频事件在此排队播放，其余事件（transcript/reply/done/error）交给onVoiceTurnEvent
+        // Args:
+        //     audioBlob: prepareUpload()返回的录音
+        // Returns:
+        //     bool: 接口是否可用（false时调用方回退到分步请求）
+        const params = this.options.getVoiceTurnParams ? this.options.getVoiceTurnParams() : {};
+        const formData = new FormData();
+        formData.append('audio', audioBlob, audioBlob.type.startsWith('audio/ogg') ? 'recording.ogg' : 'recording.pcm');
+        formData.append('tts', JSON.stringify(this.getTTSOptions(params.pitch) || false));
+        if (params.dialogueId) {
+            formData.append('dialogue_id', params.dialogueId);
+        }
+        
+        let response;
+        try {
+            response = await fetch(`${this.options.apiBaseUrl}/voice-turn`, {
+                method: 'POST',
+                body: formData
+            });
+        } catch (error) {
+            console.warn('语音对话接口请求失败，改为分步请求:', error);
+            return false;
+        }
+        if (!response.ok) {
+            console.warn(`语音对话接口不可用: ${response.status}，改为分步请求`);
+            return false;
+        }
+        
+        let queue = null;
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = '';
+        
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += value;
+            
+            let newline;
+            while ((newline = buffer.indexOf('\n')) >= 0) {
+                const line = buffer.slice(0, newline).trim();
+                buffer = buffer.slice(newline + 1);
+                if (!line) continue;
+                
+                const event = JSON.parse(line);
+                if (event.type === 'audio') {
+                    if (!queue) {
+                        queue = await this.createPlaybackQueue(() => {
+                            if (this.options.onProgress) this.options.onProgress(100);
+                        });
+                    }
+                    await queue.schedule(this.base64ToBytes(event.audio), event.media_type);
+                } else if (this.options.onVoiceTurnEvent) {
+                    this.options.onVoiceTurnEvent(event);
+                }
+            }
+        }
+        
+        if (queue && queue.started) {
+            await queue.finish();
+            if (this.options.onAudioEnded) {
+                this.options.onAudioEnded();
+                if (this.options.onProgress) this.options.onProgress(101);
+            }
+        }
+        return true;
+    }
+    
+    base64ToBytes(base64) {
+        // base64字符串解码为字节数组
+        const binary = atob(base64);
+        const bytes = new Uint8Array(binary.length);
+        for (let i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        return bytes;
+    }
+
+    getTTSOptions(pitch = 1.0) {
+        // 回复语音的合成参数，随聊天请求发送以便后端预取
+        // Returns:
+        //     dict: {speed, volume, pitch, format}，使用浏览器TTS时为null
+        if (this.browserTTSEnabled) {
+            return null;
+        }
+        return { speed: 1.0, volume: this.volume, pitch: pitch, format: this.ttsFormat };
+    }
+
     // --- 修改点：增加 pitch 参数 ---
-    async textToSpeech(text, pitch = 1.0) {
+    async textToSpeech(text, pitch = 1.0, audioUrl = null) {
         // 将文字转换为语音
         // Args:
         //     text: 要转换的文字
         //     pitch: 音调 (0.5 - 2.0)，默认 1.0
+        //     audioUrl: /api/chat返回的预取语音地址，可为null
         console.time('TTS总耗时');
         
         // 根据开关状态选择不同的TTS实现
@@ -279,7 +453,7 @@ class SpeechManager {
             await this.browserTextToSpeech(text, pitch);
         } else {
             // 使用后端TTS服务
-            await this.backendTextToSpeech(text, pitch);
+            await this.backendTextToSpeech(text, pitch, audioUrl);
         }
     }
     
@@ -351,8 +525,8 @@ class SpeechManager {
         }
     }
     
-    async backendTextToSpeech(text, pitch = 1.0) {
-        // 使用后端TTS服务转换文字为语音
+    async backendTextToSpeech(text, pitch = 1.0, audioUrl = null) {
+        // 使用后端TTS服务转换文字为语音，有预取语音时直接获取
         try {
             const url = `${this.options.apiBaseUrl}/tts`;
             
@@ -376,8 +550,19 @@ class SpeechManager {
             
             console.time('TTS网络请求');
             
+            let response = null;
+            if (audioUrl) {
+                // 预取语音：合成在/api/chat处理时已经开始，不可用时回落到直接请求TTS
+                response = await fetch(new URL(audioUrl, this.options.apiBaseUrl).href)
+                    .catch(() => null);
+                if (response && !response.ok) {
+                    console.warn(`预取语音不可用: ${response.status}，改为直接请求TTS`);
+                    response = null;
+                }
+            }
+            
             // --- 修改点：发送 pitch 参数 ---
-            const response = await fetch(url, {
+            if (!response) response = await fetch(url, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -386,23 +571,42 @@ class SpeechManager {
                     text: text,
                     speed: 1.0,
                     volume: this.volume,
-                    pitch: pitch // 使用传入的音调
+                    pitch: pitch, // 使用传入的音调
+                    format: this.ttsFormat,
+                    stream: this.streamingTTSEnabled
                 })
             });
             console.timeEnd('TTS网络请求');
             
-            clearInterval(progressInterval);
-            
             if (!response.ok) {
+                clearInterval(progressInterval);
                 throw new Error(`TTS请求失败: ${response.status}`);
             }
             
+            const contentType = response.headers.get('content-type');
+            
+            if (contentType && contentType.includes('application/octet-stream')) {
+                // 流式响应：首句到达即开始播放
+                await this.playStreamedAudio(response, () => {
+                    clearInterval(progressInterval);
+                    if (this.options.onProgress) this.options.onProgress(100);
+                });
+                clearInterval(progressInterval);
+                if (this.options.onAudioEnded) {
+                    this.options.onAudioEnded();
+                    if (this.options.onProgress) this.options.onProgress(101);
+                }
+                console.timeEnd('TTS总耗时');
+                return;
+            }
+            
+            clearInterval(progressInterval);
+            
             if (this.options.onProgress) {
                 this.options.onProgress(100);
             }
             
             console.time('TTS音频处理');
-            const contentType = response.headers.get('content-type');
             
             if (contentType && contentType.includes('application/json')) {
                 // 如果返回JSON（可能是空音频或其他情况），不做播放
@@ -460,11 +664,136 @@ class SpeechManager {
         }
     }
 
+    getPlaybackContext() {
+        // 流式播放共用一个AudioContext，通过GainNode控制音量
+        if (!this.playbackContext) {
+            this.playbackContext = new (window.AudioContext || window.webkitAudioContext)();
+            this.playbackGain = this.playbackContext.createGain();
+            this.playbackGain.gain.value = this.volume;
+            this.playbackGain.connect(this.playbackContext.destination);
+        }
+        return this.playbackContext;
+    }
+    
+    stopStreamedAudio() {
+        // 停止正在播放的流式音频片段
+        this.activeSources.forEach(source => {
+            try {
+                source.stop();
+            } catch (error) {
+                // 片段尚未开始或已结束
+            }
+        });
+        this.activeSources = [];
+    }
+    
+    async createPlaybackQueue(onFirstFrame) {
+        // 顺序播放多段音频（WAV/OGG/PCM16）：每段解码后紧接上一段排队播放，首段到达即开始播放
+        // Returns:
+        //     dict: schedule(frame, mediaType) 排队一段音频；finish() 等待最后一段播放结束；started 是否已开始播放
+        const context = this.getPlaybackContext();
+        if (context.state === 'suspended') {
+            await context.resume();
+        }
+        this.stopStreamedAudio();
+        
+        let nextStartTime = 0;
+        let lastEnded = null;
+        
+        return {
+            schedule: async (frame, mediaType) => {
+                const audioBuffer = await this.decodeFrame(context, frame, mediaType);
+                const source = context.createBufferSource();
+                source.buffer = audioBuffer;
+                source.connect(this.playbackGain);
+                lastEnded = new Promise(resolve => { source.onended = resolve; });
+                
+                const startAt = Math.max(context.currentTime, nextStartTime);
+                source.start(startAt);
+                nextStartTime = startAt + audioBuffer.duration;
+                
+                if (this.activeSources.length === 0) {
+                    onFirstFrame();
+                    if (this.options.onAudioPlayed) this.options.onAudioPlayed();
+                }
+                this.activeSources.push(source);
+            },
+            finish: async () => {
+                if (lastEnded) await lastEnded;
+                this.activeSources = [];
+            },
+            get started() {
+                return lastEnded !== null;
+            }
+        };
+    }
+    
+    async decodeFrame(context, frame, mediaType) {
+        // 解码一段音频；audio/L16没有文件头，按Content-Type中的采样率直接构造AudioBuffer
+        const match = mediaType && /^audio\/l16\b.*?rate=(\d+)/i.exec(mediaType);
+        if (!match) {
+            return context.decodeAudioData(frame.buffer);
+        }
+        const view = new DataView(frame.buffer, frame.byteOffset, frame.byteLength);
+        const length = Math.floor(frame.byteLength / 2);
+        const audioBuffer = context.createBuffer(1, length, parseInt(match[1], 10));
+        const data = audioBuffer.getChannelData(0);
+        for (let i = 0; i < length; i++) {
+            data[i] = view.getInt16(i * 2, false) / 0x8000;
+        }
+        return audioBuffer;
+    }
+    
+    async playStreamedAudio(response, onFirstFrame) {
+        // 播放分帧流式音频
+        // 每帧为4字节大端长度 + 一段完整音频（格式见X-Audio-Framing），长度为0的帧表示结束
+        const queue = await this.createPlaybackQueue(onFirstFrame);
+        const framing = response.headers.get('X-Audio-Framing') || '';
+        const sampleRate = response.headers.get('X-Audio-Sample-Rate');
+        const frameType = framing.endsWith('-pcm') && sampleRate ? `audio/L16;rate=${sampleRate}` : null;
+        
+        const reader = response.body.getReader();
+        let buffer = new Uint8Array(0);
+        let finished = false;
+        
+        while (!finished) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            
+            const merged = new Uint8Array(buffer.length + value.length);
+            merged.set(buffer, 0);
+            merged.set(value, buffer.length);
+            buffer = merged;
+            
+            while (buffer.length >= 4) {
+                const length = new DataView(buffer.buffer, buffer.byteOffset, 4).getUint32(0, false);
+                if (length === 0) {
+                    finished = true;
+                    break;
+                }
+                if (buffer.length < 4 + length) break;
+                await queue.schedule(buffer.slice(4, 4 + length), frameType);
+                buffer = buffer.slice(4 + length);
+            }
+        }
+        
+        if (!finished) {
+            if (!queue.started) throw new Error('TTS音频流意外中断');
+            console.warn('TTS音频流未完整结束，仅播放已收到的部分');
+        }
+        
+        // 等待最后一段播放结束
+        await queue.finish();
+    }
+
     setVolume(volume) {
         this.volume = Math.max(0, Math.min(1, volume));
         if (this.audioElement) {
             this.audioElement.volume = this.volume;
         }
+        if (this.playbackGain) {
+            this.playbackGain.gain.value = this.volume;
+        }
     }
 
     updateRecordingUI(isRecording) {
@@ -476,6 +805,8 @@ class SpeechManager {
             this.voiceBtn.classList.remove('recording');
             this.voiceBtn.innerHTML = '<span class="btn-icon">🎤</span><span class="btn-text">语音</span>';
             this.recordingIndicator.classList.remove('active');
+            const textElement = this.recordingIndicator.querySelector('.recording-text');
+            if (textElement) textElement.textContent = '正在录音...';
         }
     }
 
@@ -492,6 +823,11 @@ class SpeechManager {
 
     destroy() {
         if (this.isRecording) this.stopRecording();
+        this.stopStreamedAudio();
+        if (this.audioContext) {
+            this.audioContext.close();
+            this.audioContext = null;
+        }
         if (this.audioElement) {
             this.audioElement.remove();
             this.audioElement = null;